@@ -24,8 +24,18 @@ class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
 
+    # Gmail API
+    GMAIL_BATCH_SIZE: int = 50  # Sub-requests per batch HTTP call (API max 100)
+    GMAIL_QUOTA_UNITS_PER_SEC: int = 250  # Per-user quota; messages.get costs 5 units
+    GMAIL_BATCH_MAX_RETRIES: int = 5  # Retries of rate-limited requests and batch items
+    GMAIL_CLIENT_CACHE_SIZE: int = 256  # Per-user API clients kept in memory (LRU)
+    GMAIL_CLIENT_CACHE_TTL: int = 3600  # Seconds before a cached client is rebuilt
+    GMAIL_HTTP_TIMEOUT: int = 60  # Socket timeout per Gmail API request
+    GMAIL_LOCAL_READ_MAX_AGE: int = 900  # Serve message reads from the DB if the mailbox synced this recently
+
     # LLM
     GEMINI_API_KEY: Optional[str] = None
+    LLM_REQUESTS_PER_MINUTE: int = 60  # Per provider, shared by all users
 
     # SMTP
     SMTP_HOST: str = "smtp.example.com"
@@ -34,6 +44,31 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[str] = None
     SMTP_TLS: bool = True
+    SMTP_SENDS_PER_MINUTE: int = 60  # Default when the mailbox sets no send_rate_limit
+
+    # Outbound API rate limiting (token buckets keyed by provider and user)
+    RATE_LIMIT_BACKEND: str = "local"  # local (per process) or redis (shared)
+    RATE_LIMIT_MAX_WAIT: float = 30.0  # Seconds a caller may wait for capacity before failing
+
+    # Sync
+    SYNC_BATCH_SIZE: int = 100  # Messages per ingest transaction
+    SYNC_MIN_INTERVAL: int = 30  # Busiest mailboxes sync this often
+    SYNC_MAX_INTERVAL: int = 1800  # Dormant mailboxes sync this often
+    SYNC_ACTIVE_INTERVAL: int = 60  # Upper bound while the owner is using the app
+    SYNC_ACTIVE_WINDOW: int = 900  # Seconds after the last request that the owner counts as active
+    SYNC_FAILURE_MAX_INTERVAL: int = 3600  # Cap on exponential backoff after failures
+    SYNC_LEASE_TTL: int = 120  # Seconds a mailbox sync lease lasts without renewal
+    SYNC_RUN_HISTORY: int = 50  # Sync run records kept per mailbox
+
+    # Response compression (brotli when installed and accepted, else gzip)
+    COMPRESSION_MIN_SIZE: int = 1024  # Smaller responses are sent uncompressed
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4  # Dynamic responses: favour speed over ratio
+
+    # Attachment blob store (content-addressed by SHA-256)
+    ATTACHMENT_STORAGE_DIR: str = "storage/attachments"
+    ATTACHMENT_GC_INTERVAL: int = 86400  # Seconds between unreferenced-blob sweeps queued by the worker
+    ATTACHMENT_GC_GRACE: int = 3600  # Blobs younger than this are kept (may belong to an unflushed row)
     
     # CORS
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
@@ -0,0 +1,17 @@
+"""
+orjson-backed JSON responses for routes that return large plain dicts, which
+the stock JSONResponse encodes with ``json.dumps``. Routes with a
+``response_model`` are already serialized by Pydantic and gain nothing.
+See scripts/bench_responses.py.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
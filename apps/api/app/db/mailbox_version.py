@@ -0,0 +1,67 @@
+"""
+Mailbox versions: a counter on every mailbox, bumped whenever one of its
+emails is inserted, changed or deleted.
+
+A user's mailbox versions are a cheap change token for everything the email
+routes show them, so list and detail responses carry an ETag derived from
+them and an unchanged view is answered 304 from the mailboxes table alone.
+
+ORM writes are tracked by a ``before_flush`` hook (``track_mailbox_changes``);
+bulk Core statements that bypass the ORM (ingest, Gmail history changes) call
+``bump_mailbox_versions`` themselves.
+"""
+import hashlib
+from typing import Iterable, List, Tuple
+
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+
+
+def bump_mailbox_versions(db: Session, mailbox_ids: Iterable[int]) -> None:
+    ids = sorted({mailbox_id for mailbox_id in mailbox_ids if mailbox_id is not None})
+    if ids:
+        mailboxes = Mailbox.__table__
+        # Core statement on the session's connection: safe to run mid-flush
+        db.connection().execute(
+            update(mailboxes)
+            .where(mailboxes.c.id.in_(ids))
+            .values(version=func.coalesce(mailboxes.c.version, 0) + 1)
+        )
+
+
+def _changed_mailbox_ids(session: Session) -> List[int]:
+    changed = [obj for obj in session.dirty if isinstance(obj, Email) and session.is_modified(obj)]
+    changed += [obj for obj in (*session.new, *session.deleted) if isinstance(obj, Email)]
+    return [email.mailbox_id or (email.mailbox and email.mailbox.id) for email in changed]
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    bump_mailbox_versions(session, _changed_mailbox_ids(session))
+
+
+def track_mailbox_changes() -> None:
+    """Bump mailbox versions on every ORM flush that writes emails (idempotent)."""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+
+
+def mailbox_versions(db: Session, user_id: int) -> List[Tuple[int, int]]:
+    """(mailbox id, version) of each of the user's mailboxes."""
+    return [
+        (row.id, row.version or 0)
+        for row in db.query(Mailbox.id, Mailbox.version).filter(
+            Mailbox.user_id == user_id
+        ).order_by(Mailbox.id)
+    ]
+
+
+def user_etag(db: Session, user_id: int, *scope) -> str:
+    """
+    Strong ETag for a view of the user's mail: changes whenever any of their
+    mailboxes changes. ``scope`` distinguishes views (route, parameters).
+    """
+    token = repr((user_id, scope, mailbox_versions(db, user_id)))
+    return '"' + hashlib.sha256(token.encode()).hexdigest()[:32] + '"'
@@ -0,0 +1,69 @@
+"""composite indexes for hot queries
+
+Revision ID: 5242b3754a59
+Revises: 9c1e4b7d2a60
+Create Date: 2026-10-19 09:12:40.118204
+
+Indexes matched to the access paths of the email listing, the worker queue
+and audit lookups. The single-column indexes on emails.received_at,
+jobs.status, jobs.priority and audit_logs.event_type are replaced by
+composites that lead with them.
+Creation is idempotent since the API's create_all may already have made them.
+Verify the plans with scripts/explain_queries.py.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5242b3754a59'
+down_revision = '9c1e4b7d2a60'
+branch_labels = None
+depends_on = None
+
+
+def _listing_order():
+    # Listing order is received_at DESC NULLS LAST, id DESC; PostgreSQL needs
+    # the NULLS LAST in the index, SQLite sorts NULLs last on DESC and rejects it
+    if op.get_bind().dialect.name == 'postgresql':
+        return [sa.text('received_at DESC NULLS LAST'), sa.text('id DESC')]
+    return [sa.text('received_at DESC'), sa.text('id DESC')]
+
+
+def upgrade() -> None:
+    listing_order = _listing_order()
+    op.create_index('ix_emails_received', 'emails', listing_order, unique=False, if_not_exists=True)
+    op.drop_index(op.f('ix_emails_received_at'), table_name='emails', if_exists=True)
+    op.create_index('ix_emails_mailbox_folder_received', 'emails', ['mailbox_id', 'folder', *listing_order], unique=False, if_not_exists=True)
+    op.create_index('ix_emails_mailbox_received', 'emails', ['mailbox_id', *listing_order], unique=False, if_not_exists=True)
+    op.create_index('ix_emails_mailbox_unread', 'emails', ['mailbox_id', *listing_order], unique=False, if_not_exists=True,
+                    postgresql_where=sa.text('is_read = false'), sqlite_where=sa.text('is_read = 0'))
+
+    op.create_index('ix_jobs_pending_queue', 'jobs', [sa.text('priority DESC'), 'created_at'], unique=False, if_not_exists=True,
+                    postgresql_where=sa.text("status = 'pending'"), sqlite_where=sa.text("status = 'pending'"))
+    op.create_index('ix_jobs_status_created', 'jobs', ['status', 'created_at'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_jobs_created_at'), 'jobs', ['created_at'], unique=False, if_not_exists=True)
+    op.drop_index(op.f('ix_jobs_status'), table_name='jobs', if_exists=True)
+    op.drop_index(op.f('ix_jobs_priority'), table_name='jobs', if_exists=True)
+
+    op.create_index('ix_audit_logs_event_type_timestamp', 'audit_logs', ['event_type', 'timestamp'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_audit_logs_timestamp'), 'audit_logs', ['timestamp'], unique=False, if_not_exists=True)
+    op.drop_index(op.f('ix_audit_logs_event_type'), table_name='audit_logs', if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_audit_logs_event_type'), 'audit_logs', ['event_type'], unique=False, if_not_exists=True)
+    op.drop_index(op.f('ix_audit_logs_timestamp'), table_name='audit_logs', if_exists=True)
+    op.drop_index('ix_audit_logs_event_type_timestamp', table_name='audit_logs', if_exists=True)
+
+    op.create_index(op.f('ix_jobs_priority'), 'jobs', ['priority'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_jobs_status'), 'jobs', ['status'], unique=False, if_not_exists=True)
+    op.drop_index(op.f('ix_jobs_created_at'), table_name='jobs', if_exists=True)
+    op.drop_index('ix_jobs_status_created', table_name='jobs', if_exists=True)
+    op.drop_index('ix_jobs_pending_queue', table_name='jobs', if_exists=True)
+
+    op.drop_index('ix_emails_mailbox_unread', table_name='emails', if_exists=True)
+    op.drop_index('ix_emails_mailbox_received', table_name='emails', if_exists=True)
+    op.drop_index('ix_emails_mailbox_folder_received', table_name='emails', if_exists=True)
+    op.create_index(op.f('ix_emails_received_at'), 'emails', ['received_at'], unique=False, if_not_exists=True)
+    op.drop_index('ix_emails_received', table_name='emails', if_exists=True)
@@ -0,0 +1,85 @@
+"""email full-text search index
+
+Revision ID: 8950f50b86fb
+Revises: 5242b3754a59
+Create Date: 2026-10-19 18:40:12.530917
+
+The search index from app.db.search_index, as a migration rather than at
+API startup. PostgreSQL: the stored generated ``emails.search_vector``
+column (subject A, sender B, body C) and its GIN index. Adding the column
+rewrites ``emails`` under an exclusive lock, so run this in a maintenance
+window on large databases; the index is then built CONCURRENTLY.
+SQLite: the ``emails_fts`` FTS5 table, loaded from ``emails``, and the
+triggers that keep it in step. Statements are idempotent since create_all
+installs the same objects on new databases.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8950f50b86fb'
+down_revision = '5242b3754a59'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_insert AFTER INSERT ON emails BEGIN
+        INSERT INTO emails_fts (rowid, subject, sender, body)
+        VALUES (new.id, new.subject, new.sender, new.body_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_delete AFTER DELETE ON emails BEGIN
+        DELETE FROM emails_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_update AFTER UPDATE OF subject, sender, body_text ON emails BEGIN
+        DELETE FROM emails_fts WHERE rowid = old.id;
+        INSERT INTO emails_fts (rowid, subject, sender, body)
+        VALUES (new.id, new.subject, new.sender, new.body_text);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE emails ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(subject, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(sender, '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(body_text, '')), 'C')
+            ) STORED
+        """)
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_emails_search_vector "
+                "ON emails USING GIN (search_vector)"
+            )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts "
+            "USING fts5(subject, sender, body, tokenize = 'porter unicode61')"
+        )
+        for trigger in SQLITE_TRIGGERS:
+            op.execute(trigger)
+        op.execute("DELETE FROM emails_fts")
+        op.execute(
+            "INSERT INTO emails_fts (rowid, subject, sender, body) "
+            "SELECT id, subject, sender, body_text FROM emails"
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_emails_search_vector")
+        op.execute("ALTER TABLE emails DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        for trigger in ('emails_fts_update', 'emails_fts_delete', 'emails_fts_insert'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS emails_fts")
@@ -0,0 +1,137 @@
+"""sync, storage and versioning columns
+
+Revision ID: 9c1e4b7d2a60
+Revises: 1685707f3084
+Create Date: 2026-10-19 14:02:51.402117
+
+Columns and tables added since the initial migration: job priorities,
+Gmail history ids, adaptive sync scheduling, sync leases, mailbox versions,
+lazily fetched bodies and attachments, and the sync checkpoint and sync run
+tables. Existing rows get the model defaults through server defaults where
+the code relies on a value; ``emails.body_fetched`` stays NULL, which reads
+as "body stored". Columns, tables and indexes that already exist (e.g. made
+by the API's create_all) are skipped.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1e4b7d2a60'
+down_revision = '1685707f3084'
+branch_labels = None
+depends_on = None
+
+
+def _add_columns(table: str, *columns: sa.Column) -> None:
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+    for column in columns:
+        if column.name not in existing:
+            op.add_column(table, column)
+
+
+def _drop_columns(table: str, *names: str) -> None:
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+    with op.batch_alter_table(table) as batch_op:
+        for name in names:
+            if name in existing:
+                batch_op.drop_column(name)
+
+
+def upgrade() -> None:
+    _add_columns('jobs', sa.Column('priority', sa.Integer(), server_default=sa.text('0'), nullable=True))
+    op.create_index(op.f('ix_jobs_priority'), 'jobs', ['priority'], unique=False, if_not_exists=True)
+
+    _add_columns(
+        'mailboxes',
+        sa.Column('gmail_history_id', sa.String(), nullable=True),
+        sa.Column('next_sync_at', sa.DateTime(), nullable=True),
+        sa.Column('sync_interval', sa.Integer(), nullable=True),
+        sa.Column('arrival_rate', sa.Float(), server_default=sa.text('0'), nullable=True),
+        sa.Column('sync_failures', sa.Integer(), server_default=sa.text('0'), nullable=True),
+        sa.Column('last_activity_at', sa.DateTime(), nullable=True),
+        sa.Column('sync_lease_owner', sa.String(), nullable=True),
+        sa.Column('sync_lease_expires_at', sa.DateTime(), nullable=True),
+        sa.Column('sync_fencing_token', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('version', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    )
+    op.create_index(op.f('ix_mailboxes_next_sync_at'), 'mailboxes', ['next_sync_at'], unique=False, if_not_exists=True)
+
+    _add_columns('emails', sa.Column('body_fetched', sa.Boolean(), nullable=True))
+
+    _add_columns(
+        'attachments',
+        sa.Column('content_hash', sa.String(length=64), nullable=True),
+        sa.Column('external_id', sa.String(), nullable=True),
+    )
+    op.create_index(op.f('ix_attachments_content_hash'), 'attachments', ['content_hash'], unique=False, if_not_exists=True)
+
+    op.create_table(
+        'sync_checkpoints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mailbox_id', sa.Integer(), nullable=False),
+        sa.Column('mode', sa.String(), nullable=False),
+        sa.Column('cursor', sa.String(), nullable=True),
+        sa.Column('uid_validity', sa.String(), nullable=True),
+        sa.Column('start_history_id', sa.String(), nullable=True),
+        sa.Column('processed_count', sa.Integer(), nullable=True),
+        sa.Column('total_count', sa.Integer(), nullable=True),
+        sa.Column('is_complete', sa.Boolean(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['mailbox_id'], ['mailboxes.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('mailbox_id', 'mode', name='uq_sync_checkpoints_mailbox_mode'),
+        if_not_exists=True,
+    )
+    op.create_index(op.f('ix_sync_checkpoints_id'), 'sync_checkpoints', ['id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_sync_checkpoints_mailbox_id'), 'sync_checkpoints', ['mailbox_id'], unique=False, if_not_exists=True)
+
+    op.create_table(
+        'sync_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mailbox_id', sa.Integer(), nullable=False),
+        sa.Column('trigger', sa.String(), nullable=False),
+        sa.Column('mode', sa.String(), nullable=True),
+        sa.Column('status', sa.String(), nullable=True),
+        sa.Column('messages_scanned', sa.Integer(), nullable=True),
+        sa.Column('messages_new', sa.Integer(), nullable=True),
+        sa.Column('messages_updated', sa.Integer(), nullable=True),
+        sa.Column('messages_skipped', sa.Integer(), nullable=True),
+        sa.Column('bytes_transferred', sa.BigInteger(), nullable=True),
+        sa.Column('phase_seconds', sa.JSON(), nullable=True),
+        sa.Column('duration_seconds', sa.Float(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['mailbox_id'], ['mailboxes.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_index(op.f('ix_sync_runs_id'), 'sync_runs', ['id'], unique=False, if_not_exists=True)
+    op.create_index(op.f('ix_sync_runs_mailbox_id'), 'sync_runs', ['mailbox_id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_sync_runs_mailbox_id'), table_name='sync_runs', if_exists=True)
+    op.drop_index(op.f('ix_sync_runs_id'), table_name='sync_runs', if_exists=True)
+    op.drop_table('sync_runs', if_exists=True)
+    op.drop_index(op.f('ix_sync_checkpoints_mailbox_id'), table_name='sync_checkpoints', if_exists=True)
+    op.drop_index(op.f('ix_sync_checkpoints_id'), table_name='sync_checkpoints', if_exists=True)
+    op.drop_table('sync_checkpoints', if_exists=True)
+
+    op.drop_index(op.f('ix_attachments_content_hash'), table_name='attachments', if_exists=True)
+    _drop_columns('attachments', 'content_hash', 'external_id')
+
+    _drop_columns('emails', 'body_fetched')
+
+    op.drop_index(op.f('ix_mailboxes_next_sync_at'), table_name='mailboxes', if_exists=True)
+    _drop_columns(
+        'mailboxes', 'gmail_history_id', 'next_sync_at', 'sync_interval', 'arrival_rate',
+        'sync_failures', 'last_activity_at', 'sync_lease_owner', 'sync_lease_expires_at',
+        'sync_fencing_token', 'version',
+    )
+
+    op.drop_index(op.f('ix_jobs_priority'), table_name='jobs', if_exists=True)
+    _drop_columns('jobs', 'priority')
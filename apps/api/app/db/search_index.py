@@ -0,0 +1,99 @@
+"""
+Database-side full-text index over emails (subject, sender, body).
+
+SQLite: an FTS5 table ``emails_fts`` keyed by email id, kept in step with
+``emails`` by insert/update/delete triggers.
+PostgreSQL: a stored generated ``tsvector`` column ``emails.search_vector``
+(subject weighted A, sender B, body C) with a GIN index.
+
+Either way the index is maintained by the database on every write, so ingest,
+body hydration and deletes need no extra code. It is installed when the
+``emails`` table is created (create_all) and, on existing databases, by the
+Alembic revision 8950f50b86fb. ``ensure_search_index`` only fills it in for
+SQLite development and test databases. Querying lives in
+``app.services.search``.
+"""
+from sqlalchemy import Table, event, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+FTS_TABLE = "emails_fts"
+
+_SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_insert AFTER INSERT ON emails BEGIN
+        INSERT INTO emails_fts (rowid, subject, sender, body)
+        VALUES (new.id, new.subject, new.sender, new.body_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_delete AFTER DELETE ON emails BEGIN
+        DELETE FROM emails_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_update AFTER UPDATE OF subject, sender, body_text ON emails BEGIN
+        DELETE FROM emails_fts WHERE rowid = old.id;
+        INSERT INTO emails_fts (rowid, subject, sender, body)
+        VALUES (new.id, new.subject, new.sender, new.body_text);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    """
+    ALTER TABLE emails ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(subject, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(sender, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(body_text, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_emails_search_vector ON emails USING GIN (search_vector)",
+]
+
+
+def install_search_index(connection: Connection, rebuild: bool = True) -> None:
+    """Create the index for the connection's dialect; ``rebuild`` reloads SQLite's FTS table from ``emails``."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(subject, sender, body, tokenize = 'porter unicode61')"
+        ))
+        for trigger in _SQLITE_TRIGGERS:
+            connection.execute(text(trigger))
+        if rebuild:
+            connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+            connection.execute(text(
+                f"INSERT INTO {FTS_TABLE} (rowid, subject, sender, body) "
+                "SELECT id, subject, sender, body_text FROM emails"
+            ))
+    elif dialect == "postgresql":
+        for statement in _POSTGRES_DDL:
+            connection.execute(text(statement))
+
+
+def drop_search_index(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """
+    Install the index on an existing SQLite database if it is missing (run at
+    startup). PostgreSQL is left to Alembic: adding the generated column
+    rewrites the emails table, which must not happen on every API boot.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        if "emails" not in inspector.get_table_names():
+            return
+        missing = FTS_TABLE not in inspector.get_table_names()
+        install_search_index(connection, rebuild=missing)
+
+
+def attach_search_index(table: Table) -> None:
+    """Install and drop the index together with ``table`` (the emails table)."""
+    event.listen(table, "after_create", lambda target, connection, **kw: install_search_index(connection))
+    event.listen(table, "before_drop", lambda target, connection, **kw: drop_search_index(connection))
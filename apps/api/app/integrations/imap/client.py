@@ -3,29 +3,138 @@ import email
 from email.header import decode_header
 from email.utils import parsedate_to_datetime
 import datetime
-from typing import List, Dict, Optional, Any
+import re
+import zlib
+from typing import List, Dict, Optional, Any, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+UID_PATTERN = re.compile(rb"UID (\d+)")
+
+# RFC 4978; imaplib refuses commands it has no state table entry for
+imaplib.Commands.setdefault("COMPRESS", ("AUTH", "SELECTED"))
+
+
+class CompressingIMAP4_SSL(imaplib.IMAP4_SSL):
+    """
+    IMAP4_SSL that can switch the stream to COMPRESS=DEFLATE (RFC 4978)
+    and counts bytes on the wire vs. bytes of protocol data.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Set before super().__init__, which already reads the greeting
+        self.wire_bytes_received = 0
+        self.wire_bytes_sent = 0
+        self.data_bytes_received = 0
+        self.data_bytes_sent = 0
+        self.compressed = False
+        self._compressor = None
+        self._decompressor = None
+        self._inbuf = bytearray()
+        super().__init__(*args, **kwargs)
+
+    def enable_compression(self) -> bool:
+        """Negotiate DEFLATE if the server advertises it. Returns True when active."""
+        if "COMPRESS=DEFLATE" not in self.capabilities:
+            # Servers may only advertise extensions after authentication
+            self._get_capabilities()
+        if "COMPRESS=DEFLATE" not in self.capabilities:
+            return False
+        typ, _ = self._simple_command("COMPRESS", "DEFLATE")
+        if typ != "OK":
+            return False
+        # Raw deflate streams (no zlib header), per RFC 4978
+        self._compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        self._decompressor = zlib.decompressobj(-15)
+        self.compressed = True
+        return True
+
+    def _fill(self) -> bool:
+        chunk = self.file.read1(65536)
+        if not chunk:
+            return False
+        self.wire_bytes_received += len(chunk)
+        self._inbuf += self._decompressor.decompress(chunk)
+        return True
+
+    def read(self, size):
+        if not self.compressed:
+            data = super().read(size)
+            self.wire_bytes_received += len(data)
+        else:
+            while len(self._inbuf) < size and self._fill():
+                pass
+            data = bytes(self._inbuf[:size])
+            del self._inbuf[:size]
+        self.data_bytes_received += len(data)
+        return data
+
+    def readline(self):
+        if not self.compressed:
+            line = super().readline()
+            self.wire_bytes_received += len(line)
+        else:
+            while b"\n" not in self._inbuf:
+                if len(self._inbuf) > imaplib._MAXLINE:
+                    raise self.error("got more than %d bytes" % imaplib._MAXLINE)
+                if not self._fill():
+                    break
+            end = self._inbuf.find(b"\n") + 1 or len(self._inbuf)
+            line = bytes(self._inbuf[:end])
+            del self._inbuf[:end]
+        self.data_bytes_received += len(line)
+        return line
+
+    def send(self, data):
+        self.data_bytes_sent += len(data)
+        if self.compressed:
+            data = self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.wire_bytes_sent += len(data)
+        super().send(data)
+
+    def transfer_stats(self) -> Dict[str, Any]:
+        return {
+            "compressed": self.compressed,
+            "bytes_on_wire": self.wire_bytes_received + self.wire_bytes_sent,
+            "bytes_uncompressed": self.data_bytes_received + self.data_bytes_sent,
+        }
+
+
 class IMAPClient:
-    def __init__(self, host: str, port: int, email_address: str, password: str):
+    def __init__(self, host: str, port: int, email_address: str, password: str, use_compression: bool = True):
         self.host = host
         self.port = port
         self.email_address = email_address
         self.password = password
+        self.use_compression = use_compression
         self.connection = None
+        self._last_stats = None
 
     def connect(self):
-        """Connect to the IMAP server and login."""
+        """Connect to the IMAP server, login and negotiate compression if offered."""
         try:
-            self.connection = imaplib.IMAP4_SSL(self.host, self.port)
+            self.connection = CompressingIMAP4_SSL(self.host, self.port)
             self.connection.login(self.email_address, self.password)
-            logger.info(f"Connected to IMAP server {self.host} as {self.email_address}")
+            if self.use_compression:
+                try:
+                    self.connection.enable_compression()
+                except imaplib.IMAP4.error as e:
+                    logger.warning(f"COMPRESS=DEFLATE negotiation failed, continuing uncompressed: {e}")
+            logger.info(
+                f"Connected to IMAP server {self.host} as {self.email_address}"
+                f"{' (compressed)' if self.connection.compressed else ''}"
+            )
         except Exception as e:
             logger.error(f"Failed to connect to IMAP server: {e}")
             raise
 
+    def transfer_stats(self) -> Dict[str, Any]:
+        """Bytes on the wire vs. uncompressed protocol bytes for this session."""
+        if self.connection:
+            return self.connection.transfer_stats()
+        return self._last_stats or {"compressed": False, "bytes_on_wire": 0, "bytes_uncompressed": 0}
+
     def disconnect(self):
         """Logout and close the connection."""
         if self.connection:
@@ -33,6 +142,7 @@ class IMAPClient:
                 self.connection.logout()
             except Exception:
                 pass
+            self._last_stats = self.connection.transfer_stats()
             self.connection = None
 
     def list_folders(self) -> List[str]:
@@ -111,6 +221,44 @@ class IMAPClient:
                 
         return results
 
+    def list_uids(self, folder: str = "INBOX") -> Tuple[Optional[str], List[int]]:
+        """Select a folder and return (UIDVALIDITY, ascending list of all UIDs)."""
+        self.select_folder(folder)
+        _, validity = self.connection.response("UIDVALIDITY")
+        uid_validity = validity[0].decode() if validity and validity[0] else None
+        
+        status, data = self.connection.uid("SEARCH", None, "ALL")
+        if status != 'OK':
+            raise Exception("Failed to search emails")
+        uids = sorted(int(uid) for uid in data[0].split()) if data and data[0] else []
+        return uid_validity, uids
+
+    def fetch_by_uids(self, uids: List[int], folder: str = "INBOX") -> List[Dict[str, Any]]:
+        """
+        Fetch and parse the given UIDs with a single UID FETCH.
+        The folder must already be selected (see ``list_uids``).
+        """
+        if not uids:
+            return []
+        status, msg_data = self.connection.uid("FETCH", ",".join(str(uid) for uid in uids), "(RFC822)")
+        if status != 'OK':
+            raise Exception(f"Failed to fetch UIDs from {folder}")
+        
+        results = []
+        for response_part in msg_data:
+            if not isinstance(response_part, tuple):
+                continue
+            try:
+                match = UID_PATTERN.search(response_part[0])
+                uid = match.group(1).decode() if match else ""
+                msg = email.message_from_bytes(response_part[1])
+                parsed_email = self._parse_email(msg, uid)
+                parsed_email["folder"] = folder
+                results.append(parsed_email)
+            except Exception as e:
+                logger.error(f"Error parsing fetched message: {e}")
+        return results
+
     def _parse_email(self, msg, uid: str) -> Dict[str, Any]:
         """Parse raw email message into a dictionary."""
         subject = self._decode_header_str(msg["Subject"])
@@ -60,7 +60,7 @@ class GeminiProvider(BaseLLMProvider):
                 )
             except httpx.HTTPStatusError as e:
                 error_detail = e.response.text if e.response else str(e)
-                raise Exception(f"Gemini API error: {error_detail}")
+                raise Exception(f"Gemini API error: {error_detail}") from e
             except Exception as e:
                 raise e
 
@@ -1,18 +1,29 @@
 from fastapi import FastAPI
+from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.middleware.compression import CompressionMiddleware
 from app.routes import auth, admin, mailboxes, jobs, emails, drafts, audit, approval, groups, spam, quarantine, admin_settings, analytics, health, metrics, gmail
 from app.db.session import engine, Base
+from app.db.search_index import ensure_search_index
 from app import models  # Import models to register with Base
 
 setup_logging()
 
 # Create tables on startup for development
 Base.metadata.create_all(bind=engine)
+ensure_search_index(engine)
 
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="Smart Mailbox API")
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
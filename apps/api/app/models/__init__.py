@@ -11,3 +11,8 @@ from .spam_rule import SpamRule
 from .quarantine import QuarantineEntry
 from .admin_settings import LLMSettings, PromptTemplate, PolicyRule
 from .embedding import Embedding
+from .sync_checkpoint import SyncCheckpoint
+from .sync_run import SyncRun
+
+from app.db.mailbox_version import track_mailbox_changes
+track_mailbox_changes()
@@ -13,6 +13,8 @@ class Attachment(Base):
     content_type = Column(String)
     size = Column(Integer)
     storage_path = Column(String) # Path to blob storage or local file system
+    content_hash = Column(String(64), index=True, nullable=True) # SHA-256 key in the blob store
+    external_id = Column(String, nullable=True) # Provider id (Gmail attachmentId) for bytes not yet downloaded
     
     created_at = Column(DateTime, default=datetime.utcnow)
 
@@ -1,14 +1,18 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
 from app.db.session import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # Event type over a time window (rate limits, analytics, audit listing)
+        Index("ix_audit_logs_event_type_timestamp", "event_type", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, index=True, nullable=True) # Nullable for failed logins
-    event_type = Column(String, index=True, nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    event_type = Column(String, nullable=False)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
     details = Column(JSON, nullable=True)
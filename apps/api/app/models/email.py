@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Text, Boolean, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Text, Boolean, Enum, Index, text
+from sqlalchemy.orm import relationship, load_only
 from datetime import datetime
 from app.db.session import Base
 import enum
@@ -16,8 +16,35 @@ class EmailState(str, enum.Enum):
     REPLIED = "replied"
     CLOSED = "closed"
 
+def _listing_index(name, *leading, **kw):
+    """
+    Index on ``leading`` columns followed by the listing order, received_at
+    DESC NULLS LAST, id DESC (app.utils.pagination). PostgreSQL needs NULLS
+    LAST spelled out to read the order from the index; SQLite already sorts
+    NULLs last on DESC and rejects NULLS LAST in an index.
+    """
+    received_at, email_id = Column("received_at"), Column("id")
+    return (
+        Index(name, *leading, received_at.desc().nulls_last(), email_id.desc(), **kw).ddl_if(dialect="postgresql"),
+        Index(name, *leading, received_at.desc(), email_id.desc(), **kw).ddl_if(
+            callable_=lambda ddl, target, bind, dialect, **_: dialect.name != "postgresql"
+        ),
+    )
+
+
 class Email(Base):
     __tablename__ = "emails"
+    __table_args__ = (
+        # All-mailbox views (list_emails without mailbox_id, /gmail/inbox), then
+        # folder views, mailbox views and unread views of list_emails
+        *_listing_index("ix_emails_received"),
+        *_listing_index("ix_emails_mailbox_folder_received", "mailbox_id", "folder"),
+        *_listing_index("ix_emails_mailbox_received", "mailbox_id"),
+        *_listing_index(
+            "ix_emails_mailbox_unread", "mailbox_id",
+            postgresql_where=text("is_read = false"), sqlite_where=text("is_read = 0"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     mailbox_id = Column(Integer, ForeignKey("mailboxes.id"), nullable=False)
@@ -32,13 +59,14 @@ class Email(Base):
     body_text = Column(Text, nullable=True)
     body_html = Column(Text, nullable=True)
     snippet = Column(Text, nullable=True)
+    body_fetched = Column(Boolean, default=True)  # False for metadata-only Gmail syncs; body loaded on first open
     
     folder = Column(String, default="INBOX") # INBOX, SENT, TRASH, etc.
     is_read = Column(Boolean, default=False)
     is_flagged = Column(Boolean, default=False)
     state = Column(Enum(EmailState), default=EmailState.OPEN)
     
-    received_at = Column(DateTime, index=True)
+    received_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     assigned_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -50,3 +78,21 @@ class Email(Base):
     tags = relationship("Tag", secondary="email_tags", backref="emails")
     drafts = relationship("Draft", back_populates="email", cascade="all, delete-orphan")
 
+
+def list_projection():
+    """
+    Loader option for inbox listings: every column except the bodies, which
+    can be hundreds of KB per row. Touching an unloaded body raises instead
+    of silently issuing one query per row.
+    """
+    return load_only(
+        Email.id, Email.mailbox_id, Email.thread_id, Email.message_id,
+        Email.sender, Email.recipients, Email.subject, Email.snippet,
+        Email.folder, Email.is_read, Email.is_flagged, Email.state,
+        Email.received_at, Email.created_at, Email.assigned_user_id,
+        raiseload=True,
+    )
+
+
+from app.db.search_index import attach_search_index  # noqa: E402
+attach_search_index(Email.__table__)
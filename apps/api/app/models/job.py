@@ -1,13 +1,21 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Text
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, Index, text
 from datetime import datetime
 from app.db.session import Base
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Worker queue: next pending job by priority, then age
+        Index("ix_jobs_pending_queue", Column("priority").desc(), "created_at",
+              postgresql_where=text("status = 'pending'"), sqlite_where=text("status = 'pending'")),
+        # Status counts and status + age filters (metrics, analytics)
+        Index("ix_jobs_status_created", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     type = Column(String, index=True) # sync_email, send_email, etc.
-    status = Column(String, default="pending", index=True) # pending, processing, completed, failed
+    status = Column(String, default="pending") # pending, processing, completed, failed
+    priority = Column(Integer, default=0) # Higher runs first; backfills run below live syncs
     
     payload = Column(JSON)
     result = Column(JSON, nullable=True)
@@ -16,6 +24,6 @@ class Job(Base):
     attempts = Column(Integer, default=0)
     next_retry_at = Column(DateTime, nullable=True)
     
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Float, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.db.session import Base
@@ -19,8 +19,20 @@ class Mailbox(Base):
     hashed_password = Column(String, nullable=True) # or encrypted_password
     
     last_synced_at = Column(DateTime, nullable=True)
+    gmail_history_id = Column(String, nullable=True)  # Gmail only; start point for users.history.list
     sync_status = Column(String, default="idle") # idle, syncing, failed
+    # Adaptive scheduling (app.services.sync_schedule)
+    next_sync_at = Column(DateTime, nullable=True, index=True)  # NULL = due now
+    sync_interval = Column(Integer, nullable=True)  # Seconds between syncs, from arrival rate
+    arrival_rate = Column(Float, default=0.0)  # Smoothed new messages per hour
+    sync_failures = Column(Integer, default=0)  # Consecutive failures, for backoff
+    last_activity_at = Column(DateTime, nullable=True)  # Owner last viewed mail
+    # Sync lease (app.services.sync_lease); the token increases with every acquisition
+    sync_lease_owner = Column(String, nullable=True)
+    sync_lease_expires_at = Column(DateTime, nullable=True)
+    sync_fencing_token = Column(Integer, default=0, server_default=text("0"), nullable=False)
     send_rate_limit = Column(Integer, default=10)  # Max emails per minute
+    version = Column(Integer, default=0, server_default=text("0"), nullable=False)  # Bumped on every email change (app.db.mailbox_version)
     
     # Overall metrics
     total_messages = Column(Integer, default=0)
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.db.session import Base
+
+
+class SyncCheckpoint(Base):
+    """
+    Resumable position of a long-running mailbox sync (e.g. historical backfill).
+    One row per (mailbox, mode); the cursor is saved after every chunk.
+    """
+    __tablename__ = "sync_checkpoints"
+    __table_args__ = (UniqueConstraint("mailbox_id", "mode", name="uq_sync_checkpoints_mailbox_mode"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    mailbox_id = Column(Integer, ForeignKey("mailboxes.id"), nullable=False, index=True)
+    mode = Column(String, nullable=False)  # backfill, gmail_full_sync
+    
+    # IMAP: lowest UID already processed (walk continues below it)
+    # Gmail: nextPageToken of the messages.list walk
+    cursor = Column(String, nullable=True)
+    uid_validity = Column(String, nullable=True)  # IMAP only; a change invalidates the cursor
+    start_history_id = Column(String, nullable=True)  # Gmail full sync: historyId incremental sync resumes from
+    
+    processed_count = Column(Integer, default=0)
+    total_count = Column(Integer, nullable=True)
+    is_complete = Column(Boolean, default=False)
+    
+    started_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    mailbox = relationship("Mailbox")
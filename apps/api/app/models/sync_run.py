@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Float, ForeignKey, DateTime, JSON, Text
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.db.session import Base
+
+
+class SyncRun(Base):
+    """
+    One sync of one mailbox: what it saw, what it changed, and where the time went.
+    Phase timings are seconds per phase (list, fetch, parse, store); phases that
+    overlap (e.g. the Gmail full sync prefetching pages) can add up to more than
+    the wall-clock duration.
+    """
+    __tablename__ = "sync_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mailbox_id = Column(Integer, ForeignKey("mailboxes.id"), nullable=False, index=True)
+    trigger = Column(String, nullable=False)  # scheduler, job
+    mode = Column(String, nullable=True)  # full, history, imap
+    status = Column(String, default="running")  # running, succeeded, failed
+
+    messages_scanned = Column(Integer, default=0)
+    messages_new = Column(Integer, default=0)
+    messages_updated = Column(Integer, default=0)
+    messages_skipped = Column(Integer, default=0)  # Listed but already stored
+    bytes_transferred = Column(BigInteger, default=0)
+    phase_seconds = Column(JSON, default=dict)
+    duration_seconds = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    mailbox = relationship("Mailbox")
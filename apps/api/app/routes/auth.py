@@ -14,6 +14,7 @@ from app.core.security.deps import get_current_active_user
 router = APIRouter()
 
 from app.services.audit import create_audit_log
+from app.services.gmail_service import gmail_clients
 from fastapi.security import OAuth2PasswordRequestForm
 from app.core.security.jwt import create_access_token, create_refresh_token, pwd_context
 
@@ -176,6 +177,7 @@ async def login_google_oauth(request: Request, response: Response, login_data: G
     
     # 3. Store Google access token for Gmail API
     user.google_access_token = login_data.access_token
+    gmail_clients.invalidate(user.id)
     
     # 3b. Auto-create default mailbox if it doesn't exist
     mailbox = db.query(Mailbox).filter(
@@ -1,15 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
 from typing import Optional
+from app.db.mailbox_version import user_etag
 from app.db.session import get_db
-from app.models.email import Email
+from app.models.attachment import Attachment
+from app.models.email import Email, list_projection
 from app.models.tag import Tag
+from app.schemas.bulk_action import BulkEmailAction, BulkEmailActionResponse
 from app.schemas.email import EmailResponse, EmailDetailResponse, EmailListResponse, TagResponse
 from app.routes.auth import get_current_active_user
 from app.models.user import User
 from app.services.llm import LLMService
 from app.services.prompts.builder import PromptBuilder
+from app.services.blob_store import blob_store
+from app.services.bulk_actions import EmailsNotFound, apply_bulk_action
+from app.services.gmail_sync import ensure_attachment_content, ensure_email_body
+from app.services.search import apply_search
+from app.services.sync_schedule import mark_user_active
+from app.utils.http_cache import conditional_response
+from app.utils.pagination import InvalidCursor, keyset_page
 from app.integrations.llm.base import LLMResponse
 from pydantic import BaseModel
 from datetime import datetime
@@ -21,24 +32,52 @@ prompt_builder = PromptBuilder()
 
 @router.get("/", response_model=EmailListResponse)
 def list_emails(
+    request: Request,
+    response: Response,
     page: int = 1,
     size: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     mailbox_id: Optional[int] = None,
     folder: Optional[str] = None,
     is_read: Optional[bool] = None,
     q: Optional[str] = None,
+    sort: Optional[str] = Query(None, pattern="^(date|relevance)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     List emails with pagination, filtering, and search.
+    Pass the returned ``next_cursor`` as ``cursor`` for the next page; the
+    total (a full count of matches) is only computed when ``include_total``
+    is set. ``page`` is kept for older clients and uses OFFSET.
+
+    ``q`` is a full-text search (words, "quoted phrases", ``from:``,
+    ``subject:``, ``body:``); its results are ordered by relevance unless
+    ``sort=date``. Relevance-ordered results are paged with ``page``.
+
+    Responses carry an ETag; a matching ``If-None-Match`` gets a 304.
     """
-    skip = (page - 1) * size
+    # Sync this user's mailboxes more often while they are reading
+    mark_user_active(db, current_user.id)
+
+    not_modified = conditional_response(
+        request, response, user_etag(db, current_user.id, "emails", str(request.query_params))
+    )
+    if not_modified:
+        return not_modified
     
     # Base query: join mailbox to ensure user owns it
     # But since we have user_id on mailbox, we can just filter by mailbox ownership if needed.
     # For now, let's filter where email.mailbox.user_id == current_user.id
-    query = db.query(Email).join(Email.mailbox).filter(Email.mailbox.has(user_id=current_user.id))
+    # Attachments and tags for the whole page in one query each, not two per email
+    query = db.query(Email).options(
+        list_projection(),
+        selectinload(Email.attachments),
+        selectinload(Email.tags)
+    ).join(Email.mailbox).filter(
+        Email.mailbox.has(user_id=current_user.id)
+    )
     
     if mailbox_id:
         query = query.filter(Email.mailbox_id == mailbox_id)
@@ -49,48 +88,97 @@ def list_emails(
     if is_read is not None:
         query = query.filter(Email.is_read == is_read)
         
+    rank = None
     if q:
-        search = f"%{q}%"
-        query = query.filter(
-            or_(
-                Email.subject.ilike(search),
-                Email.sender.ilike(search),
-                Email.body_text.ilike(search)
-            )
-        )
+        query, rank = apply_search(db, query, q)
         
-    total = query.count()
-    emails = query.order_by(Email.received_at.desc()).offset(skip).limit(size).all()
+    total = query.count() if include_total else None
+    if rank is not None and (sort or "relevance") == "relevance":
+        emails = query.order_by(rank, Email.id.desc()).offset((page - 1) * size).limit(size).all()
+        return {
+            "items": emails,
+            "total": total,
+            "page": page,
+            "size": size,
+            "next_cursor": None
+        }
+    offset = (page - 1) * size if page > 1 and not cursor else 0
+    try:
+        emails, next_cursor = keyset_page(query, size, cursor, offset)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "items": emails,
         "total": total,
         "page": page,
-        "size": size
+        "size": size,
+        "next_cursor": next_cursor
     }
 
 @router.get("/{email_id}", response_model=EmailDetailResponse)
 def get_email_detail(
     email_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get full email detail including body.
+    Get full email detail including body. Supports ``If-None-Match`` like the list.
     """
-    email = db.query(Email).join(Email.mailbox).filter(
+    not_modified = conditional_response(
+        request, response, user_etag(db, current_user.id, "email", email_id)
+    )
+    if not_modified:
+        return not_modified
+
+    email = db.query(Email).options(
+        selectinload(Email.attachments),
+        selectinload(Email.tags)
+    ).join(Email.mailbox).filter(
         Email.id == email_id,
         Email.mailbox.has(user_id=current_user.id)
     ).first()
     
     if not email:
         raise HTTPException(status_code=404, detail="Email not found")
-        
-    if not email:
-        raise HTTPException(status_code=404, detail="Email not found")
-        
+    
+    # Metadata-only Gmail syncs load the body on first open
+    if email.body_fetched is False and ensure_email_body(db, email):
+        # Storing the body bumped the mailbox version
+        response.headers["ETag"] = user_etag(db, current_user.id, "email", email_id)
     return email
 
+@router.get("/{email_id}/attachments/{attachment_id}")
+def download_attachment(
+    email_id: int,
+    attachment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Download an attachment. Gmail attachments are fetched from Gmail on first download.
+    """
+    attachment = db.query(Attachment).join(Attachment.email).filter(
+        Attachment.id == attachment_id,
+        Attachment.email_id == email_id,
+        Email.mailbox.has(user_id=current_user.id)
+    ).first()
+
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+
+    if not ensure_attachment_content(db, attachment):
+        raise HTTPException(status_code=502, detail="Attachment content unavailable")
+
+    filename = (attachment.filename or "attachment").replace('"', '')
+    return StreamingResponse(
+        blob_store.iter_chunks(attachment.content_hash),
+        media_type=attachment.content_type or "application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 # Request Models
 class AssignRequest(BaseModel):
     user_id: int
@@ -169,6 +257,24 @@ def remove_tag(
         
     return {"message": "Tag removed"}
 
+@router.post("/bulk", response_model=BulkEmailActionResponse)
+def bulk_email_action(
+    body: BulkEmailAction,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Mark read, flag, move, assign or tag many emails in one call, selected
+    by ``email_ids`` or by the list ``filter``. All ids must belong to the
+    user, otherwise nothing is changed. Committed once.
+    """
+    try:
+        matched = apply_bulk_action(db, current_user.id, body)
+    except EmailsNotFound:
+        raise HTTPException(status_code=404, detail="Email not found")
+    db.commit()
+    return {"matched": matched}
+
 class DraftRequest(BaseModel):
     instructions: str
     tone: str = "professional"
@@ -187,6 +293,9 @@ async def generate_draft_reply(
     
     if not email:
         raise HTTPException(status_code=404, detail="Email not found")
+    
+    # Gmail fetches (and rate-limit waits) block; keep them off the event loop
+    await run_in_threadpool(ensure_email_body, db, email)
         
     # Build Prompt
     prompt = prompt_builder.build_draft_prompt(
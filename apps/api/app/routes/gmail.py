@@ -1,16 +1,23 @@
 """
 Gmail-specific routes for authenticated user's inbox.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from pydantic import BaseModel
 
+from app.db.mailbox_version import user_etag
 from app.db.session import get_db
 from app.models.user import User
+from app.core.responses import ORJSONResponse
 from app.core.security.deps import get_current_active_user
-from app.services.gmail_service import GmailService
+from app.services.gmail_service import get_gmail_service
+from app.services.gmail_sync import get_message_local_first, read_message_local_first
+from app.services.sync_schedule import mark_user_active
+from app.utils.http_cache import conditional_response
+from app.utils.pagination import InvalidCursor, keyset_page
 from app.services.llm import LLMService
 
 router = APIRouter()
@@ -30,27 +37,48 @@ class SendReplyRequest(BaseModel):
     subject: Optional[str] = None
 
 
-@router.get("/gmail/inbox")
-async def get_gmail_inbox(
+@router.get("/gmail/inbox", response_class=ORJSONResponse)
+def get_gmail_inbox(
+    request: Request,
+    response: Response,
     max_results: int = 50,
+    page_token: Optional[str] = None,
     offset: int = 0,
+    include_total: bool = False,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get emails from local database for authenticated user with pagination."""
-    from app.models.email import Email
+    """
+    Get emails from local database for authenticated user, newest first.
+    Pass ``nextPageToken`` back as ``page_token`` for the next page (``offset``
+    is kept for older clients). The total is counted only with ``include_total``.
+    Responses carry an ETag; a matching ``If-None-Match`` gets a 304.
+    """
+    from app.models.email import Email, list_projection
     from app.models.mailbox import Mailbox
     
     try:
+        # Sync this user's mailboxes more often while they are reading
+        mark_user_active(db, current_user.id)
+        
+        not_modified = conditional_response(
+            request, response, user_etag(db, current_user.id, "gmail-inbox", str(request.query_params))
+        )
+        if not_modified:
+            return not_modified
+        
         # Query emails joined with mailboxes to filter by user_id
-        emails_query = db.query(Email).join(Mailbox).filter(
+        emails_query = db.query(Email).options(list_projection()).join(Mailbox).filter(
             Mailbox.user_id == current_user.id
-        ).order_by(Email.received_at.desc())
+        )
         
-        total_count = emails_query.count()
-        emails = emails_query.offset(offset).limit(max_results).all()
+        total_count = emails_query.count() if include_total else None
+        emails, next_page_token = keyset_page(
+            emails_query, max_results, page_token, offset if not page_token else 0
+        )
         
-        # Convert to a format compatible with the frontend expectations
+        # Convert to a format compatible with the frontend expectations;
+        # bodies are fetched per message from /gmail/message/{id}
         messages = []
         for email in emails:
             messages.append({
@@ -59,17 +87,22 @@ async def get_gmail_inbox(
                 "sender": email.sender,
                 "subject": email.subject,
                 "snippet": email.snippet,
-                "body": email.body_text,
                 "date": email.received_at.isoformat() if email.received_at else None,
                 "is_read": email.is_read
             })
             
-        return {
+        payload = {
             "messages": messages,
             "count": len(messages),
-            "total_count": total_count,
-            "next_offset": offset + max_results if offset + max_results < total_count else None
+            "nextPageToken": next_page_token,
         }
+        if include_total:
+            payload["total_count"] = total_count
+        if offset:
+            payload["next_offset"] = offset + len(messages) if next_page_token else None
+        return payload
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch emails from DB: {str(e)}")
     except Exception as e:
@@ -77,7 +110,7 @@ async def get_gmail_inbox(
 
 
 @router.get("/gmail/stats")
-async def get_gmail_stats(
+def get_gmail_stats(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -90,10 +123,7 @@ async def get_gmail_stats(
         }
     
     try:
-        gmail = GmailService(
-            access_token=current_user.google_access_token,
-            refresh_token=current_user.google_refresh_token
-        )
+        gmail = get_gmail_service(db, current_user)
         
         unread_count = gmail.get_unread_count()
         message_refs = gmail.list_messages(max_results=1)
@@ -110,26 +140,34 @@ async def get_gmail_stats(
         }
 
 
-@router.get("/gmail/message/{message_id}")
-async def get_gmail_message(
+@router.get("/gmail/message/{message_id}", response_class=ORJSONResponse)
+def get_gmail_message(
     message_id: str,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get a specific Gmail message."""
+    """
+    Get a specific Gmail message. Supports ``If-None-Match`` like the inbox
+    when the message is served from the local copy; messages read from Gmail
+    carry no ETag, since local versions say nothing about remote changes.
+    """
     if not current_user.google_access_token:
         raise HTTPException(status_code=400, detail="Gmail not connected")
     
     try:
-        gmail = GmailService(
-            access_token=current_user.google_access_token,
-            refresh_token=current_user.google_refresh_token
-        )
-        
-        message = gmail.get_message(message_id)
+        message, served_locally = read_message_local_first(db, current_user, message_id)
         if not message:
             raise HTTPException(status_code=404, detail="Message not found")
         
+        if served_locally:
+            # Computed after the read: loading a metadata-only copy's body bumps the mailbox version
+            not_modified = conditional_response(
+                request, response, user_etag(db, current_user.id, "gmail-message", message_id)
+            )
+            if not_modified:
+                return not_modified
         return message
     except HTTPException:
         raise
@@ -157,12 +195,8 @@ async def generate_auto_reply(
             subject = request.subject
             body = request.body[:500]  # Limit for faster processing
         else:
-            # Fallback: fetch from Gmail API
-            gmail = GmailService(
-                access_token=current_user.google_access_token,
-                refresh_token=current_user.google_refresh_token
-            )
-            message = gmail.get_message(message_id)
+            # Fallback: local copy, or the Gmail API if we don't have a fresh one
+            message = await run_in_threadpool(get_message_local_first, db, current_user, message_id)
             if not message:
                 raise HTTPException(status_code=404, detail="Message not found")
             
@@ -208,18 +242,14 @@ async def generate_auto_reply_stream(
     message_id: str,
     request: AutoReplyRequest,
     current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
 ):
     """Generate a streaming AI auto-reply for a Gmail message."""
     if not current_user.google_access_token:
         raise HTTPException(status_code=400, detail="Gmail not connected")
     
     try:
-        gmail = GmailService(
-            access_token=current_user.google_access_token,
-            refresh_token=current_user.google_refresh_token
-        )
-        
-        message = gmail.get_message(message_id)
+        message = await run_in_threadpool(get_message_local_first, db, current_user, message_id)
         if not message:
             raise HTTPException(status_code=404, detail="Message not found")
         
@@ -391,7 +421,7 @@ def build_contextual_reply(sender_name: str, subject: str, context: dict, tone:
 
 
 @router.post("/gmail/send-reply/{message_id}")
-async def send_gmail_reply(
+def send_gmail_reply(
     message_id: str,
     request: SendReplyRequest,
     current_user: User = Depends(get_current_active_user),
@@ -402,13 +432,10 @@ async def send_gmail_reply(
         raise HTTPException(status_code=400, detail="Gmail not connected")
     
     try:
-        gmail = GmailService(
-            access_token=current_user.google_access_token,
-            refresh_token=current_user.google_refresh_token
-        )
+        gmail = get_gmail_service(db, current_user)
         
         # Get original message to extract sender
-        message = gmail.get_message(message_id)
+        message = get_message_local_first(db, current_user, message_id, need_body=False)
         if not message:
             raise HTTPException(status_code=404, detail="Message not found")
         
@@ -4,14 +4,17 @@ from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.mailbox import Mailbox
 from app.models.user import User
-from app.schemas.mailbox import MailboxCreate, MailboxUpdate, MailboxResponse, MailboxConnectionTest
+from app.schemas.mailbox import MailboxCreate, MailboxUpdate, MailboxResponse, MailboxConnectionTest, SyncRunResponse
 from app.core.security.deps import get_current_active_user
 from app.services.audit import create_audit_log
 from app.services.email import test_imap_connection, test_smtp_connection
 from app.utils.error_mapping import map_connection_error
 from app.core.security.encryption import encrypt_password, decrypt_password
 from app.models.job import Job
+from app.services.backfill import BACKFILL_JOB_TYPE, BACKFILL_PRIORITY
+from app.services.sync_telemetry import recent_sync_runs
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 
@@ -148,3 +151,104 @@ async def test_connection(
         results["smtp"] = {"success": smtp_success, "message": smtp_message}
         
     return results
+
+@router.get("/mailboxes/{mailbox_id}/sync-runs", response_model=List[SyncRunResponse])
+async def read_sync_runs(
+    mailbox_id: int,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Recent sync runs of a mailbox, newest first, with counts and per-phase timings."""
+    mailbox = db.query(Mailbox).filter(Mailbox.id == mailbox_id, Mailbox.user_id == current_user.id).first()
+    if not mailbox:
+        raise HTTPException(status_code=404, detail="Mailbox not found")
+    return recent_sync_runs(db, mailbox_id, min(limit, 100))
+
+@router.post("/mailboxes/{mailbox_id}/sync", status_code=status.HTTP_202_ACCEPTED)
+async def trigger_sync(
+    request: Request,
+    mailbox_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Sync a mailbox now. Requests made while a sync is queued or running
+    coalesce into it instead of starting another.
+    """
+    mailbox = db.query(Mailbox).filter(Mailbox.id == mailbox_id, Mailbox.user_id == current_user.id).first()
+    if not mailbox:
+        raise HTTPException(status_code=404, detail="Mailbox not found")
+    
+    now = datetime.utcnow()
+    if mailbox.sync_lease_expires_at and mailbox.sync_lease_expires_at > now:
+        return {"message": "Sync already running", "job_id": None}
+    
+    if mailbox.provider == "gmail" and not mailbox.imap_host:
+        # Gmail mailboxes are synced by the scheduler; make this one due now
+        mailbox.next_sync_at = now
+        db.commit()
+        return {"message": "Sync scheduled", "job_id": None}
+    
+    active_job = db.query(Job).filter(
+        Job.type == "sync_email",
+        Job.status.in_(["pending", "processing"]),
+        Job.payload["mailbox_id"].as_integer() == mailbox_id
+    ).first()
+    if active_job:
+        return {"message": "Sync already queued", "job_id": active_job.id}
+    
+    job = Job(
+        type="sync_email",
+        status="pending",
+        payload={"mailbox_id": mailbox_id},
+        created_at=now,
+        attempts=0
+    )
+    db.add(job)
+    mailbox.sync_status = "syncing"
+    db.commit()
+    db.refresh(job)
+    
+    await create_audit_log(db, "MAILBOX_SYNC_STARTED", user_id=current_user.id, request=request, details={"mailbox_id": mailbox_id, "job_id": job.id})
+    return {"message": "Sync started", "job_id": job.id}
+
+@router.post("/mailboxes/{mailbox_id}/backfill", status_code=status.HTTP_202_ACCEPTED)
+async def start_backfill(
+    request: Request,
+    mailbox_id: int,
+    chunk_size: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Queue a historical import of the whole mailbox (newest to oldest).
+    Runs below live syncs and resumes from its checkpoint after interruptions.
+    """
+    mailbox = db.query(Mailbox).filter(Mailbox.id == mailbox_id, Mailbox.user_id == current_user.id).first()
+    if not mailbox:
+        raise HTTPException(status_code=404, detail="Mailbox not found")
+    
+    # Only one backfill per mailbox at a time
+    active_job = db.query(Job).filter(
+        Job.type == BACKFILL_JOB_TYPE,
+        Job.status.in_(["pending", "processing"]),
+        Job.payload["mailbox_id"].as_integer() == mailbox_id
+    ).first()
+    if active_job:
+        return {"message": "Backfill already queued", "job_id": active_job.id}
+    
+    job = Job(
+        type=BACKFILL_JOB_TYPE,
+        status="pending",
+        priority=BACKFILL_PRIORITY,
+        payload={"mailbox_id": mailbox_id, "chunk_size": chunk_size},
+        created_at=datetime.utcnow(),
+        attempts=0
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    
+    await create_audit_log(db, "MAILBOX_BACKFILL_STARTED", user_id=current_user.id, request=request, details={"mailbox_id": mailbox_id, "job_id": job.id})
+    return {"message": "Backfill queued", "job_id": job.id}
@@ -10,6 +10,9 @@ from app.models.user import User
 from app.models.job import Job
 from app.models.email import Email
 from app.models.audit import AuditLog
+from app.services.gmail_sync import local_reads
+from app.services.sync_stats import load_cycle_stats, mailbox_sync_lag
+from app.services.sync_telemetry import latest_finished_runs
 
 router = APIRouter()
 
@@ -98,6 +101,115 @@ def get_performance_metrics(
     )
 
 
+# Upper bounds (seconds) of the cumulative sync-lag buckets
+SYNC_LAG_BUCKETS = (60, 300, 900, 3600, 21600, 86400)
+# Slowest mailboxes (by last run) exported with a mailbox_id label
+SYNC_TOP_MAILBOXES = 10
+
+
+def sync_metrics(db: Session) -> str:
+    """
+    Prometheus lines for the last sync cycle, sync lag and the mailboxes'
+    last runs, and local read hits. Mailbox-level figures are aggregated,
+    plus per-phase run times for the SYNC_TOP_MAILBOXES slowest mailboxes,
+    so the series count does not grow with the number of mailboxes.
+    """
+    lines = []
+    cycle = load_cycle_stats()
+    if cycle:
+        lines += [
+            "# HELP smartmailbox_sync_cycle_seconds Duration of the last mailbox sync cycle",
+            "# TYPE smartmailbox_sync_cycle_seconds gauge",
+            f"smartmailbox_sync_cycle_seconds {cycle['duration_seconds']}",
+            "",
+            "# HELP smartmailbox_sync_cycle_mailboxes Mailboxes in the last sync cycle by outcome",
+            "# TYPE smartmailbox_sync_cycle_mailboxes gauge",
+        ]
+        for outcome in ("succeeded", "failed", "timed_out", "skipped", "coalesced"):
+            lines.append(f'smartmailbox_sync_cycle_mailboxes{{outcome="{outcome}"}} {cycle.get(outcome, 0)}')
+        lines.append("")
+    
+    lag = list(mailbox_sync_lag(db).values())
+    lines += [
+        "# HELP smartmailbox_sync_lag_max_seconds Longest time since a scheduled mailbox last synced",
+        "# TYPE smartmailbox_sync_lag_max_seconds gauge",
+        f"smartmailbox_sync_lag_max_seconds {max(lag, default=0.0)}",
+        "",
+        "# HELP smartmailbox_sync_lag_mailboxes Scheduled mailboxes by time since their last sync (cumulative)",
+        "# TYPE smartmailbox_sync_lag_mailboxes gauge",
+    ]
+    for bound in SYNC_LAG_BUCKETS:
+        lines.append(f'smartmailbox_sync_lag_mailboxes{{le="{bound}"}} {sum(1 for v in lag if v <= bound)}')
+    lines.append(f'smartmailbox_sync_lag_mailboxes{{le="+Inf"}} {len(lag)}')
+    
+    runs = latest_finished_runs(db)
+    if runs:
+        durations = [run.duration_seconds or 0 for run in runs]
+        phases: Dict[str, float] = {}
+        for run in runs:
+            for phase, seconds in (run.phase_seconds or {}).items():
+                phases[phase] = phases.get(phase, 0.0) + seconds
+        lines += [
+            "",
+            "# HELP smartmailbox_sync_run_seconds Duration of the mailboxes' last sync runs",
+            "# TYPE smartmailbox_sync_run_seconds gauge",
+            f'smartmailbox_sync_run_seconds{{stat="max"}} {max(durations)}',
+            f'smartmailbox_sync_run_seconds{{stat="avg"}} {round(sum(durations) / len(durations), 3)}',
+            "",
+            "# HELP smartmailbox_sync_phase_seconds Time per phase summed over the mailboxes' last sync runs",
+            "# TYPE smartmailbox_sync_phase_seconds gauge",
+        ]
+        lines += [
+            f'smartmailbox_sync_phase_seconds{{phase="{phase}"}} {round(seconds, 3)}'
+            for phase, seconds in sorted(phases.items())
+        ]
+        lines += [
+            "",
+            "# HELP smartmailbox_sync_messages Messages in the mailboxes' last sync runs by outcome",
+            "# TYPE smartmailbox_sync_messages gauge",
+        ]
+        for outcome in ("scanned", "new", "updated", "skipped"):
+            total = sum(getattr(run, "messages_" + outcome) or 0 for run in runs)
+            lines.append(f'smartmailbox_sync_messages{{outcome="{outcome}"}} {total}')
+        lines += [
+            "",
+            "# HELP smartmailbox_sync_bytes Bytes transferred by the mailboxes' last sync runs",
+            "# TYPE smartmailbox_sync_bytes gauge",
+            f"smartmailbox_sync_bytes {sum(run.bytes_transferred or 0 for run in runs)}",
+        ]
+        
+        slowest = sorted(runs, key=lambda run: run.duration_seconds or 0, reverse=True)[:SYNC_TOP_MAILBOXES]
+        lines += [
+            "",
+            "# HELP smartmailbox_mailbox_sync_run_seconds Last sync run duration of the slowest mailboxes",
+            "# TYPE smartmailbox_mailbox_sync_run_seconds gauge",
+        ]
+        lines += [
+            f'smartmailbox_mailbox_sync_run_seconds{{mailbox_id="{run.mailbox_id}"}} {run.duration_seconds or 0}'
+            for run in slowest
+        ]
+        lines += [
+            "",
+            "# HELP smartmailbox_mailbox_sync_phase_seconds Time per phase in the slowest mailboxes' last sync run",
+            "# TYPE smartmailbox_mailbox_sync_phase_seconds gauge",
+        ]
+        for run in slowest:
+            for phase, seconds in sorted((run.phase_seconds or {}).items()):
+                lines.append(
+                    f'smartmailbox_mailbox_sync_phase_seconds{{mailbox_id="{run.mailbox_id}",phase="{phase}"}} {seconds}'
+                )
+    
+    reads = local_reads.stats()
+    lines += [
+        "",
+        "# HELP smartmailbox_gmail_message_reads_total Gmail message reads by source (hit = served locally)",
+        "# TYPE smartmailbox_gmail_message_reads_total counter",
+        f'smartmailbox_gmail_message_reads_total{{result="hit"}} {reads["hits"]}',
+        f'smartmailbox_gmail_message_reads_total{{result="miss"}} {reads["misses"]}',
+    ]
+    return "\n" + "\n".join(lines) + "\n"
+
+
 @router.get("/prometheus")
 def prometheus_metrics(db: Session = Depends(get_db)):
     """Prometheus-compatible metrics endpoint."""
@@ -127,5 +239,6 @@ smartmailbox_jobs_failed {jobs_failed}
 # TYPE smartmailbox_emails_total counter
 smartmailbox_emails_total {emails_total}
 """
+    metrics += sync_metrics(db)
     from fastapi.responses import PlainTextResponse
     return PlainTextResponse(content=metrics, media_type="text/plain")
@@ -1,7 +1,54 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+from app.models.email import EmailState
 
 class BulkDraftRequest(BaseModel):
     email_ids: List[int]
     instructions: str
     tone: str = "professional"
+
+class BulkEmailFilter(BaseModel):
+    """Same filters as the email list; an empty filter selects all of the user's email."""
+    mailbox_id: Optional[int] = None
+    folder: Optional[str] = None
+    is_read: Optional[bool] = None
+    q: Optional[str] = None
+
+class BulkEmailAction(BaseModel):
+    """
+    Changes applied to every selected email: either ``email_ids`` or
+    ``filter``. Send ``assigned_user_id: null`` to unassign.
+    """
+    email_ids: Optional[List[int]] = Field(None, min_length=1, max_length=1000)
+    filter: Optional[BulkEmailFilter] = None
+
+    is_read: Optional[bool] = None
+    is_flagged: Optional[bool] = None
+    folder: Optional[str] = None
+    state: Optional[EmailState] = None
+    assigned_user_id: Optional[int] = None
+    add_tags: List[str] = []  # Tag names; missing tags are created
+    remove_tag_ids: List[int] = []
+
+    @model_validator(mode="after")
+    def check_selection_and_changes(self):
+        if (self.email_ids is None) == (self.filter is None):
+            raise ValueError("Give exactly one of email_ids or filter")
+        if not (self.column_values() or self.add_tags or self.remove_tag_ids):
+            raise ValueError("No changes given")
+        return self
+
+    def column_values(self) -> dict:
+        """Email columns to set."""
+        values = {
+            name: getattr(self, name)
+            for name in ("is_read", "is_flagged", "folder", "state")
+            if getattr(self, name) is not None
+        }
+        if "assigned_user_id" in self.model_fields_set:
+            values["assigned_user_id"] = self.assigned_user_id
+        return values
+
+class BulkEmailActionResponse(BaseModel):
+    matched: int
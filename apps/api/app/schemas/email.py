@@ -26,6 +26,7 @@ class EmailBase(BaseModel):
     sender: str
     recipients: Optional[Any] = None # Or JSON
     subject: Optional[str] = None
+    snippet: Optional[str] = None
     folder: str
     state: str = "open"
     is_read: bool
@@ -35,6 +36,7 @@ class EmailBase(BaseModel):
     assigned_user_id: Optional[int] = None
     
 class EmailResponse(EmailBase):
+    """List item; bodies are only in EmailDetailResponse."""
     attachments: List[AttachmentResponse] = []
     tags: List[TagResponse] = []
 
@@ -47,6 +49,7 @@ class EmailDetailResponse(EmailResponse):
 
 class EmailListResponse(BaseModel):
     items: List[EmailResponse]
-    total: int
+    total: Optional[int] = None  # Only when requested with include_total
     page: int
     size: int
+    next_cursor: Optional[str] = None
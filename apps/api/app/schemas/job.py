@@ -5,6 +5,7 @@ from datetime import datetime
 class JobBase(BaseModel):
     type: str
     status: str
+    priority: Optional[int] = 0
     error: Optional[str] = None
 
 class JobCreate(JobBase):
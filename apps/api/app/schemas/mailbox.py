@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Dict
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
 
@@ -46,3 +46,23 @@ class MailboxConnectionTest(BaseModel):
     email_address: EmailStr
     password: str
 
+
+class SyncRunResponse(BaseModel):
+    id: int
+    mailbox_id: int
+    trigger: str
+    mode: Optional[str] = None
+    status: str
+    messages_scanned: int = 0
+    messages_new: int = 0
+    messages_updated: int = 0
+    messages_skipped: int = 0
+    bytes_transferred: int = 0
+    phase_seconds: Dict[str, float] = {}
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,176 @@
+"""
+Historical backfill for large mailboxes.
+
+The mailbox is walked newest-to-oldest in fixed-size chunks. After every
+chunk the cursor is saved to a ``SyncCheckpoint`` row, so a crashed or
+preempted backfill resumes where it stopped. Between chunks the runner
+yields to pending higher-priority jobs (live syncs, sends) by handing its
+own job back to the queue.
+"""
+import bisect
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.security.encryption import decrypt_password
+from app.integrations.imap.client import IMAPClient
+from app.models.job import Job
+from app.models.mailbox import Mailbox
+from app.services.gmail_service import GmailService, get_gmail_service
+from app.services.ingest import ingest_emails
+from app.services.sync_checkpoints import get_checkpoint, reset_checkpoint
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_JOB_TYPE = "backfill_mailbox"
+BACKFILL_PRIORITY = -10
+DEFAULT_CHUNK_SIZE = 200
+
+
+class BackfillRunner:
+    """Runs (or resumes) the backfill of one mailbox on behalf of a job."""
+
+    def __init__(self, db: Session, job: Job, mailbox: Mailbox, chunk_size: Optional[int] = None):
+        self.db = db
+        self.job = job
+        self.mailbox = mailbox
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self.checkpoint = get_checkpoint(db, mailbox.id, "backfill")
+        if self.checkpoint.is_complete:
+            # A new backfill after a finished one starts over from the newest message
+            reset_checkpoint(self.checkpoint)
+
+        previous = job.result or {}
+        self.inserted = previous.get("inserted", 0)
+        # IMAP bytes on the wire / uncompressed, accumulated across resumed runs
+        self.previous_bytes = (previous.get("bytes_on_wire", 0), previous.get("bytes_uncompressed", 0))
+        self.transfer_stats = None
+        self.run_processed = 0
+        self.run_started = time.monotonic()
+
+    def run(self) -> bool:
+        """
+        Process chunks until the mailbox is exhausted or higher-priority work is waiting.
+        Returns True when the backfill is complete, False when it yielded.
+        """
+        if self.mailbox.provider == "gmail":
+            complete = self._run_gmail()
+        else:
+            complete = self._run_imap()
+
+        if complete:
+            self.checkpoint.is_complete = True
+            self.checkpoint.completed_at = datetime.utcnow()
+        self.job.result = self.progress()
+        self.db.commit()
+        return complete
+
+    def progress(self) -> Dict[str, Any]:
+        """Current progress including throughput and estimated time remaining."""
+        checkpoint = self.checkpoint
+        elapsed = time.monotonic() - self.run_started
+        rate = self.run_processed / elapsed if elapsed > 0 else 0.0
+
+        eta_seconds = None
+        if checkpoint.is_complete:
+            eta_seconds = 0
+        elif checkpoint.total_count is not None and rate > 0:
+            remaining = max(checkpoint.total_count - checkpoint.processed_count, 0)
+            eta_seconds = round(remaining / rate)
+
+        progress = {
+            "mode": "backfill",
+            "processed": checkpoint.processed_count,
+            "total": checkpoint.total_count,
+            "inserted": self.inserted,
+            "messages_per_sec": round(rate, 2),
+            "eta_seconds": eta_seconds,
+            "complete": bool(checkpoint.is_complete),
+        }
+        if self.transfer_stats:
+            progress["compressed"] = self.transfer_stats["compressed"]
+            progress["bytes_on_wire"] = self.previous_bytes[0] + self.transfer_stats["bytes_on_wire"]
+            progress["bytes_uncompressed"] = self.previous_bytes[1] + self.transfer_stats["bytes_uncompressed"]
+        return progress
+
+    def _record_chunk(self, cursor: Optional[str], scanned: int, inserted: int) -> None:
+        """Persist the cursor and progress after a chunk has been ingested."""
+        self.checkpoint.cursor = cursor
+        self.checkpoint.processed_count = (self.checkpoint.processed_count or 0) + scanned
+        self.run_processed += scanned
+        self.inserted += inserted
+        self.job.result = self.progress()
+        self.db.commit()
+
+        progress = self.job.result
+        logger.info(
+            f"Backfill mailbox {self.mailbox.id}: {progress['processed']}/{progress['total']} "
+            f"({progress['messages_per_sec']} msg/s, eta {progress['eta_seconds']}s)"
+        )
+
+    def _should_yield(self) -> bool:
+        """True when a higher-priority job is waiting for the worker."""
+        return self.db.query(Job.id).filter(
+            Job.status == "pending",
+            Job.priority > (self.job.priority or 0)
+        ).first() is not None
+
+    def _run_imap(self) -> bool:
+        checkpoint = self.checkpoint
+        password = decrypt_password(self.mailbox.hashed_password)
+
+        with IMAPClient(self.mailbox.imap_host, self.mailbox.imap_port, self.mailbox.email_address, password) as client:
+            uid_validity, uids = client.list_uids("INBOX")
+            if checkpoint.uid_validity != uid_validity:
+                # UIDs from a different UIDVALIDITY epoch are meaningless
+                reset_checkpoint(checkpoint)
+                checkpoint.uid_validity = uid_validity
+            checkpoint.total_count = len(uids)
+            self.db.commit()
+
+            # Everything below the cursor UID is still to do
+            end = bisect.bisect_left(uids, int(checkpoint.cursor)) if checkpoint.cursor else len(uids)
+            while end > 0:
+                start = max(end - self.chunk_size, 0)
+                chunk = uids[start:end]
+                emails_data = client.fetch_by_uids(chunk, "INBOX")
+                self.transfer_stats = client.transfer_stats()
+                inserted = ingest_emails(self.db, self.mailbox, emails_data)
+                self._record_chunk(str(chunk[0]), len(chunk), inserted)
+                end = start
+
+                if end > 0 and self._should_yield():
+                    return False
+        return True
+
+    def _run_gmail(self) -> bool:
+        checkpoint = self.checkpoint
+        user = self.mailbox.user
+        if not user or not user.google_access_token:
+            raise Exception("Gmail not connected for mailbox owner")
+
+        gmail = get_gmail_service(self.db, user)
+        if checkpoint.total_count is None:
+            checkpoint.total_count = gmail.get_mailbox_stats().get("total_messages", 0)
+            self.db.commit()
+
+        # messages.list returns newest first; the page token is the cursor
+        while True:
+            result = gmail.list_messages(
+                max_results=self.chunk_size,
+                label_ids=["INBOX"],
+                page_token=checkpoint.cursor
+            )
+            refs = result.get("messages", [])
+            messages = gmail.get_messages([ref["id"] for ref in refs], format="metadata")
+            inserted = ingest_emails(self.db, self.mailbox, [GmailService.to_email_data(m) for m in messages])
+
+            next_page_token = result.get("nextPageToken")
+            self._record_chunk(next_page_token, len(refs), inserted)
+            if not next_page_token:
+                return True
+            if self._should_yield():
+                return False
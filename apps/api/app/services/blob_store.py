@@ -0,0 +1,169 @@
+"""
+Content-addressed storage for attachment bytes.
+
+Blobs are keyed by their SHA-256 digest and laid out as
+``<root>/ab/cd/abcd...`` so no directory grows unbounded. Identical
+attachments are stored once; the reference count of a blob is the number of
+``Attachment`` rows carrying its digest, and unreferenced blobs are removed
+by ``collect_garbage``.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import BinaryIO, Iterable, Iterator, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.attachment import Attachment
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """Filesystem blob store with atomic writes and SHA-256 deduplication."""
+
+    def __init__(self, root: str = None):
+        self.root = os.path.abspath(root or settings.ATTACHMENT_STORAGE_DIR)
+
+    def path_for(self, digest: str) -> str:
+        """Return the fan-out path of a blob."""
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path_for(digest))
+
+    def put(self, data: bytes) -> str:
+        """Store bytes and return their digest."""
+        digest, _ = self.put_stream([data])
+        return digest
+
+    def put_stream(self, chunks: Iterable[bytes]) -> Tuple[str, int]:
+        """
+        Store a stream of chunks and return (digest, size).
+        Data is hashed while it is written to a temp file, which is then
+        renamed into place so readers never observe a partial blob.
+        """
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            digest = hasher.hexdigest()
+            path = self.path_for(digest)
+            if os.path.exists(path):
+                # Already stored; refresh mtime so GC treats it as recently used
+                try:
+                    os.utime(path)
+                    os.remove(tmp_path)
+                    return digest, size
+                except FileNotFoundError:
+                    pass  # collected in between; store our copy instead
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            return digest, size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def open(self, digest: str) -> BinaryIO:
+        return open(self.path_for(digest), "rb")
+
+    def iter_chunks(self, digest: str) -> Iterator[bytes]:
+        """Yield a blob's content in chunks (for streaming responses)."""
+        with self.open(digest) as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def delete(self, digest: str) -> None:
+        try:
+            os.remove(self.path_for(digest))
+        except FileNotFoundError:
+            pass
+
+    def iter_digests(self) -> Iterator[str]:
+        """Yield the digest of every stored blob."""
+        if not os.path.isdir(self.root):
+            return
+        for level1 in os.listdir(self.root):
+            if len(level1) != 2:
+                continue  # skips tmp/
+            level1_path = os.path.join(self.root, level1)
+            for level2 in os.listdir(level1_path):
+                for name in os.listdir(os.path.join(level1_path, level2)):
+                    yield name
+
+    def ref_count(self, db: Session, digest: str) -> int:
+        """Number of attachment rows referencing a blob."""
+        return db.query(func.count(Attachment.id)).filter(Attachment.content_hash == digest).scalar()
+
+    def collect_garbage(self, db: Session, grace_seconds: int = 3600) -> int:
+        """
+        Delete blobs no attachment row references. Blobs modified within
+        ``grace_seconds`` are kept so rows from in-flight ingests can commit.
+        Returns the number of blobs removed.
+
+        A candidate is first renamed into ``tmp/`` so a concurrent
+        ``put_stream`` either re-creates it or has already refreshed its
+        mtime; the mtime and reference are then checked again and the blob
+        is put back if either changed.
+        """
+        referenced = {
+            row[0]
+            for row in db.query(Attachment.content_hash).filter(Attachment.content_hash.isnot(None)).distinct()
+        }
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        for digest in list(self.iter_digests()):
+            if digest in referenced:
+                continue
+            path = self.path_for(digest)
+            doomed = os.path.join(tmp_dir, f"gc-{digest}")
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                os.replace(path, doomed)
+            except FileNotFoundError:
+                continue
+            if os.path.getmtime(doomed) > cutoff or self.ref_count(db, digest):
+                os.replace(doomed, path)
+                continue
+            os.remove(doomed)
+            removed += 1
+
+        # Temp files left behind by interrupted writes
+        for name in os.listdir(tmp_dir):
+            tmp_path = os.path.join(tmp_dir, name)
+            try:
+                if os.path.getmtime(tmp_path) < cutoff:
+                    os.remove(tmp_path)
+            except FileNotFoundError:
+                pass  # a write finished or failed meanwhile
+
+        if removed:
+            logger.info(f"Removed {removed} unreferenced attachment blobs")
+        return removed
+
+
+blob_store = BlobStore()
@@ -0,0 +1,103 @@
+"""
+Bulk email changes: mark read, flag, move, assign and tag many emails at once.
+
+The selection (explicit ids or list filters, always restricted to the user's
+own mailboxes) is one SELECT that is counted once to verify ownership and
+then embedded as a subquery in each write: one UPDATE for the email columns,
+one INSERT ... SELECT for added tags and one DELETE for removed tags, however
+many emails are selected. The caller commits once.
+"""
+from typing import Dict
+
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db.mailbox_version import bump_mailbox_versions
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+from app.models.tag import Tag, email_tags
+from app.schemas.bulk_action import BulkEmailAction
+from app.services.search import apply_search
+
+
+class EmailsNotFound(Exception):
+    """Some of the requested email ids do not exist or belong to another user."""
+
+
+def _selection(db: Session, user_id: int, action: BulkEmailAction):
+    query = db.query(Email.id).join(Email.mailbox).filter(Mailbox.user_id == user_id)
+    if action.email_ids is not None:
+        return query.filter(Email.id.in_(set(action.email_ids)))
+
+    criteria = action.filter
+    if criteria.mailbox_id:
+        query = query.filter(Email.mailbox_id == criteria.mailbox_id)
+    if criteria.folder:
+        query = query.filter(Email.folder == criteria.folder)
+    if criteria.is_read is not None:
+        query = query.filter(Email.is_read == criteria.is_read)
+    if criteria.q:
+        query, _ = apply_search(db, query, criteria.q)
+    return query
+
+
+def _tag_ids(db: Session, names) -> list:
+    """Ids of the named tags, creating the missing ones (global tags, as in add_tag)."""
+    names = sorted(set(names))
+    existing = dict(db.query(Tag.name, Tag.id).filter(Tag.name.in_(names)).all())
+    missing = [name for name in names if name not in existing]
+    if missing:
+        db.execute(insert(Tag), [{"name": name} for name in missing])
+        existing.update(db.query(Tag.name, Tag.id).filter(Tag.name.in_(missing)).all())
+    return list(existing.values())
+
+
+def apply_bulk_action(db: Session, user_id: int, action: BulkEmailAction) -> int:
+    """
+    Apply ``action`` to the selected emails and return how many were
+    selected. Raises EmailsNotFound, before writing anything, when explicit
+    ids include emails the user does not own.
+    """
+    query = _selection(db, user_id, action)
+    per_mailbox: Dict[int, int] = dict(
+        query.with_entities(Email.mailbox_id, func.count(Email.id)).group_by(Email.mailbox_id).all()
+    )
+    matched = sum(per_mailbox.values())
+    if action.email_ids is not None and matched != len(set(action.email_ids)):
+        raise EmailsNotFound()
+    if not matched:
+        return 0
+
+    # Never correlated: the writes below target the emails table themselves
+    selected = query.statement.correlate(None)
+
+    values = action.column_values()
+    if values:
+        db.execute(
+            update(Email).where(Email.id.in_(selected)).values(**values),
+            execution_options={"synchronize_session": False},
+        )
+    if action.add_tags:
+        tag_ids = _tag_ids(db, action.add_tags)
+        already_tagged = exists().where(
+            email_tags.c.email_id == Email.id, email_tags.c.tag_id == Tag.id
+        )
+        db.execute(
+            insert(email_tags).from_select(
+                ["email_id", "tag_id"],
+                select(Email.id, Tag.id)
+                .join(Tag, Tag.id.in_(tag_ids))
+                .where(Email.id.in_(selected), ~already_tagged),
+            )
+        )
+    if action.remove_tag_ids:
+        db.execute(
+            delete(email_tags).where(
+                email_tags.c.email_id.in_(selected),
+                email_tags.c.tag_id.in_(action.remove_tag_ids),
+            )
+        )
+
+    # Core writes bypass the before_flush hook
+    bump_mailbox_versions(db, per_mailbox)
+    return matched
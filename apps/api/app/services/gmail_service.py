@@ -2,16 +2,89 @@
 Gmail API Service for fetching emails using OAuth tokens.
 """
 import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
-from concurrent.futures import ThreadPoolExecutor
+import httplib2
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
 import base64
+from datetime import datetime
 from email.mime.text import MIMEText
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.models.user import User
+from app.services.rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Per-user quota cost of the calls we make
+MESSAGE_GET_QUOTA_UNITS = 5
+MESSAGE_LIST_QUOTA_UNITS = 5
+MESSAGE_SEND_QUOTA_UNITS = 100
+HISTORY_LIST_QUOTA_UNITS = 2
+PROFILE_QUOTA_UNITS = 1
+LABEL_GET_QUOTA_UNITS = 1
+ATTACHMENT_GET_QUOTA_UNITS = 5
+# Metadata fetches: full structure but no body data, so attachment ids, names
+# and sizes come back while text and attachment bytes do not.
+_PART_FIELDS = 'partId,mimeType,filename,body(attachmentId,size)'
+METADATA_FIELDS = (
+    'id,threadId,labelIds,snippet,internalDate,'
+    f'payload({_PART_FIELDS},headers,parts({_PART_FIELDS},parts({_PART_FIELDS},parts({_PART_FIELDS}))))'
+)
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: HttpError) -> bool:
+    """Rate limits (429, or 403 *RateLimitExceeded) and transient server errors."""
+    status = error.resp.status
+    if status in RETRYABLE_STATUSES:
+        return True
+    return status == 403 and b'ratelimitexceeded' in (error.content or b'').lower()
+
+
+def _retry_after(error: HttpError) -> Optional[float]:
+    try:
+        return float(error.resp.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=None)
+def _discovery_document() -> str:
+    """
+    Gmail v1 discovery document bundled with googleapiclient, read once per process.
+    Kept as text: build_from_document mutates the parsed dict, so it is parsed per build.
+    """
+    return get_static_doc('gmail', 'v1')
+
+
+class HistoryExpired(Exception):
+    """The stored historyId is older than the history Gmail keeps; a full resync is needed."""
+
+
+class _CountingHttp(httplib2.Http):
+    """httplib2.Http that reports the size of every response body to ``on_response``."""
+
+    def __init__(self, on_response, **kwargs):
+        super().__init__(**kwargs)
+        self._on_response = on_response
+
+    def request(self, *args, **kwargs):
+        response, content = super().request(*args, **kwargs)
+        self._on_response(len(content or b''))
+        return response, content
 
 
 class GmailService:
@@ -22,8 +95,15 @@ class GmailService:
         'https://www.googleapis.com/auth/gmail.send',
     ]
     
-    def __init__(self, access_token: str, refresh_token: str = None):
-        """Initialize Gmail service with OAuth tokens."""
+    def __init__(self, access_token: str, refresh_token: str = None, user_key: str = "default"):
+        """Initialize Gmail service with OAuth tokens. ``user_key`` selects the rate-limit bucket."""
+        self.user_key = user_key
+        # Access token this client shares with the stored user row; the
+        # client's own token only differs after it refreshed itself
+        self.stored_token = access_token
+        # Response bytes received by this client (decoded), for sync telemetry
+        self.bytes_received = 0
+        self._bytes_lock = threading.Lock()
         self.credentials = Credentials(
             token=access_token,
             refresh_token=refresh_token,
@@ -37,7 +117,27 @@ class GmailService:
         if self.credentials.expired and self.credentials.refresh_token:
             self.credentials.refresh(Request())
         
-        self.service = build('gmail', 'v1', credentials=self.credentials)
+        credentials = self.credentials
+        
+        def new_http():
+            return AuthorizedHttp(
+                credentials,
+                http=_CountingHttp(self._count_bytes, timeout=settings.GMAIL_HTTP_TIMEOUT)
+            )
+        
+        def build_request(http, *args, **kwargs):
+            # httplib2 is not thread-safe, so every request gets its own Http
+            return HttpRequest(new_http(), *args, **kwargs)
+        
+        self.service = build_from_document(
+            _discovery_document(),
+            http=new_http(),
+            requestBuilder=build_request
+        )
+    
+    def _count_bytes(self, size: int) -> None:
+        with self._bytes_lock:
+            self.bytes_received += size
     
     def get_new_access_token(self) -> Optional[str]:
         """Return new access token if refreshed."""
@@ -45,44 +145,188 @@ class GmailService:
             return self.credentials.token
         return None
     
+    def persist_token(self, db: Session, user: User) -> None:
+        """
+        Write the access token back to the user once this client has refreshed
+        it. A token the client was merely built with is never written, so a
+        stale client cannot overwrite a newer login's token.
+        """
+        token = self.get_new_access_token()
+        if token and token != self.stored_token:
+            self.stored_token = token
+            if token != user.google_access_token:
+                user.google_access_token = token
+                db.commit()
+    
+    def _execute(self, request, units: int) -> Dict[str, Any]:
+        """
+        Execute one API request within the user's quota. Rate-limit and transient
+        errors are retried with backoff; anything else is logged and raised.
+        """
+        for attempt in range(settings.GMAIL_BATCH_MAX_RETRIES + 1):
+            rate_limiter.acquire('gmail', self.user_key, cost=units)
+            try:
+                result = request.execute()
+            except HttpError as error:
+                if not _is_retryable(error) or attempt == settings.GMAIL_BATCH_MAX_RETRIES:
+                    if error.resp.status != 404:
+                        logger.error(f'Gmail API error: {error}')
+                    raise
+                rate_limiter.backoff('gmail', self.user_key, _retry_after(error))
+                time.sleep(min(2 ** attempt, 32) * random.random())
+                continue
+            rate_limiter.success('gmail', self.user_key)
+            return result
+    
     def list_messages(self, max_results: int = 20, label_ids: List[str] = None, q: str = None, page_token: str = None) -> Dict[str, Any]:
         """List messages from Gmail inbox with pagination support."""
+        query_params = {
+            'userId': 'me',
+            'maxResults': max_results,
+        }
+        if label_ids:
+            query_params['labelIds'] = label_ids
+        if q:
+            query_params['q'] = q
+        if page_token:
+            query_params['pageToken'] = page_token
+        
+        results = self._execute(self.service.users().messages().list(**query_params), MESSAGE_LIST_QUOTA_UNITS)
+        return {
+            'messages': results.get('messages', []),
+            'nextPageToken': results.get('nextPageToken'),
+        }
+    
+    def get_profile(self) -> Dict[str, Any]:
+        """Get the mailbox profile, including the current historyId."""
+        return self._execute(self.service.users().getProfile(userId='me'), PROFILE_QUOTA_UNITS)
+    
+    def list_history(self, start_history_id: str, page_token: str = None) -> Dict[str, Any]:
+        """
+        List one page of mailbox changes since ``start_history_id``.
+        Raises HistoryExpired when Gmail no longer has history that far back.
+        """
+        query_params = {
+            'userId': 'me',
+            'startHistoryId': start_history_id,
+            'historyTypes': ['messageAdded', 'messageDeleted', 'labelAdded', 'labelRemoved'],
+            'maxResults': 500,
+        }
+        if page_token:
+            query_params['pageToken'] = page_token
+        
         try:
-            query_params = {
-                'userId': 'me',
-                'maxResults': max_results,
-            }
-            if label_ids:
-                query_params['labelIds'] = label_ids
-            if q:
-                query_params['q'] = q
-            if page_token:
-                query_params['pageToken'] = page_token
-            
-            results = self.service.users().messages().list(**query_params).execute()
-            return {
-                'messages': results.get('messages', []),
-                'nextPageToken': results.get('nextPageToken'),
-            }
+            results = self._execute(self.service.users().history().list(**query_params), HISTORY_LIST_QUOTA_UNITS)
+        except HttpError as error:
+            if error.resp.status == 404:
+                raise HistoryExpired(start_history_id) from error
+            raise
+        return {
+            'history': results.get('history', []),
+            'historyId': results.get('historyId'),
+            'nextPageToken': results.get('nextPageToken'),
+        }
+    
+    def _get_request(self, message_id: str, format: str):
+        """
+        Build a messages.get request. 'metadata' returns headers, snippet and the
+        MIME structure (for attachment metadata) without any body data.
+        """
+        if format == 'metadata':
+            return self.service.users().messages().get(
+                userId='me', id=message_id, format='full', fields=METADATA_FIELDS
+            )
+        return self.service.users().messages().get(userId='me', id=message_id, format=format)
+    
+    def get_message(self, message_id: str, format: str = 'full') -> Optional[Dict[str, Any]]:
+        """Get a specific message by ID, or None if it does not exist."""
+        try:
+            message = self._execute(self._get_request(message_id, format), MESSAGE_GET_QUOTA_UNITS)
         except HttpError as error:
-            print(f'Gmail API error: {error}')
-            return {'messages': [], 'nextPageToken': None}
+            if error.resp.status == 404:
+                return None
+            raise
+        return self._parse_message(message, body_fetched=format == 'full')
+    
+    def get_attachment(self, message_id: str, attachment_id: str) -> bytes:
+        """
+        Download one attachment's bytes. Gmail returns the whole attachment
+        base64-encoded in a single response, so it is held in memory.
+        """
+        result = self._execute(
+            self.service.users().messages().attachments().get(
+                userId='me', messageId=message_id, id=attachment_id
+            ),
+            ATTACHMENT_GET_QUOTA_UNITS
+        )
+        return base64.urlsafe_b64decode(result.get('data', ''))
+    
+    def get_messages(self, message_ids: List[str], format: str = 'full') -> List[Dict[str, Any]]:
+        """
+        Get several messages through the batch endpoint, preserving order.
+        Rate-limited items are retried in later batches with backoff; items
+        that fail otherwise are skipped. Use format='metadata' when only
+        headers and snippet are needed.
+        """
+        if not message_ids:
+            return []
+        
+        # Keep batches within one second of per-user quota
+        batch_size = max(1, min(settings.GMAIL_BATCH_SIZE, 100,
+                                settings.GMAIL_QUOTA_UNITS_PER_SEC // MESSAGE_GET_QUOTA_UNITS))
+        fetched: Dict[str, Dict[str, Any]] = {}
+        pending = list(dict.fromkeys(message_ids))
+        for attempt in range(settings.GMAIL_BATCH_MAX_RETRIES + 1):
+            if attempt:
+                time.sleep(min(2 ** attempt, 32) + random.random())
+            retry: List[str] = []
+            for start in range(0, len(pending), batch_size):
+                retry.extend(self._execute_batch(pending[start:start + batch_size], fetched, format))
+            pending = retry
+            if not pending:
+                break
+        else:
+            logger.warning(f'Gave up on {len(pending)} rate-limited Gmail messages')
+        
+        return [
+            self._parse_message(fetched[mid], body_fetched=format == 'full')
+            for mid in message_ids if mid in fetched
+        ]
     
-    def get_message(self, message_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific message by ID."""
+    def _execute_batch(
+        self, message_ids: List[str], fetched: Dict[str, Dict[str, Any]], format: str = 'full'
+    ) -> List[str]:
+        """Run one batch of messages.get calls. Returns the ids that should be retried."""
+        rate_limiter.acquire('gmail', self.user_key, cost=len(message_ids) * MESSAGE_GET_QUOTA_UNITS)
+        retry: List[str] = []
+        
+        def callback(request_id, response, exception):
+            if exception is None:
+                fetched[request_id] = response
+            elif isinstance(exception, HttpError) and _is_retryable(exception):
+                retry.append(request_id)
+            else:
+                logger.warning(f'Gmail API error fetching {request_id}: {exception}')
+        
+        batch = self.service.new_batch_http_request(callback=callback)
+        for message_id in message_ids:
+            batch.add(self._get_request(message_id, format), request_id=message_id)
         try:
-            message = self.service.users().messages().get(
-                userId='me',
-                id=message_id,
-                format='full'
-            ).execute()
-            return self._parse_message(message)
+            batch.execute()
         except HttpError as error:
-            print(f'Gmail API error: {error}')
-            return None
+            if not _is_retryable(error):
+                raise
+            # The whole batch was rejected; retry whatever did not complete
+            retry = [mid for mid in message_ids if mid not in fetched]
+        
+        if retry:
+            rate_limiter.backoff('gmail', self.user_key)
+        else:
+            rate_limiter.success('gmail', self.user_key)
+        return retry
     
-    def _parse_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse Gmail API message into simplified format."""
+    def _parse_message(self, message: Dict[str, Any], body_fetched: bool = True) -> Dict[str, Any]:
+        """Parse Gmail API message into simplified format (body is empty for metadata fetches)."""
         headers = {h['name']: h['value'] for h in message['payload'].get('headers', [])}
         
         # Get body
@@ -109,10 +353,62 @@ class GmailService:
             'body': body,
             'labels': message.get('labelIds', []),
             'is_read': 'UNREAD' not in message.get('labelIds', []),
+            'internal_date': message.get('internalDate'),
+            'body_fetched': body_fetched,
+            'attachments': self._attachment_parts(payload),
+        }
+
+    @staticmethod
+    def _attachment_parts(part: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Metadata of every attachment in a MIME tree (bytes are fetched separately)."""
+        attachments = []
+        body = part.get('body', {})
+        if part.get('filename') and body.get('attachmentId'):
+            attachments.append({
+                'attachment_id': body['attachmentId'],
+                'filename': part['filename'],
+                'content_type': part.get('mimeType', 'application/octet-stream'),
+                'size': body.get('size', 0),
+            })
+        for child in part.get('parts', []):
+            attachments.extend(GmailService._attachment_parts(child))
+        return attachments
+
+    @staticmethod
+    def to_email_data(message: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a parsed Gmail message to the dict shape used by the ingest service."""
+        internal_date = message.get('internal_date')
+        if internal_date:
+            received_at = datetime.utcfromtimestamp(int(internal_date) / 1000)
+        else:
+            received_at = datetime.utcnow()
+        
+        return {
+            'message_id': message['id'],
+            'sender': message['sender'],
+            'recipients': [message['to']],
+            'subject': message['subject'],
+            'body_text': message['body'] if message.get('body_fetched', True) else None,
+            'snippet': message['snippet'],
+            'is_read': message['is_read'],
+            'received_at': received_at,
+            'folder': 'INBOX',
+            'body_fetched': message.get('body_fetched', True),
+            # Downloaded on first use through the stored attachment id
+            'attachments': [
+                {
+                    'external_id': att['attachment_id'],
+                    'filename': att['filename'],
+                    'content_type': att['content_type'],
+                    'size': att['size'],
+                    'content': None,
+                }
+                for att in message.get('attachments', [])
+            ],
         }
     
     def get_inbox_messages(self, max_results: int = 20, page_token: str = None) -> Dict[str, Any]:
-        """Get messages from inbox with full details and pagination support."""
+        """Get inbox headers and snippets (no bodies) with pagination support."""
         result = self.list_messages(max_results=max_results, label_ids=['INBOX'], page_token=page_token)
         message_refs = result.get('messages', [])[:max_results]
         
@@ -122,12 +418,7 @@ class GmailService:
                 'nextPageToken': result.get('nextPageToken'),
             }
 
-        # Fetch message details in parallel
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            messages = list(executor.map(lambda ref: self.get_message(ref['id']), message_refs))
-            
-        # Filter out any None values if get_message failed
-        messages = [m for m in messages if m]
+        messages = self.get_messages([ref['id'] for ref in message_refs], format='metadata')
         
         return {
             'messages': messages,
@@ -141,19 +432,14 @@ class GmailService:
 
     def get_mailbox_stats(self) -> Dict[str, int]:
         """Get accurate mailbox stats from INBOX label."""
-        try:
-            results = self.service.users().labels().get(
-                userId='me',
-                id='INBOX'
-            ).execute()
-            
-            return {
-                'total_messages': results.get('messagesTotal', 0),
-                'unread_messages': results.get('messagesUnread', 0)
-            }
-        except HttpError as error:
-            print(f'Gmail API error fetching stats: {error}')
-            return {'total_messages': 0, 'unread_messages': 0}
+        results = self._execute(
+            self.service.users().labels().get(userId='me', id='INBOX'),
+            LABEL_GET_QUOTA_UNITS
+        )
+        return {
+            'total_messages': results.get('messagesTotal', 0),
+            'unread_messages': results.get('messagesUnread', 0)
+        }
 
     def send_email(self, to: str, subject: str, body: str) -> bool:
         """Send an email."""
@@ -164,11 +450,75 @@ class GmailService:
             
             encoded_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
             
-            self.service.users().messages().send(
-                userId='me',
-                body={'raw': encoded_message}
-            ).execute()
+            self._execute(
+                self.service.users().messages().send(userId='me', body={'raw': encoded_message}),
+                MESSAGE_SEND_QUOTA_UNITS
+            )
             return True
         except HttpError as error:
-            print(f'Gmail send error: {error}')
+            logger.error(f'Gmail send error: {error}')
             return False
+
+
+class GmailClientCache:
+    """
+    Per-user GmailService instances, bounded by LRU size and age.
+
+    A client is rebuilt when the user's stored access token is not the one
+    it holds: a login (in any process) or a refresh persisted by another
+    client replaced it. ``invalidate`` only reaches this process's cache.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[int] = None):
+        self.maxsize = maxsize or settings.GMAIL_CLIENT_CACHE_SIZE
+        self.ttl = ttl or settings.GMAIL_CLIENT_CACHE_TTL
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user: User) -> GmailService:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user.id)
+            if entry:
+                gmail, created_at = entry
+                if now - created_at < self.ttl and gmail.stored_token == user.google_access_token:
+                    self._entries.move_to_end(user.id)
+                    self.hits += 1
+                    return gmail
+                del self._entries[user.id]
+            self.misses += 1
+
+        gmail = GmailService(
+            access_token=user.google_access_token,
+            refresh_token=user.google_refresh_token,
+            user_key=str(user.id)
+        )
+        with self._lock:
+            self._entries[user.id] = (gmail, now)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return gmail
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+gmail_clients = GmailClientCache()
+
+
+def get_gmail_service(db: Session, user: User) -> GmailService:
+    """Cached Gmail client for a user; persists a refreshed access token once."""
+    gmail = gmail_clients.get(user)
+    gmail.persist_token(db, user)
+    return gmail
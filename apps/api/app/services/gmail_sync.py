@@ -0,0 +1,487 @@
+"""
+Incremental Gmail sync through the History API.
+
+Each mailbox stores the ``historyId`` it was last synced to. A cycle asks
+``users.history.list`` for everything that changed since then and applies
+only that: new INBOX messages are fetched and ingested, UNREAD label
+changes update ``is_read``, INBOX/TRASH/SPAM label changes move messages
+between folders (archived messages go to ARCHIVE) and deleted messages are
+moved to TRASH. When
+there is no stored historyId yet, or Gmail has expired it, the mailbox is
+resynced from ``messages.list`` instead.
+
+Sync fetches only headers, snippets and attachment metadata
+(``format='metadata'``); bodies are fetched the first time an email is
+opened or drafted against (``ensure_email_body``) and attachment bytes on
+first download (``ensure_attachment_content``).
+
+Single-message reads (``get_message_local_first``) are served from the
+local copy when the mailbox synced recently and go to Gmail only on a miss.
+
+The full resync walks every INBOX page and saves the page token to a
+``SyncCheckpoint`` after each page, so an interrupted resync resumes
+where it stopped. Fetching page N+1 from Gmail overlaps ingesting page N.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from googleapiclient.errors import HttpError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.mailbox_version import bump_mailbox_versions
+from app.models.attachment import Attachment
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+from app.models.user import User
+from app.services.blob_store import BlobStore, blob_store as default_blob_store
+from app.services.gmail_service import GmailService, HistoryExpired, get_gmail_service
+from app.services.ingest import ingest_emails
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.sync_checkpoints import get_checkpoint, reset_checkpoint
+from app.services.sync_telemetry import SyncRecorder
+
+logger = logging.getLogger(__name__)
+
+FULL_SYNC_MODE = "gmail_full_sync"
+FULL_SYNC_PAGE_SIZE = 100
+
+
+# System labels that decide an email's folder, strongest first
+FOLDER_LABELS = ('TRASH', 'SPAM', 'INBOX')
+
+
+def _folder_for(labels: Iterable[str]) -> str:
+    """Folder of a message with the given Gmail labels; ARCHIVE when none applies."""
+    return next((label for label in FOLDER_LABELS if label in labels), 'ARCHIVE')
+
+
+class HistoryChanges:
+    """Net effect of a run of Gmail history records."""
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.deleted: Set[str] = set()
+        self.read_state: Dict[str, bool] = {}
+        self.folders: Dict[str, str] = {}
+        self.history_id = None
+
+    def _move(self, record: Dict[str, Any]) -> None:
+        """Track the folder of messages whose INBOX, TRASH or SPAM labels changed in a record."""
+        added: Dict[str, Set[str]] = {}
+        removed: Dict[str, Set[str]] = {}
+        labels: Dict[str, List[str]] = {}
+        for key, changes in (('labelsAdded', added), ('labelsRemoved', removed)):
+            for item in record.get(key, []):
+                changed = {label for label in item.get('labelIds', []) if label in FOLDER_LABELS}
+                if not changed:
+                    continue
+                message = item['message']
+                changes.setdefault(message['id'], set()).update(changed)
+                if 'labelIds' in message:
+                    # Gmail sends the message's labels after the change
+                    labels[message['id']] = message['labelIds']
+
+        for message_id in dict.fromkeys([*added, *removed]):
+            if message_id in labels:
+                folder = _folder_for(labels[message_id])
+            else:
+                # Both lists apply together: untrash adds INBOX and removes TRASH,
+                # and trashing also removes INBOX without archiving the message
+                previous = self.folders.get(message_id)
+                current = {previous} if previous in FOLDER_LABELS else set()
+                current |= added.get(message_id, set())
+                folder = _folder_for(current - removed.get(message_id, set()))
+            self.folders[message_id] = folder
+
+    def apply_record(self, record: Dict[str, Any]) -> None:
+        for item in record.get('messagesAdded', []):
+            message = item['message']
+            if 'INBOX' in message.get('labelIds', []):
+                self.added.append(message['id'])
+        for item in record.get('labelsAdded', []):
+            message_id = item['message']['id']
+            if 'INBOX' in item.get('labelIds', []):
+                # Moved back into the inbox; fetched if we don't have it
+                self.added.append(message_id)
+            if 'UNREAD' in item.get('labelIds', []):
+                self.read_state[message_id] = False
+        for item in record.get('labelsRemoved', []):
+            if 'UNREAD' in item.get('labelIds', []):
+                self.read_state[item['message']['id']] = True
+        self._move(record)
+        for item in record.get('messagesDeleted', []):
+            self.deleted.add(item['message']['id'])
+
+
+def collect_history(gmail: GmailService, start_history_id: str) -> HistoryChanges:
+    """Read every history page since ``start_history_id``."""
+    changes = HistoryChanges()
+    page_token = None
+    while True:
+        page = gmail.list_history(start_history_id, page_token=page_token)
+        for record in page['history']:
+            changes.apply_record(record)
+        changes.history_id = page['historyId']
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return changes
+
+
+def _missing_ids(db: Session, message_ids: List[str]) -> List[str]:
+    """The given Gmail ids that are not stored yet, in order and without duplicates."""
+    unique_ids = list(dict.fromkeys(message_ids))
+    if not unique_ids:
+        return []
+    existing = {
+        row[0]
+        for row in db.query(Email.message_id).filter(Email.message_id.in_(unique_ids)).all()
+    }
+    return [message_id for message_id in unique_ids if message_id not in existing]
+
+
+def _fetch_and_ingest(
+    db: Session,
+    mailbox: Mailbox,
+    gmail: GmailService,
+    message_ids: List[str],
+    recorder: SyncRecorder,
+) -> int:
+    """Fetch and ingest the given Gmail ids that are not stored yet."""
+    with recorder.phase('list'):
+        missing = _missing_ids(db, message_ids)
+    if not missing:
+        return 0
+    with recorder.phase('fetch'):
+        messages = gmail.get_messages(missing, format='metadata')
+    with recorder.phase('parse'):
+        emails_data = [GmailService.to_email_data(m) for m in messages]
+    with recorder.phase('store'):
+        return ingest_emails(db, mailbox, emails_data)
+
+
+def _apply_changes(db: Session, mailbox: Mailbox, changes: HistoryChanges) -> Dict[str, int]:
+    updated = 0
+    for is_read in (True, False):
+        ids = [mid for mid, state in changes.read_state.items() if state is is_read and mid not in changes.deleted]
+        if ids:
+            updated += db.query(Email).filter(
+                Email.mailbox_id == mailbox.id,
+                Email.message_id.in_(ids)
+            ).update({Email.is_read: is_read}, synchronize_session=False)
+
+    moved = 0
+    by_folder: Dict[str, List[str]] = {}
+    for message_id, folder in changes.folders.items():
+        if message_id not in changes.deleted:
+            by_folder.setdefault(folder, []).append(message_id)
+    for folder, ids in by_folder.items():
+        moved += db.query(Email).filter(
+            Email.mailbox_id == mailbox.id,
+            Email.message_id.in_(ids),
+            Email.folder != folder
+        ).update({Email.folder: folder}, synchronize_session=False)
+
+    deleted = 0
+    if changes.deleted:
+        deleted = db.query(Email).filter(
+            Email.mailbox_id == mailbox.id,
+            Email.message_id.in_(list(changes.deleted))
+        ).update({Email.folder: "TRASH"}, synchronize_session=False)
+    if updated or moved or deleted:
+        bump_mailbox_versions(db, [mailbox.id])
+    return {"updated": updated, "moved": moved, "deleted": deleted}
+
+
+def _stream_inbox_pages(
+    db: Session,
+    gmail: GmailService,
+    page_token: Optional[str],
+    page_size: int,
+    recorder: SyncRecorder,
+) -> Iterator[Tuple[int, List[Dict[str, Any]], Optional[str]]]:
+    """
+    Yield ``(listed, new_messages, next_page_token)`` for each INBOX page.
+
+    All Gmail calls run on one background thread, so the service is never
+    used concurrently. The next page is listed and its missing messages are
+    fetched while the caller ingests the current page.
+    """
+    def list_page(token):
+        with recorder.phase('list'):
+            return gmail.list_messages(max_results=page_size, label_ids=['INBOX'], page_token=token)
+
+    def fetch_messages(message_ids):
+        with recorder.phase('fetch'):
+            return gmail.get_messages(message_ids, 'metadata')
+
+    def page_ids(page):
+        return [ref['id'] for ref in page.get('messages', [])]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = executor.submit(list_page, page_token).result()
+        fetch = executor.submit(fetch_messages, _missing_ids(db, page_ids(page)))
+        while True:
+            messages = fetch.result()
+            listed = len(page_ids(page))
+            next_page_token = page.get('nextPageToken')
+            if next_page_token:
+                # Page ids are distinct, so page N+1 can be deduplicated before page N is stored
+                page = executor.submit(list_page, next_page_token).result()
+                fetch = executor.submit(fetch_messages, _missing_ids(db, page_ids(page)))
+            yield listed, messages, next_page_token
+            if not next_page_token:
+                return
+
+
+def full_resync(
+    db: Session,
+    mailbox: Mailbox,
+    gmail: GmailService,
+    fence: Optional[Callable[[], None]] = None,
+    recorder: Optional[SyncRecorder] = None,
+) -> Dict[str, Any]:
+    """
+    Ingest the whole INBOX, resuming an interrupted resync from its checkpoint,
+    then start history tracking from the historyId taken when the resync began.
+    ``fence`` (e.g. ``MailboxLease.check``) is called before sync state is saved;
+    counts and phase timings go to ``recorder``.
+    """
+    fence = fence or (lambda: None)
+    recorder = recorder or SyncRecorder()
+    recorder.mode = 'full'
+
+    checkpoint = get_checkpoint(db, mailbox.id, FULL_SYNC_MODE)
+    if checkpoint.is_complete or not checkpoint.start_history_id:
+        reset_checkpoint(checkpoint)
+        # Taken before listing so changes made during the walk are replayed next cycle
+        checkpoint.start_history_id = str(gmail.get_profile()['historyId'])
+        checkpoint.total_count = gmail.get_mailbox_stats().get('total_messages')
+        db.commit()
+
+    inserted = 0
+    pages = _stream_inbox_pages(db, gmail, checkpoint.cursor, FULL_SYNC_PAGE_SIZE, recorder)
+    for listed, messages, next_page_token in pages:
+        with recorder.phase('parse'):
+            emails_data = [GmailService.to_email_data(m) for m in messages]
+        with recorder.phase('store'):
+            page_inserted = ingest_emails(db, mailbox, emails_data)
+        inserted += page_inserted
+        recorder.add(scanned=listed, new=page_inserted, skipped=listed - page_inserted)
+        fence()
+        checkpoint.cursor = next_page_token
+        checkpoint.processed_count = (checkpoint.processed_count or 0) + listed
+        db.commit()
+        logger.info(
+            f"Full sync {mailbox.email_address}: {checkpoint.processed_count}/{checkpoint.total_count}"
+        )
+
+    fence()
+    checkpoint.is_complete = True
+    checkpoint.completed_at = datetime.utcnow()
+    mailbox.gmail_history_id = checkpoint.start_history_id
+    db.commit()
+    return {"mode": "full", "inserted": inserted, "updated": 0, "moved": 0, "deleted": 0}
+
+
+def sync_gmail_mailbox(
+    db: Session,
+    mailbox: Mailbox,
+    gmail: GmailService,
+    fence: Optional[Callable[[], None]] = None,
+    recorder: Optional[SyncRecorder] = None,
+) -> Dict[str, Any]:
+    """
+    Bring a Gmail mailbox up to date, incrementally when possible.
+    Returns counts of inserted, updated (read state), moved (folder) and
+    deleted messages.
+    """
+    recorder = recorder or SyncRecorder()
+    if not mailbox.gmail_history_id:
+        return full_resync(db, mailbox, gmail, fence, recorder)
+
+    try:
+        with recorder.phase('list'):
+            changes = collect_history(gmail, mailbox.gmail_history_id)
+    except HistoryExpired:
+        logger.warning(f"History {mailbox.gmail_history_id} expired for {mailbox.email_address}; full resync")
+        return full_resync(db, mailbox, gmail, fence, recorder)
+    recorder.mode = 'history'
+
+    added = list(dict.fromkeys(mid for mid in changes.added if mid not in changes.deleted))
+    inserted = _fetch_and_ingest(db, mailbox, gmail, added, recorder)
+    with recorder.phase('store'):
+        counts = _apply_changes(db, mailbox, changes)
+    recorder.add(
+        scanned=len(set(changes.added) | set(changes.read_state) | set(changes.folders) | changes.deleted),
+        new=inserted,
+        # Folder moves, including to TRASH, count as updates
+        updated=counts['updated'] + counts['moved'] + counts['deleted'],
+        skipped=len(added) - inserted,
+    )
+
+    if fence:
+        fence()
+    if changes.history_id:
+        mailbox.gmail_history_id = str(changes.history_id)
+    db.commit()
+    return {"mode": "history", "inserted": inserted, **counts}
+
+
+def ensure_email_body(db: Session, email: Email) -> bool:
+    """
+    Fetch and store the body of a metadata-only Gmail email.
+    Returns True if the body is available; failures leave the email as it was.
+    """
+    if email.body_fetched is not False:
+        return True
+    user = email.mailbox.user if email.mailbox else None
+    if not user or not user.google_access_token:
+        return False
+
+    try:
+        message = get_gmail_service(db, user).get_message(email.message_id)
+    except (HttpError, RateLimitExceeded) as e:
+        logger.warning(f"Could not fetch body of email {email.id} from Gmail: {e}")
+        return False
+    if not message:
+        logger.warning(f"Could not fetch body of email {email.id} from Gmail")
+        return False
+    email.body_text = message['body']
+    email.body_fetched = True
+    db.commit()
+    return True
+
+
+def ensure_attachment_content(
+    db: Session,
+    attachment: Attachment,
+    blob_store: Optional[BlobStore] = None,
+) -> bool:
+    """
+    Download the bytes of a metadata-only Gmail attachment into the blob store.
+    Returns True if the content is available; failures leave it as it was.
+    """
+    if attachment.content_hash:
+        return True
+    if not attachment.external_id:
+        return False
+    email = attachment.email
+    user = email.mailbox.user if email and email.mailbox else None
+    if not user or not user.google_access_token:
+        return False
+
+    try:
+        data = get_gmail_service(db, user).get_attachment(email.message_id, attachment.external_id)
+    except (HttpError, RateLimitExceeded) as e:
+        logger.warning(f"Could not fetch attachment {attachment.id} from Gmail: {e}")
+        return False
+    blob_store = blob_store or default_blob_store
+    digest = blob_store.put(data)
+    attachment.content_hash = digest
+    attachment.storage_path = blob_store.path_for(digest)
+    attachment.size = len(data)
+    db.commit()
+    return True
+
+
+class LocalReadStats:
+    """Hit/miss counts for local-first message reads (per process)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+local_reads = LocalReadStats()
+
+
+def _is_fresh(mailbox: Mailbox, max_age: int) -> bool:
+    if not mailbox.last_synced_at:
+        return False
+    return datetime.utcnow() - mailbox.last_synced_at <= timedelta(seconds=max_age)
+
+
+def _local_message(email: Email) -> Dict[str, Any]:
+    """An Email row in the shape ``GmailService.get_message`` returns."""
+    labels = [email.folder] if email.folder else []
+    if not email.is_read:
+        labels.append('UNREAD')
+    recipients = email.recipients or []
+    return {
+        'id': email.message_id,
+        'thread_id': email.thread_id,
+        'subject': email.subject or '(No Subject)',
+        'sender': email.sender or '',
+        'to': ', '.join(r for r in recipients if r) if isinstance(recipients, list) else str(recipients),
+        'date': email.received_at.isoformat() if email.received_at else '',
+        'snippet': email.snippet or '',
+        'body': email.body_text or '',
+        'labels': labels,
+        'is_read': bool(email.is_read),
+        'internal_date': None,
+        'body_fetched': email.body_fetched is not False,
+    }
+
+
+def _fresh_local_email(
+    db: Session, user: User, message_id: str, max_age: Optional[int] = None
+) -> Optional[Email]:
+    """The user's local copy of a Gmail message if its mailbox synced within ``max_age`` seconds."""
+    max_age = settings.GMAIL_LOCAL_READ_MAX_AGE if max_age is None else max_age
+    email = db.query(Email).join(Mailbox).filter(
+        Email.message_id == message_id,
+        Mailbox.user_id == user.id,
+    ).first()
+    return email if email is not None and _is_fresh(email.mailbox, max_age) else None
+
+
+def read_message_local_first(
+    db: Session,
+    user: User,
+    message_id: str,
+    need_body: bool = True,
+    max_age: Optional[int] = None,
+) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Read a Gmail message from the local copy when its mailbox synced within
+    ``max_age`` seconds, otherwise from Gmail. A metadata-only copy costs one
+    body fetch when ``need_body`` is set, and keeps the body for next time.
+    Returns the message and whether it was served from the local copy.
+    """
+    email = _fresh_local_email(db, user, message_id, max_age)
+    if email is not None:
+        if not need_body or email.body_fetched is not False:
+            local_reads.record(hit=True)
+            return _local_message(email), True
+        if ensure_email_body(db, email):
+            local_reads.record(hit=False)
+            return _local_message(email), True
+
+    local_reads.record(hit=False)
+    return get_gmail_service(db, user).get_message(message_id), False
+
+
+def get_message_local_first(
+    db: Session,
+    user: User,
+    message_id: str,
+    need_body: bool = True,
+    max_age: Optional[int] = None,
+) -> Optional[Dict[str, Any]]:
+    """``read_message_local_first`` without the source."""
+    return read_message_local_first(db, user, message_id, need_body, max_age)[0]
@@ -0,0 +1,144 @@
+"""
+Batched ingest of synced messages.
+
+Each batch is deduplicated against the database with a single ``IN`` query,
+emails and attachments are written with multi-row inserts, and the batch is
+committed once. Inserts use ``ON CONFLICT DO NOTHING`` on PostgreSQL and
+SQLite so a concurrent sync of the same mailbox cannot fail the batch.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.mailbox_version import bump_mailbox_versions
+from app.models.attachment import Attachment
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+from app.services.blob_store import BlobStore, blob_store as default_blob_store
+
+logger = logging.getLogger(__name__)
+
+
+def _email_insert(db: Session):
+    """Build an INSERT for emails that skips Message-IDs that already exist."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(Email).on_conflict_do_nothing(index_elements=["message_id"])
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(Email).on_conflict_do_nothing(index_elements=["message_id"])
+    # Other backends rely on the IN pre-check alone
+    return insert(Email)
+
+
+def _email_row(mailbox: Mailbox, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a parsed message to an ``emails`` row. Every row has the same keys."""
+    return {
+        "mailbox_id": mailbox.id,
+        "message_id": data["message_id"],
+        "sender": data.get("sender"),
+        "recipients": data.get("recipients"),
+        "subject": data.get("subject"),
+        "body_text": data.get("body_text"),
+        "body_html": data.get("body_html"),
+        "snippet": data.get("snippet"),
+        "folder": data.get("folder") or "INBOX",
+        "is_read": data.get("is_read", False),
+        "received_at": data.get("received_at"),
+        "body_fetched": data.get("body_fetched", True),
+    }
+
+
+def ingest_email_batch(
+    db: Session,
+    mailbox: Mailbox,
+    emails_data: List[Dict[str, Any]],
+    blob_store: Optional[BlobStore] = None,
+) -> int:
+    """
+    Insert one batch of parsed messages for a mailbox and commit.
+    Returns the number of emails that were actually inserted.
+    """
+    # Keep the first occurrence of each Message-ID within the batch
+    unique: Dict[str, Dict[str, Any]] = {}
+    for data in emails_data:
+        unique.setdefault(data["message_id"], data)
+    if not unique:
+        return 0
+
+    existing = {
+        row[0]
+        for row in db.query(Email.message_id).filter(Email.message_id.in_(list(unique))).all()
+    }
+    new_data = [data for message_id, data in unique.items() if message_id not in existing]
+    if not new_data:
+        return 0
+
+    stmt = _email_insert(db).returning(Email.id, Email.message_id)
+    inserted = {
+        message_id: email_id
+        for email_id, message_id in db.execute(stmt, [_email_row(mailbox, d) for d in new_data])
+    }
+
+    # Attachments are written only for rows this batch inserted; rows that lost
+    # an insert race to another sync already own their attachments.
+    blob_store = blob_store or default_blob_store
+    attachment_rows = []
+    for data in new_data:
+        email_id = inserted.get(data["message_id"])
+        if email_id is None:
+            continue
+        for att_data in data.get("attachments", []):
+            external_id = att_data.get("external_id")
+            if att_data.get("content") is None and external_id:
+                # Metadata only; bytes are downloaded from the provider on first use
+                storage_path = digest = None
+            else:
+                digest = blob_store.put(att_data["content"] or b"")
+                storage_path = blob_store.path_for(digest)
+            attachment_rows.append({
+                "email_id": email_id,
+                "filename": att_data["filename"],
+                "content_type": att_data["content_type"],
+                "size": att_data["size"],
+                "storage_path": storage_path,
+                "content_hash": digest,
+                "external_id": external_id,
+            })
+    if attachment_rows:
+        db.execute(insert(Attachment), attachment_rows)
+    if inserted:
+        bump_mailbox_versions(db, [mailbox.id])
+
+    db.commit()
+    return len(inserted)
+
+
+def ingest_emails(
+    db: Session,
+    mailbox: Mailbox,
+    emails_data: Iterable[Dict[str, Any]],
+    blob_store: Optional[BlobStore] = None,
+    batch_size: Optional[int] = None,
+) -> int:
+    """
+    Ingest parsed messages in batches of ``batch_size`` (one commit per batch).
+    Returns the total number of new emails.
+    """
+    batch_size = batch_size or settings.SYNC_BATCH_SIZE
+    total = 0
+    batch: List[Dict[str, Any]] = []
+    for data in emails_data:
+        batch.append(data)
+        if len(batch) >= batch_size:
+            total += ingest_email_batch(db, mailbox, batch, blob_store)
+            batch = []
+    if batch:
+        total += ingest_email_batch(db, mailbox, batch, blob_store)
+
+    logger.info(f"Ingested {total} new emails for mailbox {mailbox.id}")
+    return total
@@ -1,15 +1,39 @@
 import asyncio
 import logging
 from typing import Optional, Dict, Any
+import httpx
 from app.integrations.llm.base import BaseLLMProvider, LLMResponse
 from app.integrations.llm.ollama import OllamaProvider
+from app.services.rate_limiter import rate_limiter
 
 logger = logging.getLogger(__name__)
 
+THROTTLE_STATUSES = {429, 503}
+
+
+def _throttle_response(error: BaseException) -> Optional[httpx.Response]:
+    """The provider's 429/503 response behind ``error``, if that is what caused it."""
+    while error is not None:
+        if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in THROTTLE_STATUSES:
+            return error.response
+        error = error.__cause__ or error.__context__
+    return None
+
 class LLMService:
     def __init__(self, provider: Optional[BaseLLMProvider] = None):
         # Use OllamaProvider with tinyllama for fast local generation (no quota limits)
         self.provider = provider or OllamaProvider()
+        # Rate-limit bucket, e.g. "gemini" or "ollama"
+        self.provider_name = type(self.provider).__name__.replace("Provider", "").lower()
+
+    def _record_failure(self, error: BaseException) -> None:
+        response = _throttle_response(error)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+            rate_limiter.backoff(self.provider_name, retry_after=retry_after)
 
     async def generate_draft(self, prompt: str, timeout: float = 30.0, params: Optional[Dict[str, Any]] = None) -> LLMResponse:
         """
@@ -17,6 +41,7 @@ class LLMService:
         """
         try:
             logger.info(f"Generating draft with model {getattr(self.provider, 'model', 'unknown')}")
+            await rate_limiter.acquire_async(self.provider_name)
             
             # Enforce overall operation timeout
             response = await asyncio.wait_for(
@@ -25,6 +50,7 @@ class LLMService:
             )
             
             logger.info(f"Generated {response.tokens_used} tokens in {response.latency_ms:.2f}ms")
+            rate_limiter.success(self.provider_name)
             return response
             
         except asyncio.TimeoutError:
@@ -33,6 +59,7 @@ class LLMService:
             
         except Exception as e:
             logger.error(f"LLM Generation failed: {str(e)}")
+            self._record_failure(e)
             raise e
 
     async def stream_draft(self, prompt: str, params: Optional[Dict[str, Any]] = None):
@@ -41,8 +68,11 @@ class LLMService:
         """
         try:
             logger.info(f"Streaming draft with model {getattr(self.provider, 'model', 'unknown')}")
+            await rate_limiter.acquire_async(self.provider_name)
             async for chunk in self.provider.stream(prompt, params):
                 yield chunk
+            rate_limiter.success(self.provider_name)
         except Exception as e:
             logger.error(f"LLM Streaming failed: {str(e)}")
+            self._record_failure(e)
             raise e
@@ -0,0 +1,259 @@
+"""
+Token-bucket rate limiting for outbound provider APIs (Gmail, LLM, SMTP).
+
+Buckets are keyed by provider and a caller-chosen key (user, mailbox, ...).
+Each bucket refills at ``rate`` tokens per second up to ``burst``. When a
+provider answers 429/503 the bucket's rate is halved (and optionally paused
+for Retry-After); every success restores a little of it, so throughput
+settles just under whatever the provider is actually granting.
+
+``LocalRateLimiter`` keeps buckets in process memory. ``RedisRateLimiter``
+keeps them in Redis so every API and worker process shares one budget.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Adaptive rate factor: multiplicative decrease on throttling, additive increase on success
+MIN_FACTOR = 0.05
+DECREASE = 0.5
+INCREASE = 0.05
+
+
+class RateLimitExceeded(Exception):
+    """Waiting for a token would take longer than the caller allows."""
+
+
+def default_limits(provider: str) -> Tuple[float, float]:
+    """(tokens per second, burst) for a provider when the caller gives none."""
+    if provider == "gmail":
+        # Quota units; e.g. messages.get costs 5
+        rate = float(settings.GMAIL_QUOTA_UNITS_PER_SEC)
+        return rate, rate
+    if provider == "smtp":
+        per_minute = float(settings.SMTP_SENDS_PER_MINUTE)
+        return per_minute / 60, max(per_minute / 6, 1.0)
+    per_minute = float(settings.LLM_REQUESTS_PER_MINUTE)
+    return per_minute / 60, max(per_minute / 6, 1.0)
+
+
+class RateLimiter:
+    """Shared acquire/backoff logic; subclasses store the buckets."""
+
+    def _reserve(self, bucket: str, cost: float, rate: float, burst: float) -> float:
+        """Take ``cost`` tokens if available. Returns 0, or seconds to wait before retrying."""
+        raise NotImplementedError
+
+    def _adjust(self, bucket: str, throttled: bool, retry_after: Optional[float]) -> None:
+        raise NotImplementedError
+
+    def _request(self, provider, key, cost, rate, burst, max_wait) -> Tuple[str, float, float, float, float]:
+        """Resolve defaults into (bucket, cost, rate, burst, max_wait)."""
+        default_rate, default_burst = default_limits(provider)
+        rate = rate or default_rate
+        burst = max(burst or default_burst, 1.0)
+        max_wait = settings.RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        # A cost above the burst could never be granted
+        return f"{provider}:{key}", min(cost, burst), rate, burst, max_wait
+
+    def acquire(
+        self,
+        provider: str,
+        key: str = "default",
+        cost: float = 1,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_wait: Optional[float] = None,
+    ) -> float:
+        """Block until ``cost`` tokens are granted. Returns the seconds spent waiting."""
+        bucket, cost, rate, burst, max_wait = self._request(provider, key, cost, rate, burst, max_wait)
+        waited = 0.0
+        while True:
+            wait = self._reserve(bucket, cost, rate, burst)
+            if wait <= 0:
+                return waited
+            if waited + wait > max_wait:
+                raise RateLimitExceeded(f"{bucket}: no capacity within {max_wait}s")
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(
+        self,
+        provider: str,
+        key: str = "default",
+        cost: float = 1,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        max_wait: Optional[float] = None,
+    ) -> float:
+        """``acquire`` for coroutines; waits without blocking the event loop."""
+        bucket, cost, rate, burst, max_wait = self._request(provider, key, cost, rate, burst, max_wait)
+        waited = 0.0
+        while True:
+            wait = self._reserve(bucket, cost, rate, burst)
+            if wait <= 0:
+                return waited
+            if waited + wait > max_wait:
+                raise RateLimitExceeded(f"{bucket}: no capacity within {max_wait}s")
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def backoff(self, provider: str, key: str = "default", retry_after: Optional[float] = None) -> None:
+        """Record a 429/503 from the provider: halve the rate, pause for Retry-After if given."""
+        logger.warning(f"Rate limited by {provider} ({key}); backing off")
+        self._adjust(f"{provider}:{key}", True, retry_after)
+
+    def success(self, provider: str, key: str = "default") -> None:
+        """Record a successful call so a reduced rate recovers."""
+        self._adjust(f"{provider}:{key}", False, None)
+
+
+class LocalRateLimiter(RateLimiter):
+    """Buckets in process memory."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # bucket -> [tokens, updated_at, factor, blocked_until]
+        self._buckets: Dict[str, list] = {}
+
+    def _state(self, bucket: str, burst: float, now: float) -> list:
+        state = self._buckets.get(bucket)
+        if state is None:
+            state = self._buckets[bucket] = [burst, now, 1.0, 0.0]
+        return state
+
+    def _reserve(self, bucket: str, cost: float, rate: float, burst: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(bucket, burst, now)
+            tokens, updated_at, factor, blocked_until = state
+            if blocked_until > now:
+                return blocked_until - now
+            effective_rate = rate * factor
+            tokens = min(burst, tokens + (now - updated_at) * effective_rate)
+            state[1] = now
+            if tokens >= cost:
+                state[0] = tokens - cost
+                return 0.0
+            state[0] = tokens
+            return (cost - tokens) / effective_rate
+
+    def _adjust(self, bucket: str, throttled: bool, retry_after: Optional[float]) -> None:
+        with self._lock:
+            state = self._buckets.get(bucket)
+            if state is None:
+                if not throttled:
+                    return
+                state = self._buckets[bucket] = [0.0, time.monotonic(), 1.0, 0.0]
+            if throttled:
+                state[2] = max(MIN_FACTOR, state[2] * DECREASE)
+                if retry_after:
+                    state[3] = max(state[3], time.monotonic() + retry_after)
+            elif state[2] < 1.0:
+                state[2] = min(1.0, state[2] + INCREASE)
+
+    def factor(self, provider: str, key: str = "default") -> float:
+        """Current adaptive rate factor (1.0 = full configured rate)."""
+        state = self._buckets.get(f"{provider}:{key}")
+        return state[2] if state else 1.0
+
+
+# Token bucket in one round trip. Uses the Redis server clock so all hosts agree.
+_RESERVE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local s = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'factor', 'blocked_until')
+local tokens = tonumber(s[1]) or burst
+local ts = tonumber(s[2]) or now
+local factor = tonumber(s[3]) or 1
+local blocked_until = tonumber(s[4]) or 0
+if blocked_until > now then
+    return tostring(blocked_until - now)
+end
+local effective = rate * factor
+tokens = math.min(burst, tokens + (now - ts) * effective)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / effective
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now), 'factor', tostring(factor))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(wait)
+"""
+
+_ADJUST_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local factor = tonumber(redis.call('HGET', KEYS[1], 'factor')) or 1
+if ARGV[1] == '1' then
+    factor = math.max(tonumber(ARGV[3]), factor * tonumber(ARGV[4]))
+    local retry_after = tonumber(ARGV[2])
+    if retry_after > 0 then
+        local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+        redis.call('HSET', KEYS[1], 'blocked_until', tostring(math.max(blocked_until, now + retry_after)))
+    end
+elseif factor < 1 then
+    factor = math.min(1, factor + tonumber(ARGV[5]))
+else
+    return 0
+end
+redis.call('HSET', KEYS[1], 'factor', tostring(factor))
+redis.call('EXPIRE', KEYS[1], 3600)
+return 1
+"""
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Buckets in Redis, shared by every process using the same REDIS_URL.
+    While Redis is unreachable, limiting falls back to this process alone.
+    """
+
+    PREFIX = "smartmailbox:ratelimit:"
+
+    def __init__(self, url: Optional[str] = None):
+        import redis
+        self._redis = redis.from_url(url or str(settings.REDIS_URL), socket_timeout=2)
+        self._reserve_script = self._redis.register_script(_RESERVE_SCRIPT)
+        self._adjust_script = self._redis.register_script(_ADJUST_SCRIPT)
+        self._fallback = LocalRateLimiter()
+
+    def _reserve(self, bucket: str, cost: float, rate: float, burst: float) -> float:
+        try:
+            return float(self._reserve_script(keys=[self.PREFIX + bucket], args=[rate, burst, cost]))
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, limiting locally: {e}")
+            return self._fallback._reserve(bucket, cost, rate, burst)
+
+    def _adjust(self, bucket: str, throttled: bool, retry_after: Optional[float]) -> None:
+        try:
+            self._adjust_script(
+                keys=[self.PREFIX + bucket],
+                args=["1" if throttled else "0", retry_after or 0, MIN_FACTOR, DECREASE, INCREASE]
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limiter unavailable, limiting locally: {e}")
+            self._fallback._adjust(bucket, throttled, retry_after)
+
+
+def _create_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        try:
+            return RedisRateLimiter()
+        except ImportError:
+            logger.warning("RATE_LIMIT_BACKEND=redis but redis is not installed; using local limiter")
+    return LocalRateLimiter()
+
+
+rate_limiter = _create_rate_limiter()
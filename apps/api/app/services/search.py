@@ -0,0 +1,154 @@
+"""
+Mail search over the full-text index (see ``app.db.search_index``).
+
+Query syntax, Gmail-like:
+- ``invoice march``: messages containing all the words (stemmed)
+- ``"quarterly report"``: the exact phrase
+- ``from:alice`` / ``subject:budget`` / ``body:contract``: restrict a word or
+  quoted phrase to one field, e.g. ``subject:"team offsite"``
+
+Results are ranked by relevance, with subject matches weighted above sender
+and body matches. Databases without a full-text index fall back to
+``ILIKE`` substring matching.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, column, func, literal, literal_column, or_, table
+from sqlalchemy.orm import Query, Session
+
+from app.db.search_index import FTS_TABLE
+from app.models.email import Email
+
+FIELDS = ("from", "subject", "body")
+
+# FTS5 column per field filter, and bm25 weights in column order (subject, sender, body)
+_FTS_COLUMNS = {"from": "sender", "subject": "subject", "body": "body"}
+_BM25_WEIGHTS = (10.0, 5.0, 1.0)
+# PostgreSQL: search_vector weight and text search config per field filter
+_TSVECTOR_WEIGHTS = {"subject": "A", "from": "B", "body": "C"}
+_TSVECTOR_CONFIGS = {"subject": "english", "from": "simple", "body": "english"}
+_WORD = re.compile(r"\w+")
+
+_TOKEN = re.compile(r'(?:(\w+):)?(?:"([^"]*)"?|(\S+))')
+
+emails_fts = table(FTS_TABLE, column("rowid"))
+# MATCH and bm25() take the FTS table itself as their column argument
+_fts_table_column = literal_column(FTS_TABLE)
+# Generated column, not mapped on Email since it only exists on PostgreSQL
+_search_vector = literal_column("emails.search_vector")
+
+
+@dataclass
+class SearchTerm:
+    text: str
+    field: Optional[str] = None  # None searches every field
+    phrase: bool = False
+
+
+@dataclass
+class ParsedQuery:
+    terms: List[SearchTerm] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+
+def parse_query(q: str) -> ParsedQuery:
+    """Split a search string into free words, phrases and field filters."""
+    parsed = ParsedQuery()
+    for match in _TOKEN.finditer(q or ""):
+        prefix, quoted, bare = match.groups()
+        name = prefix.lower() if prefix else None
+        if name not in FIELDS:
+            # Not a filter we know ("re:", "http:"): search the whole token
+            if prefix and bare is not None:
+                bare = f"{prefix}:{bare}"
+            elif prefix:
+                parsed.terms.append(SearchTerm(prefix))
+            name = None
+        text = (quoted if quoted is not None else bare).strip()
+        if text:
+            parsed.terms.append(SearchTerm(text, name, phrase=quoted is not None))
+    return parsed
+
+
+def _fts5_string(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def fts5_expression(parsed: ParsedQuery) -> str:
+    """An FTS5 MATCH expression; every term is quoted so user input is never parsed as FTS syntax."""
+    parts = []
+    for term in parsed.terms:
+        string = _fts5_string(term.text)
+        parts.append(f"{_FTS_COLUMNS[term.field]} : {string}" if term.field else string)
+    return " AND ".join(parts)
+
+
+def field_tsquery(term: SearchTerm) -> Optional[str]:
+    """
+    ``to_tsquery`` input for a field filter: the term's words as a phrase,
+    each quoted and restricted to the field's weight in ``search_vector``.
+    Sender words match as prefixes, so ``from:alice`` finds alice@example.com.
+    """
+    words = [word for word in term.text.lower().split() if _WORD.search(word)]
+    if not words:
+        return None
+    label = ("*" if term.field == "from" else "") + _TSVECTOR_WEIGHTS[term.field]
+    quoted = (word.replace("\\", "\\\\").replace("'", "''") for word in words)
+    return " <-> ".join(f"'{word}':{label}" for word in quoted)
+
+
+def _postgres_filter(parsed: ParsedQuery):
+    # One tsquery against the GIN-indexed search_vector; field filters are
+    # weight-restricted rather than separate per-column scans
+    free_text = " ".join(
+        f'"{t.text}"' if t.phrase else t.text for t in parsed.terms if t.field is None
+    )
+    queries = [func.websearch_to_tsquery("english", free_text)] if free_text else []
+    for term in parsed.terms:
+        expression = field_tsquery(term) if term.field else None
+        if expression:
+            queries.append(func.to_tsquery(_TSVECTOR_CONFIGS[term.field], expression))
+    if not queries:
+        return literal(False), literal(0)
+    tsquery = queries[0]
+    for query in queries[1:]:
+        tsquery = tsquery.op("&&")(query)
+    return _search_vector.op("@@")(tsquery), -func.ts_rank_cd(_search_vector, tsquery)
+
+
+def _ilike_filter(parsed: ParsedQuery):
+    columns = {"from": [Email.sender], "subject": [Email.subject], "body": [Email.body_text]}
+    everything = [Email.subject, Email.sender, Email.body_text]
+    conditions = [
+        or_(*[c.ilike(f"%{term.text}%") for c in columns.get(term.field, everything)])
+        for term in parsed.terms
+    ]
+    return and_(*conditions), literal(0)
+
+
+def apply_search(db: Session, query: Query, q: str) -> Tuple[Query, object]:
+    """
+    Restrict an Email query to matches of ``q``. Returns the query and a rank
+    expression to order by ascending (best match first).
+    """
+    parsed = parse_query(q)
+    if not parsed:
+        return query, literal(0)
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        rank = func.bm25(_fts_table_column, *_BM25_WEIGHTS)
+        query = query.join(emails_fts, emails_fts.c.rowid == Email.id).filter(
+            _fts_table_column.op("MATCH")(fts5_expression(parsed))
+        )
+        return query, rank
+    if dialect == "postgresql":
+        condition, rank = _postgres_filter(parsed)
+        return query.filter(condition), rank
+    condition, rank = _ilike_filter(parsed)
+    return query.filter(condition), rank
+
@@ -1,7 +1,15 @@
+import logging
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Optional
 from app.core.config import settings
+from app.services.rate_limiter import RateLimitExceeded, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Transient "slow down" replies from the relay
+THROTTLE_CODES = {421, 450, 451, 452}
 
 class SMTPService:
     def __init__(self):
@@ -11,11 +19,22 @@ class SMTPService:
         self.password = settings.SMTP_PASSWORD
         self.from_email = settings.EMAILS_FROM_EMAIL or self.user
 
-    def send_email(self, to_email: str, subject: str, body_html: str, body_text: str = None) -> bool:
+    def send_email(
+        self,
+        to_email: str,
+        subject: str,
+        body_html: str,
+        body_text: str = None,
+        rate_key: str = "default",
+        rate_per_minute: Optional[int] = None,
+    ) -> bool:
         """
-        Sends an email using SMTP.
+        Sends an email using SMTP, paced per ``rate_key`` (e.g. the sending mailbox).
         """
+        rate = rate_per_minute / 60 if rate_per_minute else None
+        burst = max(rate_per_minute / 6, 1.0) if rate_per_minute else None
         try:
+            rate_limiter.acquire("smtp", rate_key, rate=rate, burst=burst)
             msg = MIMEMultipart("alternative")
             msg["Subject"] = subject
             msg["From"] = self.from_email
@@ -37,8 +56,16 @@ class SMTPService:
                 
                 server.sendmail(self.from_email, to_email, msg.as_string())
             
+            rate_limiter.success("smtp", rate_key)
             return True
+        except RateLimitExceeded as e:
+            logger.warning(f"SMTP send deferred: {e}")
+            return False
+        except smtplib.SMTPResponseException as e:
+            logger.error(f"SMTP Error: {e}")
+            if e.smtp_code in THROTTLE_CODES:
+                rate_limiter.backoff("smtp", rate_key)
+            return False
         except Exception as e:
-            print(f"SMTP Error: {e}")
-            # In a real app, log with a proper logger
+            logger.error(f"SMTP Error: {e}")
             return False
@@ -0,0 +1,35 @@
+"""
+Resumable positions of long-running mailbox syncs.
+
+Historical backfill and the Gmail full sync each keep one ``SyncCheckpoint``
+row per mailbox, holding the cursor they resume from.
+"""
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.models.sync_checkpoint import SyncCheckpoint
+
+
+def get_checkpoint(db: Session, mailbox_id: int, mode: str) -> SyncCheckpoint:
+    """Return the checkpoint for a mailbox/mode, creating it if needed."""
+    checkpoint = db.query(SyncCheckpoint).filter(
+        SyncCheckpoint.mailbox_id == mailbox_id,
+        SyncCheckpoint.mode == mode
+    ).first()
+    if not checkpoint:
+        checkpoint = SyncCheckpoint(mailbox_id=mailbox_id, mode=mode, processed_count=0)
+        db.add(checkpoint)
+        db.commit()
+    return checkpoint
+
+
+def reset_checkpoint(checkpoint: SyncCheckpoint) -> None:
+    """Start the walk over from the beginning."""
+    checkpoint.cursor = None
+    checkpoint.start_history_id = None
+    checkpoint.processed_count = 0
+    checkpoint.total_count = None
+    checkpoint.is_complete = False
+    checkpoint.started_at = datetime.utcnow()
+    checkpoint.completed_at = None
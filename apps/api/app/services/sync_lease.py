@@ -0,0 +1,163 @@
+"""
+Mailbox sync leases.
+
+Only the holder of a mailbox's lease may sync it. A lease is taken with a
+single conditional UPDATE on the mailbox row (free, or expired), so it works
+across API and worker processes on any database. Each acquisition bumps
+``sync_fencing_token``; a holder that stalled past its TTL and lost the lease
+finds a different token on its next ``check()`` and stops before writing
+sync state.
+
+While held, the lease is renewed in the background every third of its TTL.
+A sync request that finds the lease taken coalesces into the running sync
+instead of repeating its work.
+"""
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.mailbox import Mailbox
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(Exception):
+    """Another process took over the mailbox sync; this holder must stop writing."""
+
+
+def default_owner(kind: str) -> str:
+    return f"{kind}:{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class MailboxLease:
+    """
+    Lease on one mailbox's sync. Use as a context manager after a successful
+    ``acquire()``, or via ``mailbox_lease``.
+    """
+
+    def __init__(
+        self,
+        mailbox_id: int,
+        owner: str,
+        ttl: Optional[int] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+    ):
+        self.mailbox_id = mailbox_id
+        self.owner = owner
+        self.ttl = ttl or settings.SYNC_LEASE_TTL
+        self.token: Optional[int] = None
+        self.holder: Optional[str] = None  # Current owner when acquire() failed
+        self._session_factory = session_factory
+        self._lost = False
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def acquire(self) -> bool:
+        """Take the lease if it is free or expired. Returns False if another holder has it."""
+        now = datetime.utcnow()
+        with self._session_factory() as db:
+            result = db.execute(
+                update(Mailbox)
+                .where(
+                    Mailbox.id == self.mailbox_id,
+                    or_(
+                        Mailbox.sync_lease_owner.is_(None),
+                        Mailbox.sync_lease_expires_at.is_(None),
+                        Mailbox.sync_lease_expires_at < now,
+                    )
+                )
+                .values(
+                    sync_lease_owner=self.owner,
+                    sync_lease_expires_at=now + timedelta(seconds=self.ttl),
+                    sync_fencing_token=func.coalesce(Mailbox.sync_fencing_token, 0) + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            row = db.query(Mailbox.sync_lease_owner, Mailbox.sync_fencing_token).filter(
+                Mailbox.id == self.mailbox_id
+            ).first()
+        if result.rowcount != 1 or row is None:
+            self.holder = row[0] if row else None
+            return False
+
+        self.token = row[1]
+        self._heartbeat = threading.Thread(
+            target=self._renew_loop, name=f"lease-{self.mailbox_id}", daemon=True
+        )
+        self._heartbeat.start()
+        return True
+
+    def _renew_loop(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            if not self.renew():
+                logger.error(f"Lost sync lease on mailbox {self.mailbox_id}")
+                return
+
+    def renew(self) -> bool:
+        """Extend the lease. Returns False (and marks it lost) if it was taken over."""
+        with self._session_factory() as db:
+            result = db.execute(
+                update(Mailbox)
+                .where(Mailbox.id == self.mailbox_id, Mailbox.sync_fencing_token == self.token)
+                .values(sync_lease_expires_at=datetime.utcnow() + timedelta(seconds=self.ttl))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        if result.rowcount != 1:
+            self._lost = True
+        return not self._lost
+
+    def check(self) -> None:
+        """Raise LeaseLost unless this holder's fencing token is still current."""
+        if not self._lost:
+            with self._session_factory() as db:
+                current = db.query(Mailbox.sync_fencing_token).filter(
+                    Mailbox.id == self.mailbox_id
+                ).scalar()
+            self._lost = current != self.token
+        if self._lost:
+            raise LeaseLost(f"Sync lease on mailbox {self.mailbox_id} was taken over")
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._heartbeat and self._heartbeat is not threading.current_thread():
+            self._heartbeat.join(timeout=5)
+        if self.token is None:
+            return
+        with self._session_factory() as db:
+            db.execute(
+                update(Mailbox)
+                .where(Mailbox.id == self.mailbox_id, Mailbox.sync_fencing_token == self.token)
+                .values(sync_lease_owner=None, sync_lease_expires_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        self.token = None
+
+    def __enter__(self) -> "MailboxLease":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.release()
+
+
+def mailbox_lease(
+    mailbox_id: int,
+    kind: str,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> Optional[MailboxLease]:
+    """Acquire a lease for ``kind`` ("worker", "job", ...), or None if the mailbox is already syncing."""
+    lease = MailboxLease(mailbox_id, default_owner(kind), session_factory=session_factory)
+    if lease.acquire():
+        return lease
+    logger.info(f"Mailbox {mailbox_id} is already syncing ({lease.holder}); coalescing")
+    return None
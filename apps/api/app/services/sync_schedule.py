@@ -0,0 +1,163 @@
+"""
+Adaptive per-mailbox sync scheduling.
+
+Every mailbox carries a ``next_sync_at``; the worker repeatedly takes the
+mailboxes that are due, earliest first, so the indexed column acts as a
+priority queue shared by all worker processes. After each sync the next
+interval is derived from:
+
+- arrival rate: a smoothed new-messages-per-hour estimate; the interval
+  aims for about one new message per sync, between SYNC_MIN_INTERVAL and
+  SYNC_MAX_INTERVAL;
+- user activity: while the owner is using the app the interval is capped
+  at SYNC_ACTIVE_INTERVAL;
+- failures: consecutive failures back off exponentially (with jitter) up
+  to SYNC_FAILURE_MAX_INTERVAL.
+
+Only Gmail API mailboxes whose owner has a Google token are scheduled
+(``scheduled_mailboxes``); IMAP mailboxes sync through sync_email jobs.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, case, func, or_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.mailbox import Mailbox
+from app.models.user import User
+
+# Weight of the latest observation in the arrival-rate average
+RATE_SMOOTHING = 0.3
+
+
+def scheduled_mailboxes():
+    """
+    Filter for the mailboxes the scheduler syncs: active Gmail mailboxes not
+    set up over IMAP (as in trigger_sync) whose owner has a Google token.
+    """
+    return and_(
+        Mailbox.is_active == True,
+        Mailbox.provider == "gmail",
+        or_(Mailbox.imap_host.is_(None), Mailbox.imap_host == ""),
+        Mailbox.user.has(User.google_access_token.isnot(None)),
+    )
+
+
+def _is_active(mailbox: Mailbox, now: datetime) -> bool:
+    return bool(
+        mailbox.last_activity_at
+        and now - mailbox.last_activity_at <= timedelta(seconds=settings.SYNC_ACTIVE_WINDOW)
+    )
+
+
+def next_interval(mailbox: Mailbox, now: datetime) -> int:
+    """Seconds until the next sync, from the mailbox's current schedule state."""
+    if mailbox.sync_failures:
+        backoff = settings.SYNC_MIN_INTERVAL * 2 ** min(mailbox.sync_failures, 16)
+        return int(min(backoff, settings.SYNC_FAILURE_MAX_INTERVAL) * random.uniform(0.8, 1.2))
+
+    rate = mailbox.arrival_rate or 0.0
+    interval = 3600 / rate if rate > 0 else settings.SYNC_MAX_INTERVAL
+    if _is_active(mailbox, now):
+        interval = min(interval, settings.SYNC_ACTIVE_INTERVAL)
+    return int(max(settings.SYNC_MIN_INTERVAL, min(interval, settings.SYNC_MAX_INTERVAL)))
+
+
+def record_sync_result(
+    db: Session,
+    mailbox: Mailbox,
+    inserted: int = 0,
+    failed: bool = False,
+    now: Optional[datetime] = None,
+) -> None:
+    """Update the arrival-rate estimate and failure count, then schedule the next sync."""
+    now = now or datetime.utcnow()
+    if failed:
+        mailbox.sync_failures = (mailbox.sync_failures or 0) + 1
+    else:
+        mailbox.sync_failures = 0
+        elapsed = (now - mailbox.last_synced_at).total_seconds() if mailbox.last_synced_at else 0
+        if elapsed > 0:
+            observed = inserted * 3600 / elapsed
+            previous = mailbox.arrival_rate or 0.0
+            mailbox.arrival_rate = RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * previous
+        mailbox.last_synced_at = now
+
+    mailbox.sync_interval = next_interval(mailbox, now)
+    mailbox.next_sync_at = now + timedelta(seconds=mailbox.sync_interval)
+    db.commit()
+
+
+def defer_sync(db: Session, mailbox_id: int, now: Optional[datetime] = None) -> None:
+    """
+    Push a due mailbox's next sync SYNC_ACTIVE_INTERVAL ahead, for a mailbox
+    that another process is already syncing (and will reschedule when done).
+    """
+    now = now or datetime.utcnow()
+    later = now + timedelta(seconds=settings.SYNC_ACTIVE_INTERVAL)
+    db.execute(
+        update(Mailbox)
+        .where(
+            Mailbox.id == mailbox_id,
+            or_(Mailbox.next_sync_at.is_(None), Mailbox.next_sync_at < later)
+        )
+        .values(next_sync_at=later)
+    )
+    db.commit()
+
+
+def due_mailbox_ids(db: Session, limit: int, now: Optional[datetime] = None) -> List[int]:
+    """Scheduled mailboxes whose next sync is due, most overdue (or never scheduled) first."""
+    now = now or datetime.utcnow()
+    rows = db.query(Mailbox.id).filter(
+        scheduled_mailboxes(),
+        or_(Mailbox.next_sync_at.is_(None), Mailbox.next_sync_at <= now)
+    ).order_by(
+        Mailbox.next_sync_at.is_(None).desc(),
+        Mailbox.next_sync_at.asc()
+    ).limit(limit).all()
+    return [row[0] for row in rows]
+
+
+def seconds_until_due(db: Session, now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds until the earliest scheduled sync (0 if one is due), or None if none is scheduled."""
+    now = now or datetime.utcnow()
+    if db.query(Mailbox.id).filter(scheduled_mailboxes(), Mailbox.next_sync_at.is_(None)).first():
+        return 0.0
+    earliest = db.query(Mailbox.next_sync_at).filter(
+        scheduled_mailboxes()
+    ).order_by(Mailbox.next_sync_at.asc()).limit(1).scalar()
+    if earliest is None:
+        return None
+    return max(0.0, (earliest - now).total_seconds())
+
+
+def mark_user_active(db: Session, user_id: int, now: Optional[datetime] = None) -> None:
+    """
+    Record that a user is looking at their mail and pull their mailboxes'
+    next sync forward to within SYNC_ACTIVE_INTERVAL. Cheap to call on every
+    request: it writes (one UPDATE and a commit) only for mailboxes not
+    marked within the last minute, otherwise it costs a single SELECT.
+    Failing mailboxes keep their backoff.
+    """
+    now = now or datetime.utcnow()
+    stale = and_(
+        Mailbox.user_id == user_id,
+        or_(Mailbox.last_activity_at.is_(None), Mailbox.last_activity_at < now - timedelta(seconds=60))
+    )
+    if not db.query(Mailbox.id).filter(stale).first():
+        return
+
+    soon = now + timedelta(seconds=settings.SYNC_ACTIVE_INTERVAL)
+    pull_forward = and_(func.coalesce(Mailbox.sync_failures, 0) == 0, Mailbox.next_sync_at > soon)
+    db.execute(
+        update(Mailbox)
+        .where(stale)
+        .values(
+            last_activity_at=now,
+            next_sync_at=case((pull_forward, soon), else_=Mailbox.next_sync_at),
+        )
+    )
+    db.commit()
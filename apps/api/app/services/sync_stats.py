@@ -0,0 +1,66 @@
+"""
+Mailbox sync cycle statistics.
+
+The worker publishes a summary of each sync cycle to Redis (best effort),
+and the API reads it back for the Prometheus endpoint. Per-mailbox lag is
+derived from ``Mailbox.last_synced_at``, so it needs no extra bookkeeping;
+the endpoint exports only its aggregates.
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.mailbox import Mailbox
+from app.services.sync_schedule import scheduled_mailboxes
+
+logger = logging.getLogger(__name__)
+
+SYNC_CYCLE_STATS_KEY = "smartmailbox:sync:last_cycle"
+
+
+def _redis():
+    import redis
+    return redis.from_url(str(settings.REDIS_URL), socket_timeout=2)
+
+
+def publish_cycle_stats(stats: Dict[str, Any]) -> None:
+    """Store the latest cycle summary; failures are logged, never raised."""
+    try:
+        _redis().set(SYNC_CYCLE_STATS_KEY, json.dumps(stats))
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not publish sync cycle stats: {e}")
+
+
+def load_cycle_stats() -> Optional[Dict[str, Any]]:
+    """The latest cycle summary, or None if unavailable."""
+    try:
+        raw = _redis().get(SYNC_CYCLE_STATS_KEY)
+    except ImportError:
+        return None
+    except Exception as e:
+        logger.warning(f"Could not load sync cycle stats: {e}")
+        return None
+    return json.loads(raw) if raw else None
+
+
+def mailbox_sync_lag(db: Session, now: Optional[datetime] = None) -> Dict[int, float]:
+    """
+    Seconds since each scheduled mailbox last synced (since creation if it
+    never has). Other mailboxes sync only on request, so their lag would
+    grow without bound.
+    """
+    now = now or datetime.utcnow()
+    rows = db.query(Mailbox.id, Mailbox.last_synced_at, Mailbox.created_at).filter(
+        scheduled_mailboxes()
+    ).all()
+    lag = {}
+    for mailbox_id, last_synced_at, created_at in rows:
+        reference = last_synced_at or created_at
+        lag[mailbox_id] = round((now - reference).total_seconds(), 1) if reference else 0.0
+    return lag
@@ -0,0 +1,111 @@
+"""
+Per-mailbox sync run telemetry.
+
+A ``SyncRecorder`` is threaded through one sync and accumulates counts, bytes
+and per-phase timings; ``start_sync_run`` / ``finish_sync_run`` persist it as
+a ``SyncRun`` row. Only the newest SYNC_RUN_HISTORY runs per mailbox are kept.
+
+Phases:
+- list: enumerating what changed (messages.list, history.list, IMAP SEARCH)
+- fetch: downloading messages
+- parse: mapping provider messages to email rows
+- store: database writes
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.sync_run import SyncRun
+
+PHASES = ("list", "fetch", "parse", "store")
+
+
+class SyncRecorder:
+    """Counters and phase timers for one sync. Safe to use from helper threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.mode: Optional[str] = None
+        self.scanned = 0
+        self.new = 0
+        self.updated = 0
+        self.skipped = 0
+        self.bytes_transferred = 0
+        self.phase_seconds: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + elapsed
+
+    def add(self, scanned: int = 0, new: int = 0, updated: int = 0, skipped: int = 0, bytes_transferred: int = 0) -> None:
+        with self._lock:
+            self.scanned += scanned
+            self.new += new
+            self.updated += updated
+            self.skipped += skipped
+            self.bytes_transferred += bytes_transferred
+
+
+def start_sync_run(db: Session, mailbox_id: int, trigger: str) -> SyncRun:
+    run = SyncRun(mailbox_id=mailbox_id, trigger=trigger, status="running", started_at=datetime.utcnow())
+    db.add(run)
+    db.commit()
+    return run
+
+
+def finish_sync_run(
+    db: Session,
+    run: SyncRun,
+    recorder: SyncRecorder,
+    status: str = "succeeded",
+    error: Optional[str] = None,
+) -> SyncRun:
+    """Store the recorder's numbers on the run and prune the mailbox's oldest runs."""
+    run.finished_at = datetime.utcnow()
+    run.duration_seconds = round((run.finished_at - run.started_at).total_seconds(), 3)
+    run.status = status
+    run.error = error
+    run.mode = recorder.mode
+    run.messages_scanned = recorder.scanned
+    run.messages_new = recorder.new
+    run.messages_updated = recorder.updated
+    run.messages_skipped = recorder.skipped
+    run.bytes_transferred = recorder.bytes_transferred
+    run.phase_seconds = {phase: round(seconds, 3) for phase, seconds in recorder.phase_seconds.items()}
+
+    keep_from = db.query(SyncRun.id).filter(
+        SyncRun.mailbox_id == run.mailbox_id
+    ).order_by(SyncRun.id.desc()).offset(settings.SYNC_RUN_HISTORY - 1).limit(1).scalar()
+    if keep_from is not None:
+        db.query(SyncRun).filter(
+            SyncRun.mailbox_id == run.mailbox_id,
+            SyncRun.id < keep_from
+        ).delete(synchronize_session=False)
+    db.commit()
+    return run
+
+
+def recent_sync_runs(db: Session, mailbox_id: int, limit: int = 20) -> List[SyncRun]:
+    return db.query(SyncRun).filter(
+        SyncRun.mailbox_id == mailbox_id
+    ).order_by(SyncRun.id.desc()).limit(limit).all()
+
+
+def latest_finished_runs(db: Session) -> List[SyncRun]:
+    """The most recent finished run of every mailbox."""
+    latest = db.query(func.max(SyncRun.id)).filter(
+        SyncRun.status != "running"
+    ).group_by(SyncRun.mailbox_id)
+    return db.query(SyncRun).filter(SyncRun.id.in_(latest)).order_by(SyncRun.mailbox_id).all()
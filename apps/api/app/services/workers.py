@@ -3,13 +3,14 @@ from app.db.session import SessionLocal
 from app.models.job import Job
 from app.models.mailbox import Mailbox
 from app.models.email import Email
-from app.models.attachment import Attachment
 from app.integrations.imap.client import IMAPClient
 from app.core.security.encryption import decrypt_password
+from app.services.gmail_sync import ensure_email_body
+from app.services.ingest import ingest_emails
+from app.services.sync_lease import mailbox_lease
+from app.services.sync_telemetry import SyncRecorder, finish_sync_run, start_sync_run
 from datetime import datetime
 import logging
-import os
-import uuid
 
 from app.models.draft import Draft
 from app.services.llm import LLMService
@@ -18,13 +19,15 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
-STORAGE_DIR = "d:/projects/smartmailbox/storage/attachments" # Ideally from config
-
 def process_sync_email_job(job_id: int):
     """
     Worker function to sync emails for a specific mailbox defined in the job payload.
+    If the mailbox is already being synced elsewhere, the job completes as
+    coalesced into that sync.
     """
     db = SessionLocal()
+    lease = run = None
+    recorder = SyncRecorder()
     try:
         job = db.query(Job).filter(Job.id == job_id).first()
         if not job:
@@ -41,6 +44,17 @@ def process_sync_email_job(job_id: int):
         if not mailbox:
             raise Exception(f"Mailbox {mailbox_id} not found")
 
+        lease = mailbox_lease(mailbox.id, "job", session_factory=SessionLocal)
+        if lease is None:
+            job.result = {"synced_count": 0, "coalesced": True}
+            job.status = "completed"
+            job.completed_at = datetime.utcnow()
+            db.commit()
+            return
+
+        run = start_sync_run(db, mailbox.id, "job")
+        recorder.mode = "imap"
+
         # Decrypt password
         try:
             password = decrypt_password(mailbox.hashed_password)
@@ -49,57 +63,24 @@ def process_sync_email_job(job_id: int):
 
         # Connect IMAP
         with IMAPClient(mailbox.imap_host, mailbox.imap_port, mailbox.email_address, password) as client:
-            # Sync Logic (simplified for now: fetch last 10)
+            # Sync Logic (simplified for now: fetch the latest few)
             # In a real system, we would track the last synced UID per folder
-            emails_data = client.fetch_emails("INBOX", limit=5)
+            # fetch_emails searches, downloads and parses in one pass
+            with recorder.phase("fetch"):
+                emails_data = client.fetch_emails("INBOX", limit=job.payload.get("limit", 5))
             
-            synced_count = 0
-            for email_data in emails_data:
-                # Check duplication by Message-ID
-                existing = db.query(Email).filter(Email.message_id == email_data["message_id"]).first()
-                if existing:
-                    continue
-                
-                # Create Email
-                new_email = Email(
-                    mailbox_id=mailbox.id,
-                    message_id=email_data["message_id"],
-                    sender=email_data["sender"],
-                    recipients=email_data["recipients"],
-                    subject=email_data["subject"],
-                    body_text=email_data["body_text"],
-                    body_html=email_data["body_html"],
-                    received_at=email_data["received_at"],
-                    folder=email_data["folder"]
-                )
-                db.add(new_email)
-                db.flush() # Get ID
-                
-                # Handle Attachments
-                for att_data in email_data.get("attachments", []):
-                    # Save file to disk
-                    if not os.path.exists(STORAGE_DIR):
-                        os.makedirs(STORAGE_DIR, exist_ok=True)
-                    
-                    unique_filename = f"{uuid.uuid4()}_{att_data['filename']}"
-                    file_path = os.path.join(STORAGE_DIR, unique_filename)
-                    
-                    with open(file_path, "wb") as f:
-                        f.write(att_data["content"])
-                        
-                    # Create Attachment Record
-                    attachment = Attachment(
-                        email_id=new_email.id,
-                        filename=att_data["filename"],
-                        content_type=att_data["content_type"],
-                        size=att_data["size"],
-                        storage_path=file_path
-                    )
-                    db.add(attachment)
-                
-                synced_count += 1
+            with recorder.phase("store"):
+                synced_count = ingest_emails(db, mailbox, emails_data)
+            recorder.add(
+                scanned=len(emails_data),
+                new=synced_count,
+                skipped=len(emails_data) - synced_count,
+                bytes_transferred=client.transfer_stats()["bytes_on_wire"],
+            )
+            # Don't record sync state if another process has taken over
+            lease.check()
             
-            job.result = {"synced_count": synced_count}
+            job.result = {"synced_count": synced_count, **client.transfer_stats()}
             job.status = "completed"
             job.completed_at = datetime.utcnow()
             
@@ -108,6 +89,7 @@ def process_sync_email_job(job_id: int):
             mailbox.last_synced_at = datetime.utcnow()
             
             db.commit()
+            finish_sync_run(db, run, recorder)
             
     except Exception as e:
         logger.error(f"Job {job_id} failed: {e}")
@@ -127,9 +109,12 @@ def process_sync_email_job(job_id: int):
                 pass
                 
             db.commit()
-            db.commit()
+            if run:
+                finish_sync_run(db, run, recorder, status="failed", error=str(e))
     finally:
         db.close()
+        if lease:
+            lease.release()
 
 def generate_draft_job(job_id: int):
     """
@@ -158,6 +143,8 @@ def generate_draft_job(job_id: int):
         if not email:
             raise Exception(f"Email {email_id} not found")
 
+        ensure_email_body(db, email)
+
         # Build Prompt
         prompt = prompt_builder.build_draft_prompt(
             target_email=email,
@@ -258,7 +245,9 @@ def process_send_email_job(job_id: int):
                 to_email=recipient,
                 subject=subject,
                 body_html=body_html,
-                body_text=body_text
+                body_text=body_text,
+                rate_key=str(original_email.mailbox_id),
+                rate_per_minute=original_email.mailbox.send_rate_limit
             )
             if sent:
                 break
@@ -430,3 +419,87 @@ def generate_embedding_job(job_id: int):
             db.commit()
     finally:
         db.close()
+
+
+def process_attachment_gc_job(job_id: int):
+    """
+    Worker function to remove attachment blobs no longer referenced by any Attachment row.
+    Job payload: { grace_seconds: int } (optional)
+    """
+    from app.services.blob_store import blob_store
+    
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            return
+        
+        job.status = "processing"
+        job.started_at = datetime.utcnow()
+        db.commit()
+        
+        grace_seconds = (job.payload or {}).get("grace_seconds", 3600)
+        removed = blob_store.collect_garbage(db, grace_seconds=grace_seconds)
+        
+        job.result = {"removed_blobs": removed}
+        job.status = "completed"
+        job.completed_at = datetime.utcnow()
+        db.commit()
+        
+    except Exception as e:
+        logger.error(f"Attachment GC failed for job {job_id}: {e}")
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.error = str(e)
+            job.completed_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
+
+
+def process_backfill_job(job_id: int):
+    """
+    Worker function to import a mailbox's history in checkpointed chunks.
+    Job payload: { mailbox_id: int, chunk_size: int (optional) }
+    If higher-priority jobs arrive the job is put back to 'pending' and resumes later.
+    """
+    from app.services.backfill import BackfillRunner
+    
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            logger.error(f"Job {job_id} not found")
+            return
+        
+        job.status = "processing"
+        job.started_at = job.started_at or datetime.utcnow()
+        job.attempts += 1
+        db.commit()
+        
+        mailbox_id = job.payload.get("mailbox_id")
+        mailbox = db.query(Mailbox).filter(Mailbox.id == mailbox_id).first()
+        if not mailbox:
+            raise Exception(f"Mailbox {mailbox_id} not found")
+        
+        runner = BackfillRunner(db, job, mailbox, chunk_size=job.payload.get("chunk_size"))
+        if runner.run():
+            job.status = "completed"
+            job.completed_at = datetime.utcnow()
+        else:
+            # Yielded to live work; the checkpoint lets the next run continue
+            job.status = "pending"
+        db.commit()
+        
+    except Exception as e:
+        logger.error(f"Backfill job {job_id} failed: {e}")
+        db.rollback()
+        job = db.query(Job).filter(Job.id == job_id).first()
+        if job:
+            job.status = "failed"
+            job.error = str(e)
+            job.completed_at = datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,31 @@
+"""
+Conditional GET support: ETag / If-None-Match revalidation.
+
+Responses are marked ``Cache-Control: private, no-cache`` so browsers keep
+them but revalidate every time; an unchanged view then costs a 304 with no
+body instead of a full query and serialization.
+"""
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def conditional_response(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Tag ``response`` with ``etag``. Returns a 304 response to send instead if
+    the client already has this version, otherwise None.
+    """
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
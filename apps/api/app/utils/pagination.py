@@ -0,0 +1,72 @@
+"""
+Keyset (cursor) pagination for email listings.
+
+Emails are ordered newest first by ``(received_at, id)``. A page is the next
+``limit`` rows after the last row of the previous page, so every page costs
+the same index range scan however deep it is, unlike ``OFFSET`` which reads
+and discards all earlier rows. The cursor is an opaque token encoding the
+last row's sort key.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+from app.models.email import Email
+
+
+class InvalidCursor(ValueError):
+    """The page token is malformed or was not issued by this API."""
+
+
+def encode_cursor(email: Email) -> str:
+    key = [email.received_at.isoformat() if email.received_at else None, email.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Optional[datetime], int]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        received_at, email_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(received_at) if received_at else None), int(email_id)
+    except (ValueError, TypeError, json.JSONDecodeError) as e:
+        raise InvalidCursor(f"Invalid page token: {token}") from e
+
+
+def _after(received_at: Optional[datetime], email_id: int):
+    """Rows that sort after the cursor in (received_at DESC NULLS LAST, id DESC) order."""
+    if received_at is None:
+        return and_(Email.received_at.is_(None), Email.id < email_id)
+    return or_(
+        Email.received_at < received_at,
+        and_(Email.received_at == received_at, Email.id < email_id),
+        Email.received_at.is_(None),
+    )
+
+
+def keyset_page(
+    query: Query, limit: int, cursor: Optional[str] = None, offset: int = 0
+) -> Tuple[List[Email], Optional[str]]:
+    """
+    Return one page of ``query`` (an Email query) newest first, and the cursor
+    of the next page (None on the last page). Raises InvalidCursor.
+
+    ``offset`` skips rows in the same order, for older clients that page by
+    position; the cursor it returns continues from the last row as usual.
+    """
+    if cursor:
+        query = query.filter(_after(*decode_cursor(cursor)))
+    query = query.order_by(
+        Email.received_at.desc().nulls_last(),
+        Email.id.desc()
+    )
+    if offset:
+        query = query.offset(offset)
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
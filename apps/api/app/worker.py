@@ -1,21 +1,68 @@
 import time
 import logging
+from datetime import datetime, timedelta
+from typing import Optional
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.db.session import SessionLocal
 from app.models.job import Job
-from app.services.workers import process_send_email_job, process_sync_email_job, generate_draft_job, process_bulk_draft_orchestrator, generate_embedding_job
+from app.services.workers import process_send_email_job, process_sync_email_job, generate_draft_job, process_bulk_draft_orchestrator, generate_embedding_job, process_attachment_gc_job, process_backfill_job
+from app.services.backfill import BACKFILL_JOB_TYPE
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Seconds between checks for whether attachment GC is due
+GC_CHECK_INTERVAL = 60
+
+def requeue_interrupted_backfills():
+    """Put backfills that were running when the worker died back in the queue; they resume from their checkpoint."""
+    with SessionLocal() as db:
+        count = db.query(Job).filter(
+            Job.type == BACKFILL_JOB_TYPE,
+            Job.status == "processing"
+        ).update({"status": "pending"}, synchronize_session=False)
+        db.commit()
+        if count:
+            logger.info(f"Requeued {count} interrupted backfill job(s)")
+
+def schedule_attachment_gc(db: Session, now: Optional[datetime] = None) -> bool:
+    """
+    Queue a gc_attachments job unless one was queued within
+    ATTACHMENT_GC_INTERVAL. The jobs table is the shared clock, so about one
+    sweep is queued per interval however many workers run. Returns True if
+    queued.
+    """
+    now = now or datetime.utcnow()
+    recent = db.query(Job.id).filter(
+        Job.type == "gc_attachments",
+        Job.created_at > now - timedelta(seconds=settings.ATTACHMENT_GC_INTERVAL)
+    ).first()
+    if recent:
+        return False
+    db.add(Job(type="gc_attachments", payload={"grace_seconds": settings.ATTACHMENT_GC_GRACE}, created_at=now))
+    db.commit()
+    return True
+
+def next_pending_job(db: Session):
+    """Highest-priority, oldest pending job (served by ix_jobs_pending_queue)."""
+    return db.query(Job).filter(Job.status == "pending").order_by(Job.priority.desc(), Job.created_at.asc()).first()
+
 def run_worker():
     logger.info("Starting Worker...")
+    requeue_interrupted_backfills()
+    next_gc_check = 0.0
     while True:
         db = SessionLocal()
         try:
+            if time.monotonic() >= next_gc_check:
+                next_gc_check = time.monotonic() + GC_CHECK_INTERVAL
+                if schedule_attachment_gc(db):
+                    logger.info("Queued attachment GC")
+            
             # Fetch pending job
             # For simplicity, FIFO. In production, use SELECT FOR UPDATE SKIP LOCKED
-            job = db.query(Job).filter(Job.status == "pending").order_by(Job.created_at.asc()).first()
+            job = next_pending_job(db)
             
             if job:
                 logger.info(f"Processing Job {job.id} (Type: {job.type})")
@@ -33,6 +80,10 @@ def run_worker():
                     process_bulk_draft_orchestrator(job_id)
                 elif job_type == "generate_embedding":
                     generate_embedding_job(job_id)
+                elif job_type == "gc_attachments":
+                    process_attachment_gc_job(job_id)
+                elif job_type == BACKFILL_JOB_TYPE:
+                    process_backfill_job(job_id)
                 else:
                     logger.warning(f"Unknown job type: {job_type}")
                     # Mark as failed
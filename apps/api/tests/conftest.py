@@ -1,4 +1,6 @@
 import os
+from contextlib import contextmanager
+
 import pytest
 
 # Load test environment variables BEFORE importing app
@@ -9,7 +11,7 @@ os.environ.setdefault("ENCRYPTION_KEY", "testencryptionkey12345678901234")
 os.environ.setdefault("OLLAMA_BASE_URL", "http://localhost:11434")
 
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -79,6 +81,17 @@ def test_user(db):
     return user
 
 
+@pytest.fixture
+def mailbox(db, test_user):
+    """Create an active mailbox for the test user."""
+    from app.models.mailbox import Mailbox
+    
+    mailbox = Mailbox(user_id=test_user.id, email_address="inbox@example.com", is_active=True)
+    db.add(mailbox)
+    db.commit()
+    return mailbox
+
+
 @pytest.fixture
 def admin_user(db):
     """Create an admin user."""
@@ -110,6 +123,39 @@ def auth_headers(client, test_user):
     return {"Authorization": f"Bearer {token}"}
 
 
+@pytest.fixture
+def user_client(client, test_user):
+    """Test client with every request authenticated as test_user, without a login round trip."""
+    from app.routes.auth import get_current_active_user
+    
+    app.dependency_overrides[get_current_active_user] = lambda: test_user
+    return client
+
+
+@contextmanager
+def count_queries(budget=None):
+    """
+    Record the SQL statements issued inside the block. With ``budget``, fail
+    the test if more were issued, listing them:
+
+        with count_queries(budget=5) as statements:
+            user_client.get("/api/v1/emails/")
+    """
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    if budget is not None and len(statements) > budget:
+        listing = "\n".join(f"  {n}. {s.strip()[:200]}" for n, s in enumerate(statements, 1))
+        pytest.fail(f"{len(statements)} SQL statements, budget is {budget}:\n{listing}")
+
+
 @pytest.fixture
 def admin_auth_headers(client, admin_user):
     """Get authentication headers for admin user."""
@@ -119,3 +165,21 @@ def admin_auth_headers(client, admin_user):
     })
     token = response.json().get("access_token")
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def imap_server():
+    """In-process IMAP server serving a small synthetic mailbox over TLS."""
+    from mail_servers import FakeIMAPServer, SyntheticMailbox
+    
+    with FakeIMAPServer(SyntheticMailbox(count=12, attachment_rate=0.5)) as server:
+        yield server
+
+
+@pytest.fixture
+def smtp_sink():
+    """In-process SMTP server that records every message it accepts."""
+    from mail_servers import SMTPSink
+    
+    with SMTPSink() as sink:
+        yield sink
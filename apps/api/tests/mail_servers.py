@@ -0,0 +1,431 @@
+"""
+In-process stand-ins for IMAP and SMTP servers.
+
+``FakeIMAPServer`` serves a ``SyntheticMailbox`` over implicit TLS (what
+``IMAPClient`` expects) and speaks just enough IMAP4rev1 for the sync paths:
+CAPABILITY, LOGIN, LIST, SELECT, SEARCH, FETCH, UID SEARCH/FETCH, NOOP,
+LOGOUT and (when advertised) COMPRESS DEFLATE. ``SMTPSink`` accepts and records every message it is sent.
+Both count the bytes they put on the wire so benchmarks can report them.
+"""
+import datetime
+import os
+import random
+import re
+import shlex
+import socket
+import socketserver
+import ssl
+import tempfile
+import threading
+import zlib
+from email.message import EmailMessage
+from email.utils import format_datetime
+from typing import Dict, List, Optional, Tuple
+
+MESSAGE_SET_PART = re.compile(r"^(\d+|\*)(?::(\d+|\*))?$")
+
+
+class SyntheticMailbox:
+    """
+    A deterministic mailbox of generated RFC 822 messages.
+
+    Body sizes follow a log-normal distribution around ``median_body_size``;
+    ``attachment_rate`` of the messages carry one attachment drawn from a pool
+    of ``attachment_pool`` distinct files, so the same file recurs across
+    messages the way real newsletters and invoices do.
+    """
+
+    def __init__(
+        self,
+        count: int = 20,
+        median_body_size: int = 2000,
+        size_sigma: float = 1.0,
+        attachment_rate: float = 0.2,
+        attachment_size: int = 50_000,
+        attachment_pool: int = 5,
+        seed: int = 1,
+        uid_validity: int = 1,
+    ):
+        self.count = count
+        self.uid_validity = uid_validity
+        rng = random.Random(seed)
+        self._attachments = [
+            (f"document-{n}.pdf", rng.randbytes(attachment_size)) for n in range(attachment_pool)
+        ]
+        self._specs = []
+        for n in range(count):
+            body_size = max(64, int(rng.lognormvariate(0, size_sigma) * median_body_size))
+            attachment = rng.randrange(attachment_pool) if attachment_pool and rng.random() < attachment_rate else None
+            self._specs.append((body_size, attachment))
+        # Leave gaps so UIDs and sequence numbers never coincide
+        self.uids = [100 + 2 * n for n in range(count)]
+        self._cache: Dict[int, bytes] = {}
+
+    def message(self, seq: int) -> bytes:
+        """RFC 822 bytes of the message with 1-based sequence number ``seq``."""
+        if seq not in self._cache:
+            self._cache[seq] = self._build(seq)
+        return self._cache[seq]
+
+    def _build(self, seq: int) -> bytes:
+        body_size, attachment = self._specs[seq - 1]
+        msg = EmailMessage()
+        msg["Message-ID"] = f"<synthetic-{self.uid_validity}-{seq}@bench.local>"
+        msg["From"] = f"Sender {seq % 17} <sender{seq % 17}@example.com>"
+        msg["To"] = "inbox@bench.local"
+        msg["Subject"] = f"Synthetic message {seq}"
+        sent = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc) + datetime.timedelta(minutes=seq)
+        msg["Date"] = format_datetime(sent)
+        words = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor " * (body_size // 80 + 1))
+        msg.set_content(words[:body_size])
+        msg.add_alternative(f"<html><body><p>{words[:body_size]}</p></body></html>", subtype="html")
+        if attachment is not None:
+            filename, data = self._attachments[attachment]
+            msg.add_attachment(data, maintype="application", subtype="pdf", filename=filename)
+        return msg.as_bytes()
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(len(self.message(seq)) for seq in range(1, self.count + 1))
+
+
+def _self_signed_context() -> ssl.SSLContext:
+    """Server TLS context with a throwaway self-signed certificate."""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_path = os.path.join(tmp, "cert.pem")
+        key_path = os.path.join(tmp, "key.pem")
+        with open(cert_path, "wb") as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM))
+        with open(key_path, "wb") as f:
+            f.write(key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ))
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class _ThreadedServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def get_request(self):
+        conn, addr = super().get_request()
+        # Avoid Nagle/delayed-ACK stalls between a response and its tagged status line
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn, addr
+
+
+class _BackgroundServer:
+    """Runs a socketserver on 127.0.0.1 with an ephemeral port in a thread."""
+
+    handler_class = None
+
+    def __init__(self):
+        self.host = "127.0.0.1"
+        self.port = None
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def start(self) -> Tuple[str, int]:
+        self._server = _ThreadedServer((self.host, 0), self.handler_class)
+        self._server.owner = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.host, self.port
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def count_sent(self, n: int) -> None:
+        with self._lock:
+            self.bytes_sent += n
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    """One IMAP session."""
+
+    def setup(self):
+        owner = self.server.owner
+        if owner.use_ssl:
+            self.request = owner.ssl_context.wrap_socket(self.request, server_side=True)
+        super().setup()
+        self.selected = False
+        self.compressor = None
+        self.decompressor = None
+        self.inbuf = bytearray()
+
+    def send(self, data: bytes) -> None:
+        if self.compressor:
+            data = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.wfile.write(data)
+        self.wfile.flush()
+        self.server.owner.count_sent(len(data))
+
+    def readline(self) -> bytes:
+        if not self.decompressor:
+            return self.rfile.readline()
+        while b"\n" not in self.inbuf:
+            chunk = self.rfile.read1(65536)
+            if not chunk:
+                break
+            self.inbuf += self.decompressor.decompress(chunk)
+        end = self.inbuf.find(b"\n") + 1 or len(self.inbuf)
+        line = bytes(self.inbuf[:end])
+        del self.inbuf[:end]
+        return line
+
+    def line(self, text: str) -> None:
+        self.send(text.encode() + b"\r\n")
+
+    def handle(self):
+        owner = self.server.owner
+        self.line(f"* OK [CAPABILITY {owner.capability_string}] Fake IMAP ready")
+        while True:
+            raw = self.readline()
+            if not raw:
+                return
+            try:
+                tag, command, args = self._split(raw.decode().rstrip("\r\n"))
+            except ValueError:
+                self.line("* BAD malformed command")
+                continue
+            handler = getattr(self, f"cmd_{command.lower()}", None)
+            if handler is None:
+                self.line(f"{tag} BAD unknown command {command}")
+                continue
+            if handler(tag, args) is False:
+                return
+
+    @staticmethod
+    def _split(line: str):
+        tag, _, rest = line.partition(" ")
+        command, _, args = rest.partition(" ")
+        if not tag or not command:
+            raise ValueError(line)
+        return tag, command, args
+
+    # Commands
+
+    def cmd_capability(self, tag, args):
+        self.line(f"* CAPABILITY {self.server.owner.capability_string}")
+        self.line(f"{tag} OK CAPABILITY completed")
+
+    def cmd_login(self, tag, args):
+        owner = self.server.owner
+        parts = shlex.split(args)
+        if len(parts) == 2 and (owner.username is None or parts == [owner.username, owner.password]):
+            self.line(f"{tag} OK LOGIN completed")
+        else:
+            self.line(f"{tag} NO [AUTHENTICATIONFAILED] Invalid credentials")
+
+    def cmd_list(self, tag, args):
+        self.line('* LIST (\\HasNoChildren) "/" "INBOX"')
+        self.line(f"{tag} OK LIST completed")
+
+    def cmd_select(self, tag, args):
+        mailbox = self.server.owner.mailbox
+        folder = args.strip().strip('"')
+        if folder.upper() != "INBOX":
+            self.line(f"{tag} NO no such mailbox")
+            return
+        self.selected = True
+        self.line(f"* {mailbox.count} EXISTS")
+        self.line("* 0 RECENT")
+        self.line(f"* OK [UIDVALIDITY {mailbox.uid_validity}] UIDs valid")
+        next_uid = (mailbox.uids[-1] + 1) if mailbox.uids else 1
+        self.line(f"* OK [UIDNEXT {next_uid}] Predicted next UID")
+        self.line(f"{tag} OK [READ-WRITE] SELECT completed")
+
+    cmd_examine = cmd_select
+
+    def cmd_compress(self, tag, args):
+        if "COMPRESS=DEFLATE" not in self.server.owner.capabilities or args.strip().upper() != "DEFLATE":
+            self.line(f"{tag} BAD compression not supported")
+            return
+        if self.compressor:
+            self.line(f"{tag} NO [COMPRESSIONACTIVE] already compressing")
+            return
+        self.line(f"{tag} OK DEFLATE active")
+        self.compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        self.decompressor = zlib.decompressobj(-15)
+
+    def cmd_noop(self, tag, args):
+        self.line(f"{tag} OK NOOP completed")
+
+    def cmd_logout(self, tag, args):
+        self.line("* BYE Fake IMAP logging out")
+        self.line(f"{tag} OK LOGOUT completed")
+        return False
+
+    def cmd_search(self, tag, args, by_uid=False):
+        mailbox = self.server.owner.mailbox
+        ids = mailbox.uids if by_uid else range(1, mailbox.count + 1)
+        self.line("* SEARCH" + "".join(f" {i}" for i in ids))
+        self.line(f"{tag} OK SEARCH completed")
+
+    def cmd_fetch(self, tag, args, by_uid=False):
+        mailbox = self.server.owner.mailbox
+        message_set, _, items = args.partition(" ")
+        if by_uid:
+            uid_to_seq = {uid: n + 1 for n, uid in enumerate(mailbox.uids)}
+            top = mailbox.uids[-1] if mailbox.uids else 0
+            seqs = [uid_to_seq[uid] for uid in self._expand(message_set, top) if uid in uid_to_seq]
+        else:
+            seqs = [seq for seq in self._expand(message_set, mailbox.count) if 1 <= seq <= mailbox.count]
+        for seq in seqs:
+            data = mailbox.message(seq)
+            uid = mailbox.uids[seq - 1]
+            self.send(f"* {seq} FETCH (UID {uid} RFC822 {{{len(data)}}}\r\n".encode() + data + b")\r\n")
+        self.line(f"{tag} OK FETCH completed")
+
+    def cmd_uid(self, tag, args):
+        command, _, rest = args.partition(" ")
+        if command.upper() == "SEARCH":
+            return self.cmd_search(tag, rest, by_uid=True)
+        if command.upper() == "FETCH":
+            return self.cmd_fetch(tag, rest, by_uid=True)
+        self.line(f"{tag} BAD unsupported UID command")
+
+    @staticmethod
+    def _expand(message_set: str, top: int) -> List[int]:
+        ids = []
+        for part in message_set.split(","):
+            match = MESSAGE_SET_PART.match(part)
+            if not match:
+                continue
+            start = top if match.group(1) == "*" else int(match.group(1))
+            end_text = match.group(2)
+            end = start if end_text is None else (top if end_text == "*" else int(end_text))
+            low, high = sorted((start, end))
+            ids.extend(range(low, high + 1))
+        return ids
+
+
+class FakeIMAPServer(_BackgroundServer):
+    """IMAP server backed by a SyntheticMailbox."""
+
+    handler_class = _IMAPHandler
+
+    def __init__(
+        self,
+        mailbox: Optional[SyntheticMailbox] = None,
+        username: Optional[str] = "user@bench.local",
+        password: Optional[str] = "secret",
+        use_ssl: bool = True,
+        capabilities: Tuple[str, ...] = ("IMAP4rev1", "AUTH=PLAIN"),
+    ):
+        super().__init__()
+        self.mailbox = mailbox or SyntheticMailbox()
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.capabilities = capabilities
+        self.ssl_context = _self_signed_context() if use_ssl else None
+
+    @property
+    def capability_string(self) -> str:
+        return " ".join(self.capabilities)
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """One SMTP session; accepts any sender, recipient and credentials."""
+
+    def reply(self, text: str) -> None:
+        data = text.encode() + b"\r\n"
+        self.wfile.write(data)
+        self.wfile.flush()
+        self.server.owner.count_sent(len(data))
+
+    def handle(self):
+        owner = self.server.owner
+        self.reply("220 fake-smtp ESMTP ready")
+        mail_from, rcpt_to = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode(errors="replace").rstrip("\r\n")
+            verb = line.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-fake-smtp")
+                self.reply("250-SIZE 52428800")
+                self.reply("250-8BITMIME")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "HELO":
+                self.reply("250 fake-smtp")
+            elif verb == "AUTH":
+                self.reply("235 Authentication successful")
+            elif verb == "MAIL":
+                mail_from, rcpt_to = line.split(":", 1)[1].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpt_to.append(line.split(":", 1)[1].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                chunks = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line == b".\r\n":
+                        break
+                    chunks.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                owner.record(mail_from, rcpt_to, b"".join(chunks))
+                self.reply("250 OK queued")
+            elif verb == "RSET":
+                mail_from, rcpt_to = None, []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(_BackgroundServer):
+    """SMTP server that stores every accepted message in ``messages``."""
+
+    handler_class = _SMTPHandler
+
+    def __init__(self):
+        super().__init__()
+        self.messages: List[Dict] = []
+
+    def record(self, mail_from: str, rcpt_to: List[str], data: bytes) -> None:
+        with self._lock:
+            self.messages.append({"mail_from": mail_from, "rcpt_to": rcpt_to, "data": data})
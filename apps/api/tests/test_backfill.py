@@ -0,0 +1,122 @@
+"""Tests for resumable mailbox backfill."""
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+
+from app.models.email import Email
+from app.models.job import Job
+from app.models.mailbox import Mailbox
+
+
+class FakeIMAPClient:
+    """Stands in for IMAPClient with a fixed set of UIDs."""
+
+    uids = list(range(1, 8))
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def list_uids(self, folder="INBOX"):
+        return "42", list(self.uids)
+
+    def transfer_stats(self):
+        return {"compressed": False, "bytes_on_wire": 0, "bytes_uncompressed": 0}
+
+    def fetch_by_uids(self, uids, folder="INBOX"):
+        return [{
+            "uid": str(uid),
+            "message_id": f"<backfill-{uid}@example.com>",
+            "sender": "sender@example.com",
+            "recipients": "me@example.com",
+            "subject": f"Old message {uid}",
+            "body_text": "",
+            "body_html": "",
+            "received_at": datetime(2020, 1, uid),
+            "folder": folder,
+            "attachments": [],
+        } for uid in uids]
+
+
+@pytest.fixture
+def backfill_job(db, test_user):
+    from app.services.backfill import BACKFILL_JOB_TYPE, BACKFILL_PRIORITY
+
+    mailbox = Mailbox(user_id=test_user.id, email_address="old@example.com", imap_host="localhost", imap_port=993)
+    db.add(mailbox)
+    db.commit()
+    job = Job(type=BACKFILL_JOB_TYPE, status="processing", priority=BACKFILL_PRIORITY,
+              payload={"mailbox_id": mailbox.id}, attempts=1)
+    db.add(job)
+    db.commit()
+    return job, mailbox
+
+
+@patch("app.services.backfill.decrypt_password", lambda value: "secret")
+@patch("app.services.backfill.IMAPClient", FakeIMAPClient)
+class TestBackfillRunner:
+    """Test chunked newest-to-oldest walk with checkpoints."""
+
+    def test_yields_to_live_work_and_resumes(self, db, backfill_job):
+        from app.services.backfill import BackfillRunner
+
+        job, mailbox = backfill_job
+        live_job = Job(type="sync_email", status="pending", payload={"mailbox_id": mailbox.id})
+        db.add(live_job)
+        db.commit()
+
+        runner = BackfillRunner(db, job, mailbox, chunk_size=3)
+        assert runner.run() is False
+        assert runner.checkpoint.cursor == "5"
+        assert runner.checkpoint.processed_count == 3
+        subjects = {e.subject for e in db.query(Email).all()}
+        assert subjects == {"Old message 5", "Old message 6", "Old message 7"}
+
+        live_job.status = "completed"
+        db.commit()
+
+        resumed = BackfillRunner(db, job, mailbox, chunk_size=3)
+        assert resumed.run() is True
+        assert db.query(Email).count() == 7
+        assert job.result["complete"] is True
+        assert job.result["processed"] == 7
+        assert job.result["total"] == 7
+        assert job.result["inserted"] == 7
+        assert job.result["eta_seconds"] == 0
+
+    def test_uid_validity_change_restarts(self, db, backfill_job):
+        from app.services.backfill import BackfillRunner
+        from app.services.sync_checkpoints import get_checkpoint
+
+        job, mailbox = backfill_job
+        checkpoint = get_checkpoint(db, mailbox.id, "backfill")
+        checkpoint.uid_validity = "1"
+        checkpoint.cursor = "2"
+        checkpoint.processed_count = 5
+        db.commit()
+
+        assert BackfillRunner(db, job, mailbox, chunk_size=10).run() is True
+        assert checkpoint.uid_validity == "42"
+        assert checkpoint.processed_count == 7
+
+
+class TestStartBackfill:
+    """Test queueing a backfill through the API."""
+
+    def test_one_backfill_job_per_mailbox(self, db, user_client, backfill_job):
+        job, mailbox = backfill_job
+        other = Mailbox(user_id=mailbox.user_id, email_address="new@example.com", imap_host="localhost")
+        db.add(other)
+        db.commit()
+
+        response = user_client.post(f"/api/v1/mailboxes/{mailbox.id}/backfill")
+        assert response.json() == {"message": "Backfill already queued", "job_id": job.id}
+
+        response = user_client.post(f"/api/v1/mailboxes/{other.id}/backfill")
+        assert response.json()["message"] == "Backfill queued"
+        assert response.json()["job_id"] != job.id
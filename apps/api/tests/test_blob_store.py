@@ -0,0 +1,97 @@
+"""Tests for the content-addressed attachment store."""
+import hashlib
+import os
+
+from app.models.attachment import Attachment
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+
+
+class TestBlobStore:
+    """Test blob layout, dedup and garbage collection."""
+
+    def test_put_is_content_addressed(self, tmp_path):
+        from app.services.blob_store import BlobStore
+
+        store = BlobStore(str(tmp_path))
+        digest = store.put(b"same bytes")
+
+        assert digest == hashlib.sha256(b"same bytes").hexdigest()
+        assert store.path_for(digest) == os.path.join(str(tmp_path), digest[:2], digest[2:4], digest)
+        assert store.put(b"same bytes") == digest
+        assert list(store.iter_digests()) == [digest]
+        assert os.listdir(tmp_path / "tmp") == []
+
+    def test_put_stream_returns_size(self, tmp_path):
+        from app.services.blob_store import BlobStore
+
+        store = BlobStore(str(tmp_path))
+        digest, size = store.put_stream([b"abc", b"def"])
+
+        assert size == 6
+        assert b"".join(store.iter_chunks(digest)) == b"abcdef"
+
+    def test_collect_garbage_keeps_referenced_blobs(self, db, test_user, tmp_path):
+        from app.services.blob_store import BlobStore
+
+        store = BlobStore(str(tmp_path))
+        kept = store.put(b"referenced")
+        orphan = store.put(b"orphan")
+
+        mailbox = Mailbox(user_id=test_user.id, email_address="gc@example.com")
+        db.add(mailbox)
+        db.flush()
+        email = Email(mailbox_id=mailbox.id, message_id="<gc@example.com>", sender="x")
+        db.add(email)
+        db.flush()
+        db.add(Attachment(email_id=email.id, filename="a.txt", content_hash=kept,
+                          storage_path=store.path_for(kept)))
+        db.commit()
+
+        assert store.ref_count(db, kept) == 1
+        assert store.collect_garbage(db, grace_seconds=3600) == 0
+        assert store.collect_garbage(db, grace_seconds=-1) == 1
+        assert store.exists(kept)
+        assert not store.exists(orphan)
+
+    def test_collect_garbage_puts_back_blobs_refreshed_meanwhile(self, db, tmp_path, monkeypatch):
+        import os
+
+        from app.services.blob_store import BlobStore
+
+        store = BlobStore(str(tmp_path))
+        digest = store.put(b"orphan")
+        os.utime(store.path_for(digest), (0, 0))
+        leftover = tmp_path / "tmp" / "interrupted"
+        leftover.write_bytes(b"partial")
+        os.utime(leftover, (0, 0))
+
+        # A concurrent put_stream of the same bytes refreshes the mtime
+        # after the first check; the blob must survive
+        replace = os.replace
+
+        def racing_replace(src, dst):
+            replace(src, dst)
+            if src == store.path_for(digest):
+                os.utime(dst)
+
+        monkeypatch.setattr(os, "replace", racing_replace)
+        assert store.collect_garbage(db, grace_seconds=60) == 0
+        assert store.exists(digest)
+        assert not leftover.exists()
+        assert os.listdir(tmp_path / "tmp") == []
+
+    def test_worker_queues_garbage_collection_once_per_interval(self, db):
+        from datetime import datetime, timedelta
+
+        from app.core.config import settings
+        from app.models.job import Job
+        from app.worker import schedule_attachment_gc
+
+        now = datetime(2026, 1, 1)
+        assert schedule_attachment_gc(db, now=now)
+        assert not schedule_attachment_gc(db, now=now + timedelta(minutes=5))
+        assert schedule_attachment_gc(db, now=now + timedelta(seconds=settings.ATTACHMENT_GC_INTERVAL + 1))
+
+        jobs = db.query(Job).filter(Job.type == "gc_attachments").all()
+        assert [job.payload for job in jobs] == [{"grace_seconds": settings.ATTACHMENT_GC_GRACE}] * 2
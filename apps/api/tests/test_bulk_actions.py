@@ -0,0 +1,145 @@
+"""Tests for the bulk email actions endpoint."""
+from datetime import datetime
+
+import pytest
+
+from conftest import count_queries
+from app.models.email import Email, EmailState
+from app.models.mailbox import Mailbox
+from app.models.tag import Tag
+from app.models.user import User
+
+URL = "/api/v1/emails/bulk"
+
+
+@pytest.fixture
+def other_email(db):
+    owner = User(email="other@example.com", role="user", is_active=True)
+    db.add(owner)
+    db.commit()
+    mailbox = Mailbox(user_id=owner.id, email_address="other-box@example.com", is_active=True)
+    db.add(mailbox)
+    db.commit()
+    email = Email(mailbox_id=mailbox.id, message_id="other", sender="x@example.com",
+                  subject="Not yours", received_at=datetime(2026, 1, 1))
+    db.add(email)
+    db.commit()
+    return email
+
+
+def make_emails(db, mailbox, count, **columns):
+    emails = [
+        Email(mailbox_id=mailbox.id, message_id=f"{mailbox.id}-{n}", sender="a@example.com",
+              subject=f"Report {n}", received_at=datetime(2026, 1, 1), **columns)
+        for n in range(count)
+    ]
+    db.add_all(emails)
+    db.commit()
+    return [email.id for email in emails]
+
+
+def fresh(db, ids):
+    db.expire_all()
+    return db.query(Email).filter(Email.id.in_(ids)).order_by(Email.id).all()
+
+
+class TestBulkEmailActions:
+    """Test bulk updates by id and by filter."""
+
+    def test_updates_columns_by_id(self, user_client, db, mailbox, test_user):
+        ids = make_emails(db, mailbox, 3)
+        response = user_client.post(URL, json={
+            "email_ids": ids[:2], "is_read": True, "folder": "ARCHIVE",
+            "state": "closed", "assigned_user_id": test_user.id,
+        })
+        assert response.status_code == 200
+        assert response.json() == {"matched": 2}
+
+        first, second, untouched = fresh(db, ids)
+        for email in (first, second):
+            assert (email.is_read, email.folder, email.state, email.assigned_user_id) == (
+                True, "ARCHIVE", EmailState.CLOSED, test_user.id)
+        assert (untouched.is_read, untouched.folder, untouched.assigned_user_id) == (False, "INBOX", None)
+
+    def test_unassign_with_explicit_null(self, user_client, db, mailbox, test_user):
+        ids = make_emails(db, mailbox, 2, assigned_user_id=test_user.id)
+        assert user_client.post(URL, json={"email_ids": ids, "is_flagged": True}).status_code == 200
+        assert all(email.assigned_user_id == test_user.id for email in fresh(db, ids))
+
+        assert user_client.post(URL, json={"email_ids": ids, "assigned_user_id": None}).status_code == 200
+        assert all(email.assigned_user_id is None for email in fresh(db, ids))
+
+    def test_tags_are_added_once_and_removed(self, user_client, db, mailbox):
+        ids = make_emails(db, mailbox, 3)
+        existing = Tag(name="work", color="#000")
+        db.add(existing)
+        db.commit()
+        user_client.post(URL, json={"email_ids": ids[:1], "add_tags": ["work"]})
+
+        response = user_client.post(URL, json={"email_ids": ids, "add_tags": ["work", "urgent"]})
+        assert response.status_code == 200
+        for email in fresh(db, ids):
+            assert sorted(tag.name for tag in email.tags) == ["urgent", "work"]
+        assert db.query(Tag).count() == 2
+
+        response = user_client.post(URL, json={"email_ids": ids[1:], "remove_tag_ids": [existing.id]})
+        assert response.status_code == 200
+        assert [sorted(tag.name for tag in email.tags) for email in fresh(db, ids)] == [
+            ["urgent", "work"], ["urgent"], ["urgent"]]
+
+    def test_by_filter(self, user_client, db, mailbox, other_email):
+        ids = make_emails(db, mailbox, 4)
+        db.query(Email).filter(Email.id == ids[0]).update({Email.folder: "SENT"})
+        db.commit()
+
+        response = user_client.post(URL, json={"filter": {"folder": "INBOX"}, "is_read": True})
+        assert response.json() == {"matched": 3}
+        assert [email.is_read for email in fresh(db, ids)] == [False, True, True, True]
+        assert fresh(db, [other_email.id])[0].is_read is False
+
+    def test_by_search_filter(self, user_client, db, mailbox):
+        ids = make_emails(db, mailbox, 2)
+        db.query(Email).filter(Email.id == ids[1]).update({Email.subject: "Invoice due"})
+        db.commit()
+
+        response = user_client.post(URL, json={"filter": {"q": "invoice"}, "folder": "FINANCE"})
+        assert response.json() == {"matched": 1}
+        assert [email.folder for email in fresh(db, ids)] == ["INBOX", "FINANCE"]
+
+    def test_foreign_ids_change_nothing(self, user_client, db, mailbox, other_email):
+        ids = make_emails(db, mailbox, 2)
+        response = user_client.post(URL, json={"email_ids": ids + [other_email.id], "is_read": True})
+        assert response.status_code == 404
+        assert not any(email.is_read for email in fresh(db, ids + [other_email.id]))
+
+        response = user_client.post(URL, json={"email_ids": [ids[0], 999999], "is_read": True})
+        assert response.status_code == 404
+
+    @pytest.mark.parametrize("body", [
+        {"is_read": True},
+        {"email_ids": [1], "filter": {}, "is_read": True},
+        {"email_ids": [1]},
+        {"email_ids": [], "is_read": True},
+    ])
+    def test_rejects_invalid_requests(self, user_client, body):
+        assert user_client.post(URL, json=body).status_code == 422
+
+    def test_bumps_mailbox_version(self, user_client, db, mailbox):
+        ids = make_emails(db, mailbox, 2)
+        before = mailbox.version
+        user_client.post(URL, json={"email_ids": ids, "add_tags": ["later"]})
+        db.expire_all()
+        assert db.query(Mailbox.version).filter(Mailbox.id == mailbox.id).scalar() == before + 1
+
+    def test_statement_count_does_not_grow_with_selection(self, user_client, db, mailbox):
+        ids = make_emails(db, mailbox, 200)
+        old = Tag(name="old", color="#000")
+        db.add(old)
+        db.commit()
+        body = {"email_ids": ids, "is_read": True, "add_tags": ["bulk"], "remove_tag_ids": [old.id]}
+        # Current user, ownership count, UPDATE, tag lookup/insert/lookup,
+        # tag INSERT ... SELECT, DELETE, version bump
+        with count_queries(budget=9):
+            response = user_client.post(URL, json=body)
+        assert response.json() == {"matched": 200}
+        assert all(email.is_read and [tag.name for tag in email.tags] == ["bulk"] for email in fresh(db, ids))
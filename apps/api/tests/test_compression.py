@@ -0,0 +1,88 @@
+"""Tests for response encoding: orjson responses and compression."""
+import gzip
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.middleware.compression import CompressionMiddleware, _accepts
+from app.core.responses import ORJSONResponse
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+
+
+@pytest.fixture
+def raw_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big", response_class=ORJSONResponse)
+    def big():
+        return {"when": datetime(2026, 1, 1), "words": ["inbox"] * 200, 1: "int key"}
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"line\n" * 100] * 5), media_type="text/plain")
+
+    @app.get("/file")
+    def file():
+        return StreamingResponse(iter([b"x" * 5000]), media_type="application/octet-stream")
+
+    return TestClient(app)
+
+
+def raw_get(client, path, encoding):
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+
+class TestCompression:
+    """Test the compression middleware."""
+
+    def test_gzips_large_responses(self, raw_client):
+        response, body = raw_get(raw_client, "/big", "gzip")
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        data = gzip.decompress(body)
+        assert data.startswith(b'{"when":"2026-01-01T00:00:00","words":["inbox"')
+        assert b'"1":"int key"' in data
+
+    def test_gzips_streaming_responses_chunk_by_chunk(self, raw_client):
+        response, body = raw_get(raw_client, "/stream", "gzip")
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert gzip.decompress(body) == b"line\n" * 500
+
+    def test_leaves_small_unaccepted_and_binary_responses(self, raw_client):
+        assert "content-encoding" not in raw_get(raw_client, "/small", "gzip")[0].headers
+        assert "content-encoding" not in raw_get(raw_client, "/big", "identity")[0].headers
+        assert "content-encoding" not in raw_get(raw_client, "/big", "gzip;q=0")[0].headers
+        assert "content-encoding" not in raw_get(raw_client, "/file", "gzip")[0].headers
+
+    def test_accept_encoding_parsing(self):
+        assert _accepts("gzip, deflate, br", "br")
+        assert _accepts("br;q=0.5, gzip", "br")
+        assert not _accepts("br;q=0, gzip", "br")
+        assert not _accepts("gzip", "br")
+
+    def test_email_list_is_compressed(self, user_client, db, test_user):
+        mailbox = Mailbox(user_id=test_user.id, email_address="gz@example.com", is_active=True)
+        db.add(mailbox)
+        db.commit()
+        db.add_all([
+            Email(mailbox_id=mailbox.id, message_id=f"gz{n}", sender="a@example.com",
+                  subject="Compressible subject line", snippet="snippet " * 20,
+                  received_at=datetime(2026, 1, 1))
+            for n in range(20)
+        ])
+        db.commit()
+
+        response, body = raw_get(user_client, "/api/v1/emails/", "gzip")
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(body) < len(gzip.decompress(body)) / 3
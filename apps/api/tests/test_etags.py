@@ -0,0 +1,93 @@
+"""Tests for mailbox versions and conditional GETs on the email routes."""
+from datetime import datetime
+
+import pytest
+
+from conftest import count_queries
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+from app.models.tag import Tag
+from app.services.ingest import ingest_emails
+from app.utils.http_cache import _matches
+
+
+@pytest.fixture
+def email(db, mailbox):
+    email = Email(mailbox_id=mailbox.id, message_id="e0", sender="a@example.com",
+                  subject="Hello", received_at=datetime(2026, 6, 1))
+    db.add(email)
+    db.commit()
+    return email
+
+
+def version(db, mailbox_id):
+    return db.query(Mailbox.version).filter(Mailbox.id == mailbox_id).scalar()
+
+
+class TestMailboxVersion:
+    """Test that every kind of email write bumps the mailbox version."""
+
+    def test_orm_insert_update_delete(self, db, mailbox, email):
+        assert version(db, mailbox.id) == 1
+
+        email.is_read = True
+        db.commit()
+        assert version(db, mailbox.id) == 2
+
+        email.tags.append(Tag(name="later", color="#000"))
+        db.commit()
+        assert version(db, mailbox.id) == 3
+
+        db.delete(email)
+        db.commit()
+        assert version(db, mailbox.id) == 4
+
+    def test_unchanged_flush_does_not_bump(self, db, mailbox, email):
+        email.is_read = email.is_read
+        db.add(Tag(name="unrelated", color="#fff"))
+        db.commit()
+        assert version(db, mailbox.id) == 1
+
+    def test_ingest(self, db, mailbox):
+        data = [{"message_id": f"i{n}", "sender": "b@example.com", "subject": "Batch"} for n in range(3)]
+        assert ingest_emails(db, mailbox, data) == 3
+        assert version(db, mailbox.id) == 1
+
+        assert ingest_emails(db, mailbox, data) == 0
+        assert version(db, mailbox.id) == 1
+
+
+class TestConditionalGet:
+    """Test ETag / If-None-Match on the list and detail routes."""
+
+    def test_unchanged_list_is_304_without_reading_emails(self, user_client, email):
+        first = user_client.get("/api/v1/emails/")
+        etag = first.headers["ETag"]
+        assert first.status_code == 200
+
+        with count_queries() as statements:
+            again = user_client.get("/api/v1/emails/", headers={"If-None-Match": etag})
+
+        assert again.status_code == 304
+        assert again.headers["ETag"] == etag
+        assert not any("FROM emails" in s for s in statements)
+
+    def test_etag_changes_with_mail_and_parameters(self, user_client, db, email):
+        etag = user_client.get("/api/v1/emails/").headers["ETag"]
+        assert user_client.get("/api/v1/emails/", params={"size": 5}).headers["ETag"] != etag
+
+        email.is_read = True
+        db.commit()
+        response = user_client.get("/api/v1/emails/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    def test_detail_and_gmail_routes(self, user_client, email):
+        for url in (f"/api/v1/emails/{email.id}", "/api/v1/gmail/inbox"):
+            etag = user_client.get(url).headers["ETag"]
+            assert user_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    def test_if_none_match_parsing(self):
+        assert _matches('"a", W/"b"', '"b"')
+        assert _matches("*", '"b"')
+        assert not _matches('"a"', '"b"')
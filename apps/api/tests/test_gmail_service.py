@@ -0,0 +1,186 @@
+"""Tests for GmailService batch fetching."""
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from app.services import gmail_service
+from app.services.gmail_service import GmailService
+from app.services.rate_limiter import LocalRateLimiter
+
+
+def raw_message(message_id):
+    return {
+        "id": message_id,
+        "threadId": f"t-{message_id}",
+        "labelIds": ["INBOX"],
+        "snippet": "",
+        "payload": {"headers": [{"name": "Subject", "value": f"Subject {message_id}"}], "body": {}},
+    }
+
+
+class FakeBatchService:
+    """Stands in for the discovery Resource; ``failures`` maps id -> statuses to return first."""
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.batches = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, userId, id, format, fields=None):
+        return id
+
+    def new_batch_http_request(self, callback):
+        service = self
+
+        class Batch:
+            def __init__(self):
+                self.ids = []
+
+            def add(self, request, request_id):
+                self.ids.append(request_id)
+
+            def execute(self):
+                service.batches.append(list(self.ids))
+                for request_id in self.ids:
+                    statuses = service.failures.get(request_id)
+                    if statuses:
+                        status = statuses.pop(0)
+                        callback(request_id, None, HttpError(httplib2.Response({"status": status}), b"error"))
+                    else:
+                        callback(request_id, raw_message(request_id), None)
+
+        return Batch()
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    monkeypatch.setattr(gmail_service.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(gmail_service, "rate_limiter", LocalRateLimiter())
+    service = GmailService(access_token="token")
+    service.service = FakeBatchService()
+    return service
+
+
+class TestGetMessages:
+    """Test batch HTTP fetching of messages."""
+
+    def test_chunks_by_batch_size_and_preserves_order(self, gmail, monkeypatch):
+        monkeypatch.setattr(gmail_service.settings, "GMAIL_BATCH_SIZE", 2)
+        ids = ["m5", "m1", "m3", "m2", "m4"]
+
+        messages = gmail.get_messages(ids)
+
+        assert [m["id"] for m in messages] == ids
+        assert gmail.service.batches == [["m5", "m1"], ["m3", "m2"], ["m4"]]
+
+    def test_retries_rate_limited_items_and_skips_missing(self, gmail):
+        gmail.service.failures = {"m2": [429, 503], "m3": [404]}
+
+        messages = gmail.get_messages(["m1", "m2", "m3"])
+
+        assert [m["id"] for m in messages] == ["m1", "m2"]
+        assert gmail.service.batches == [["m1", "m2", "m3"], ["m2"], ["m2"]]
+
+
+class TestParseMessage:
+    """Test mapping Gmail API messages."""
+
+    def test_collects_nested_attachment_metadata(self, gmail):
+        message = raw_message("m1")
+        message["payload"] = {
+            "mimeType": "multipart/mixed",
+            "headers": [],
+            "body": {"size": 0},
+            "parts": [
+                {"mimeType": "multipart/alternative", "filename": "", "body": {"size": 0},
+                 "parts": [{"mimeType": "text/plain", "filename": "", "body": {"size": 5}}]},
+                {"mimeType": "application/pdf", "filename": "invoice.pdf",
+                 "body": {"attachmentId": "att-1", "size": 2048}},
+            ],
+        }
+
+        parsed = gmail._parse_message(message, body_fetched=False)
+        email_data = GmailService.to_email_data(parsed)
+
+        assert email_data["attachments"] == [{
+            "external_id": "att-1",
+            "filename": "invoice.pdf",
+            "content_type": "application/pdf",
+            "size": 2048,
+            "content": None,
+        }]
+
+
+class TestGmailClientCache:
+    """Test the per-user client cache."""
+
+    def make_user(self, user_id, refresh_token="refresh"):
+        from app.models.user import User
+        return User(id=user_id, email=f"u{user_id}@example.com",
+                    google_access_token="access", google_refresh_token=refresh_token)
+
+    def test_reuses_client_until_access_token_changes(self):
+        from app.services.gmail_service import GmailClientCache
+
+        cache = GmailClientCache(maxsize=10, ttl=60)
+        user = self.make_user(1)
+
+        first = cache.get(user)
+        assert cache.get(user) is first
+        user.google_access_token = "logged-in-elsewhere"
+        second = cache.get(user)
+        assert second is not first
+        assert second.credentials.token == "logged-in-elsewhere"
+        assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+    def test_evicts_least_recently_used_and_expired(self, monkeypatch):
+        from app.services.gmail_service import GmailClientCache
+
+        clock = [1000.0]
+        monkeypatch.setattr(gmail_service.time, "monotonic", lambda: clock[0])
+        cache = GmailClientCache(maxsize=2, ttl=60)
+        users = [self.make_user(n) for n in range(3)]
+
+        clients = [cache.get(u) for u in users]
+        assert cache.get(users[2]) is clients[2]
+        assert cache.get(users[0]) is not clients[0]
+
+        clock[0] += 61
+        assert cache.get(users[2]) is not clients[2]
+
+    def test_refreshed_token_written_back_once(self, db, test_user):
+        from app.services.gmail_service import get_gmail_service, gmail_clients
+
+        test_user.google_access_token = "old"
+        test_user.google_refresh_token = "refresh"
+        db.commit()
+        gmail_clients.clear()
+
+        gmail = get_gmail_service(db, test_user)
+        gmail.credentials.token = "new"  # as after an automatic refresh
+        assert get_gmail_service(db, test_user) is gmail
+        assert test_user.google_access_token == "new"
+        gmail_clients.clear()
+
+    def test_stale_client_does_not_overwrite_newer_login(self, db, test_user):
+        from app.services.gmail_service import get_gmail_service, gmail_clients
+
+        test_user.google_access_token = "old"
+        db.commit()
+        gmail_clients.clear()
+
+        stale = get_gmail_service(db, test_user)
+        # Another process handled a new login
+        test_user.google_access_token = "fresh"
+        db.commit()
+
+        gmail = get_gmail_service(db, test_user)
+        assert gmail is not stale
+        stale.persist_token(db, test_user)
+        assert test_user.google_access_token == "fresh"
+        gmail_clients.clear()
@@ -0,0 +1,352 @@
+"""Tests for History API based Gmail sync."""
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+from app.services.gmail_service import HistoryExpired
+from app.services.rate_limiter import RateLimitExceeded
+from app.services.sync_telemetry import SyncRecorder
+
+
+def gmail_message(message_id, labels=("INBOX", "UNREAD")):
+    return {
+        "id": message_id,
+        "thread_id": f"t-{message_id}",
+        "subject": f"Subject {message_id}",
+        "sender": "sender@example.com",
+        "to": "me@example.com",
+        "date": "",
+        "snippet": "",
+        "body": "Hello",
+        "labels": list(labels),
+        "is_read": "UNREAD" not in labels,
+        "internal_date": "1767225600000",
+    }
+
+
+class FakeGmail:
+    """In-memory stand-in for GmailService."""
+
+    def __init__(self, messages, history_id="100"):
+        self.messages = {m["id"]: m for m in messages}
+        self.history_id = history_id
+        self.history = []
+        self.expired = False
+        self.fetched = []
+        self.listed_tokens = []
+        self.fail_on_token = None
+
+    def get_profile(self):
+        return {"historyId": self.history_id}
+
+    def get_mailbox_stats(self):
+        return {"total_messages": len(self.messages), "unread_messages": 0}
+
+    def list_messages(self, max_results=20, label_ids=None, q=None, page_token=None):
+        self.listed_tokens.append(page_token)
+        if page_token is not None and page_token == self.fail_on_token:
+            self.fail_on_token = None
+            raise RuntimeError("connection reset")
+        ids = sorted(self.messages, reverse=True)
+        start = int(page_token or 0)
+        page = ids[start:start + max_results]
+        next_token = str(start + max_results) if start + max_results < len(ids) else None
+        return {"messages": [{"id": i} for i in page], "nextPageToken": next_token}
+
+    def get_message(self, message_id, format="full"):
+        messages = self.get_messages([message_id], format)
+        return messages[0] if messages else None
+
+    def get_messages(self, message_ids, format="full"):
+        self.fetched.extend(message_ids)
+        full = format == "full"
+        return [
+            {**self.messages[i], "body": self.messages[i]["body"] if full else "", "body_fetched": full}
+            for i in message_ids if i in self.messages
+        ]
+
+    def get_attachment(self, message_id, attachment_id):
+        self.fetched.append(attachment_id)
+        return b"%PDF-1.4 " + attachment_id.encode()
+
+    def list_history(self, start_history_id, page_token=None):
+        if self.expired:
+            raise HistoryExpired(start_history_id)
+        return {"history": self.history, "historyId": self.history_id, "nextPageToken": None}
+
+
+@pytest.fixture
+def gmail_mailbox(db, test_user):
+    mailbox = Mailbox(user_id=test_user.id, email_address="me@example.com", provider="gmail", is_active=True)
+    db.add(mailbox)
+    db.commit()
+    db.refresh(mailbox)
+    return mailbox
+
+
+class TestGmailHistorySync:
+    """Test incremental sync through users.history.list."""
+
+    def test_first_sync_is_full_and_stores_history_id(self, db, gmail_mailbox):
+        from app.services.gmail_sync import sync_gmail_mailbox
+
+        gmail = FakeGmail([gmail_message(f"m{n}") for n in range(3)], history_id="500")
+        result = sync_gmail_mailbox(db, gmail_mailbox, gmail)
+
+        assert result["mode"] == "full"
+        assert result["inserted"] == 3
+        assert gmail_mailbox.gmail_history_id == "500"
+
+    def test_history_applies_adds_read_changes_and_deletes(self, db, gmail_mailbox):
+        from app.services.gmail_sync import sync_gmail_mailbox
+
+        gmail = FakeGmail([gmail_message("m1"), gmail_message("m2")], history_id="500")
+        sync_gmail_mailbox(db, gmail_mailbox, gmail)
+
+        gmail.messages["m3"] = gmail_message("m3")
+        gmail.history_id = "510"
+        gmail.history = [
+            {"id": "501", "messagesAdded": [{"message": {"id": "m3", "labelIds": ["INBOX", "UNREAD"]}}]},
+            {"id": "502", "labelsRemoved": [{"message": {"id": "m1"}, "labelIds": ["UNREAD"]}]},
+            {"id": "503", "messagesDeleted": [{"message": {"id": "m2"}}]},
+        ]
+        gmail.fetched = []
+        recorder = SyncRecorder()
+        result = sync_gmail_mailbox(db, gmail_mailbox, gmail, recorder=recorder)
+
+        assert result == {"mode": "history", "inserted": 1, "updated": 1, "moved": 0, "deleted": 1}
+        assert (recorder.mode, recorder.scanned, recorder.new, recorder.updated) == ("history", 3, 1, 2)
+        assert set(recorder.phase_seconds) == {"list", "fetch", "parse", "store"}
+        assert gmail.fetched == ["m3"]
+        assert gmail_mailbox.gmail_history_id == "510"
+        emails = {e.message_id: e for e in db.query(Email).all()}
+        assert emails["m1"].is_read is True
+        assert emails["m2"].folder == "TRASH"
+
+    def test_history_moves_archived_trashed_and_restored_messages(self, db, gmail_mailbox):
+        from app.services.gmail_sync import sync_gmail_mailbox
+
+        gmail = FakeGmail([gmail_message(f"m{n}") for n in range(1, 5)], history_id="500")
+        sync_gmail_mailbox(db, gmail_mailbox, gmail)
+        gmail.history = [
+            # Archived
+            {"id": "501", "labelsRemoved": [{"message": {"id": "m1"}, "labelIds": ["INBOX"]}]},
+            # Trashed: TRASH added and INBOX removed, with or without the message's labels
+            {"id": "502", "labelsAdded": [{"message": {"id": "m2"}, "labelIds": ["TRASH"]}],
+             "labelsRemoved": [{"message": {"id": "m2"}, "labelIds": ["INBOX"]}]},
+            {"id": "503", "labelsAdded": [{"message": {"id": "m3", "labelIds": ["TRASH"]}, "labelIds": ["TRASH"]}]},
+            # Trashed, then restored to the inbox
+            {"id": "504", "labelsAdded": [{"message": {"id": "m4"}, "labelIds": ["TRASH"]}]},
+            {"id": "505", "labelsRemoved": [{"message": {"id": "m4", "labelIds": ["INBOX", "UNREAD"]}, "labelIds": ["TRASH"]}]},
+        ]
+        gmail.fetched = []
+
+        result = sync_gmail_mailbox(db, gmail_mailbox, gmail)
+
+        assert result["moved"] == 3
+        assert gmail.fetched == []
+        folders = {e.message_id: e.folder for e in db.query(Email).all()}
+        assert folders == {"m1": "ARCHIVE", "m2": "TRASH", "m3": "TRASH", "m4": "INBOX"}
+
+        # Moved back into the inbox, already stored: updated in place, not refetched
+        gmail.history = [{"id": "506", "labelsAdded": [{"message": {"id": "m1"}, "labelIds": ["INBOX"]}]}]
+        sync_gmail_mailbox(db, gmail_mailbox, gmail)
+        db.expire_all()
+        assert db.query(Email).filter(Email.message_id == "m1").one().folder == "INBOX"
+        assert gmail.fetched == []
+
+    def test_history_restores_from_trash_and_spam_without_message_labels(self):
+        from app.services.gmail_sync import HistoryChanges
+
+        changes = HistoryChanges()
+        for message_id, label in (("m1", "TRASH"), ("m2", "SPAM")):
+            changes.apply_record({"labelsAdded": [{"message": {"id": message_id}, "labelIds": [label]}],
+                                  "labelsRemoved": [{"message": {"id": message_id}, "labelIds": ["INBOX"]}]})
+        assert changes.folders == {"m1": "TRASH", "m2": "SPAM"}
+
+        # Untrash / not spam: INBOX added and TRASH or SPAM removed in the same record
+        for message_id, label in (("m1", "TRASH"), ("m2", "SPAM")):
+            changes.apply_record({"labelsAdded": [{"message": {"id": message_id}, "labelIds": ["INBOX"]}],
+                                  "labelsRemoved": [{"message": {"id": message_id}, "labelIds": [label]}]})
+        assert changes.folders == {"m1": "INBOX", "m2": "INBOX"}
+
+    def test_expired_history_falls_back_to_full_resync(self, db, gmail_mailbox):
+        from app.services.gmail_sync import sync_gmail_mailbox
+
+        gmail_mailbox.gmail_history_id = "1"
+        db.commit()
+        gmail = FakeGmail([gmail_message("m1")], history_id="900")
+        gmail.expired = True
+
+        result = sync_gmail_mailbox(db, gmail_mailbox, gmail)
+
+        assert result["mode"] == "full"
+        assert gmail_mailbox.gmail_history_id == "900"
+        assert db.query(Email).count() == 1
+
+
+class TestGmailFullSync:
+    """Test the paginated, checkpointed full resync."""
+
+    def test_walks_every_page_and_resumes_after_failure(self, db, gmail_mailbox, monkeypatch):
+        from app.services import gmail_sync
+        from app.services.sync_checkpoints import get_checkpoint
+
+        monkeypatch.setattr(gmail_sync, "FULL_SYNC_PAGE_SIZE", 2)
+        gmail = FakeGmail([gmail_message(f"m{n}") for n in range(5)], history_id="700")
+        gmail.fail_on_token = "4"
+
+        with pytest.raises(RuntimeError):
+            gmail_sync.full_resync(db, gmail_mailbox, gmail)
+
+        checkpoint = get_checkpoint(db, gmail_mailbox.id, gmail_sync.FULL_SYNC_MODE)
+        assert checkpoint.cursor == "2"
+        assert checkpoint.processed_count == 2
+        assert gmail_mailbox.gmail_history_id is None
+
+        gmail.history_id = "750"
+        gmail.listed_tokens = []
+        result = gmail_sync.full_resync(db, gmail_mailbox, gmail)
+
+        assert gmail.listed_tokens == ["2", "4"]
+        assert result["inserted"] == 3
+        assert db.query(Email).count() == 5
+        assert checkpoint.is_complete is True
+        assert checkpoint.processed_count == 5
+        # History resumes from when the resync started, not when it finished
+        assert gmail_mailbox.gmail_history_id == "700"
+
+
+class TestLazyBody:
+    """Test metadata-only sync with lazy body hydration."""
+
+    def test_sync_stores_metadata_and_body_loads_on_demand(self, db, gmail_mailbox, monkeypatch):
+        from app.services import gmail_sync
+
+        gmail_mailbox.user.google_access_token = "token"
+        db.commit()
+        gmail = FakeGmail([gmail_message("m1")])
+        gmail_sync.sync_gmail_mailbox(db, gmail_mailbox, gmail)
+
+        email = db.query(Email).one()
+        assert email.body_fetched is False
+        assert email.body_text is None
+        assert email.subject == "Subject m1"
+
+        monkeypatch.setattr(gmail_sync, "get_gmail_service", lambda db, user: gmail)
+        assert gmail_sync.ensure_email_body(db, email) is True
+        assert email.body_text == "Hello"
+        assert email.body_fetched is True
+
+        gmail.fetched = []
+        gmail_sync.ensure_email_body(db, email)
+        assert gmail.fetched == []
+
+    @pytest.mark.parametrize("error", [
+        HttpError(httplib2.Response({"status": 503}), b"backend error"),
+        RateLimitExceeded("gmail:1: no capacity"),
+    ])
+    def test_gmail_errors_leave_email_unhydrated(self, db, gmail_mailbox, monkeypatch, error):
+        from app.services import gmail_sync
+
+        gmail_mailbox.user.google_access_token = "token"
+        db.commit()
+        gmail = FakeGmail([gmail_message("m1")])
+        gmail_sync.sync_gmail_mailbox(db, gmail_mailbox, gmail)
+        email = db.query(Email).one()
+
+        def fail(*args, **kwargs):
+            raise error
+
+        gmail.get_message = fail
+        monkeypatch.setattr(gmail_sync, "get_gmail_service", lambda db, user: gmail)
+        assert gmail_sync.ensure_email_body(db, email) is False
+        assert email.body_fetched is False
+
+
+class TestLocalFirstReads:
+    """Test serving message reads from the local copy."""
+
+    def test_fresh_local_copy_is_a_hit_and_stale_goes_to_gmail(self, db, gmail_mailbox, monkeypatch):
+        from datetime import datetime, timedelta
+        from app.services import gmail_sync
+
+        gmail_mailbox.user.google_access_token = "token"
+        db.commit()
+        gmail = FakeGmail([gmail_message("m1")])
+        gmail_sync.sync_gmail_mailbox(db, gmail_mailbox, gmail)
+        gmail_mailbox.last_synced_at = datetime.utcnow()
+        db.commit()
+        monkeypatch.setattr(gmail_sync, "get_gmail_service", lambda db, user: gmail)
+        monkeypatch.setattr(gmail_sync, "local_reads", gmail_sync.LocalReadStats())
+        user = gmail_mailbox.user
+
+        # Metadata-only copy: first read fetches the body once, then it is local
+        gmail.fetched = []
+        assert gmail_sync.get_message_local_first(db, user, "m1")["body"] == "Hello"
+        message, served_locally = gmail_sync.read_message_local_first(db, user, "m1")
+        assert served_locally is True
+        assert message["subject"] == "Subject m1"
+        assert message["is_read"] is False
+        assert gmail.fetched == ["m1"]
+
+        gmail_mailbox.last_synced_at = datetime.utcnow() - timedelta(hours=1)
+        db.commit()
+        assert gmail_sync.read_message_local_first(db, user, "m1")[1] is False
+        assert gmail.fetched == ["m1", "m1"]
+        assert gmail_sync.local_reads.stats() == {"hits": 1, "misses": 2}
+
+
+class TestLazyAttachments:
+    """Test metadata-only attachment ingest with download on first use."""
+
+    def test_attachment_bytes_fetched_once_on_demand(self, db, gmail_mailbox, monkeypatch, tmp_path):
+        from app.models.attachment import Attachment
+        from app.services import gmail_sync
+        from app.services.blob_store import BlobStore
+
+        gmail_mailbox.user.google_access_token = "token"
+        db.commit()
+        message = gmail_message("m1")
+        message["attachments"] = [
+            {"attachment_id": "att-1", "filename": "a.pdf", "content_type": "application/pdf", "size": 14}
+        ]
+        gmail = FakeGmail([message])
+        gmail_sync.sync_gmail_mailbox(db, gmail_mailbox, gmail)
+
+        attachment = db.query(Attachment).one()
+        assert attachment.external_id == "att-1"
+        assert attachment.content_hash is None
+
+        store = BlobStore(str(tmp_path))
+        monkeypatch.setattr(gmail_sync, "get_gmail_service", lambda db, user: gmail)
+        gmail.fetched = []
+        assert gmail_sync.ensure_attachment_content(db, attachment, store) is True
+        assert gmail_sync.ensure_attachment_content(db, attachment, store) is True
+        assert gmail.fetched == ["att-1"]
+        assert b"".join(store.iter_chunks(attachment.content_hash)) == b"%PDF-1.4 att-1"
+
+    def test_gmail_error_leaves_attachment_missing(self, db, gmail_mailbox, monkeypatch, tmp_path):
+        from app.models.attachment import Attachment
+        from app.services import gmail_sync
+        from app.services.blob_store import BlobStore
+
+        gmail_mailbox.user.google_access_token = "token"
+        db.commit()
+        message = gmail_message("m1")
+        message["attachments"] = [
+            {"attachment_id": "att-1", "filename": "a.pdf", "content_type": "application/pdf", "size": 14}
+        ]
+        gmail = FakeGmail([message])
+        gmail_sync.sync_gmail_mailbox(db, gmail_mailbox, gmail)
+        attachment = db.query(Attachment).one()
+
+        def fail(*args, **kwargs):
+            raise HttpError(httplib2.Response({"status": 403}), b"forbidden")
+
+        gmail.get_attachment = fail
+        monkeypatch.setattr(gmail_sync, "get_gmail_service", lambda db, user: gmail)
+        assert gmail_sync.ensure_attachment_content(db, attachment, BlobStore(str(tmp_path))) is False
+        assert attachment.content_hash is None
@@ -0,0 +1,83 @@
+"""Tests for batched email ingest."""
+import pytest
+from datetime import datetime
+
+from app.models.attachment import Attachment
+from app.models.email import Email
+from app.models.mailbox import Mailbox
+
+
+@pytest.fixture
+def sync_mailbox(db, test_user):
+    mailbox = Mailbox(
+        user_id=test_user.id,
+        email_address="sync@example.com",
+        imap_host="localhost",
+        imap_port=993,
+        is_active=True
+    )
+    db.add(mailbox)
+    db.commit()
+    db.refresh(mailbox)
+    return mailbox
+
+
+def make_email_data(n, attachments=None):
+    return {
+        "message_id": f"<msg-{n}@example.com>",
+        "sender": "sender@example.com",
+        "recipients": "sync@example.com",
+        "subject": f"Message {n}",
+        "body_text": "Hello",
+        "body_html": "",
+        "received_at": datetime(2026, 1, 1, 12, n % 60),
+        "folder": "INBOX",
+        "attachments": attachments or [],
+    }
+
+
+class TestIngestEmails:
+    """Test set-based dedup and bulk insert."""
+
+    def test_skips_existing_and_duplicate_message_ids(self, db, sync_mailbox):
+        from app.services.ingest import ingest_emails
+
+        db.add(Email(mailbox_id=sync_mailbox.id, message_id="<msg-1@example.com>", sender="x"))
+        db.commit()
+
+        batch = [make_email_data(1), make_email_data(2), make_email_data(2), make_email_data(3)]
+        inserted = ingest_emails(db, sync_mailbox, batch, batch_size=2)
+
+        assert inserted == 2
+        assert db.query(Email).filter(Email.mailbox_id == sync_mailbox.id).count() == 3
+
+    def test_reingest_is_noop(self, db, sync_mailbox):
+        from app.services.ingest import ingest_emails
+
+        batch = [make_email_data(n) for n in range(5)]
+        assert ingest_emails(db, sync_mailbox, batch) == 5
+        assert ingest_emails(db, sync_mailbox, batch) == 0
+
+    def test_attachments_linked_to_new_emails(self, db, sync_mailbox, tmp_path):
+        from app.services.blob_store import BlobStore
+        from app.services.ingest import ingest_email_batch
+
+        store = BlobStore(str(tmp_path))
+        attachment = {
+            "filename": "report.pdf",
+            "content_type": "application/pdf",
+            "size": 3,
+            "content": b"pdf",
+        }
+        inserted = ingest_email_batch(
+            db, sync_mailbox,
+            [make_email_data(7, [attachment]), make_email_data(8, [attachment])],
+            blob_store=store
+        )
+
+        assert inserted == 2
+        rows = db.query(Attachment).all()
+        assert len(rows) == 2
+        assert rows[0].content_hash == rows[1].content_hash
+        assert rows[0].storage_path == store.path_for(rows[0].content_hash)
+        assert list(store.iter_digests()) == [rows[0].content_hash]
@@ -0,0 +1,78 @@
+"""Tests for keyset pagination of email listings."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.email import Email
+from app.utils.pagination import InvalidCursor, keyset_page
+
+
+@pytest.fixture
+def emails(db, mailbox):
+    base = datetime(2026, 1, 1)
+    rows = [
+        # Two emails share a timestamp; one has none
+        Email(mailbox_id=mailbox.id, message_id=f"p{n}", sender="a@example.com",
+              received_at=base + timedelta(minutes=min(n, 3)) if n != 5 else None)
+        for n in range(7)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+class TestKeysetPage:
+    """Test cursor paging over (received_at, id)."""
+
+    def test_walks_every_row_once_in_order(self, db, emails):
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = keyset_page(db.query(Email), 2, cursor)
+            seen.extend(email.message_id for email in page)
+            if cursor is None:
+                break
+
+        assert seen == ["p6", "p4", "p3", "p2", "p1", "p0", "p5"]
+
+    def test_rejects_garbage_cursor(self, db, emails):
+        with pytest.raises(InvalidCursor):
+            keyset_page(db.query(Email), 2, "not-a-cursor")
+
+    def test_offset_skips_rows_in_order(self, db, emails):
+        page, cursor = keyset_page(db.query(Email), 2, offset=3)
+        assert [email.message_id for email in page] == ["p2", "p1"]
+        page, _ = keyset_page(db.query(Email), 2, cursor)
+        assert [email.message_id for email in page] == ["p0", "p5"]
+
+
+class TestLegacyPaging:
+    """Test that positional paging still works for older clients."""
+
+    def test_email_list_page(self, user_client, emails):
+        response = user_client.get("/api/v1/emails/", params={"size": 2, "page": 2})
+        assert response.status_code == 200
+        assert [e["message_id"] for e in response.json()["items"]] == ["p3", "p2"]
+
+    def test_gmail_inbox_offset(self, user_client, emails):
+        response = user_client.get("/api/v1/gmail/inbox", params={"max_results": 2, "offset": 4})
+        assert response.status_code == 200
+        body = response.json()
+        assert [m["id"] for m in body["messages"]] == ["p1", "p0"]
+        assert body["next_offset"] == 6
+
+
+class TestListProjection:
+    """Test that listings leave the bodies in the database."""
+
+    def test_listings_do_not_load_bodies(self, user_client, emails):
+        from conftest import count_queries
+
+        with count_queries() as statements:
+            listed = user_client.get("/api/v1/emails/", params={"size": 3}).json()
+            inbox = user_client.get("/api/v1/gmail/inbox", params={"max_results": 3}).json()
+
+        selects = [s for s in statements if s.lstrip().startswith("SELECT") and "FROM emails" in s]
+        assert selects and not any("body_text" in s or "body_html" in s for s in selects)
+        assert len(listed["items"]) == 3
+        assert "body" not in inbox["messages"][0]
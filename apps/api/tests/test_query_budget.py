@@ -0,0 +1,65 @@
+"""Query budgets for the email routes: queries per request must not grow with the page size."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import count_queries
+from app.models.attachment import Attachment
+from app.models.email import Email
+from app.models.tag import Tag
+
+# the current user, mark_user_active (a SELECT, and an UPDATE at most once a
+# minute), the ETag's mailbox versions, the page, its attachments, its tags
+LIST_BUDGET = 7
+# the current user, the ETag's mailbox versions, the email, its attachments, its tags
+DETAIL_BUDGET = 5
+
+
+@pytest.fixture
+def emails(db, mailbox):
+    tags = [Tag(name="urgent", color="#f00"), Tag(name="billing", color="#0f0")]
+    db.add_all(tags)
+    db.commit()
+    base = datetime(2026, 5, 1)
+    rows = []
+    for n in range(10):
+        email = Email(
+            mailbox_id=mailbox.id, message_id=f"b{n}", sender="a@example.com", subject=f"Budget {n}",
+            body_text="x" * 1000, received_at=base + timedelta(minutes=n), tags=tags,
+        )
+        email.attachments = [
+            Attachment(filename=f"f{n}-{k}.pdf", content_type="application/pdf", size=10)
+            for k in range(2)
+        ]
+        rows.append(email)
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+class TestEmailRouteBudgets:
+    """Test that attachments and tags are loaded per page, not per email."""
+
+    @pytest.mark.parametrize("size", [2, 10])
+    def test_list_emails(self, user_client, emails, size):
+        with count_queries(budget=LIST_BUDGET):
+            response = user_client.get("/api/v1/emails/", params={"size": size})
+
+        assert response.status_code == 200
+        items = response.json()["items"]
+        assert len(items) == size
+        assert all(len(item["attachments"]) == 2 and len(item["tags"]) == 2 for item in items)
+
+    def test_email_detail(self, user_client, emails):
+        email_id = emails[0].id
+        with count_queries(budget=DETAIL_BUDGET):
+            response = user_client.get(f"/api/v1/emails/{email_id}")
+
+        assert response.status_code == 200
+        assert len(response.json()["attachments"]) == 2
+
+    def test_budget_failure_lists_statements(self, db, emails):
+        with pytest.raises(pytest.fail.Exception, match="budget is 1"):
+            with count_queries(budget=1):
+                for email in db.query(Email).limit(2).all():
+                    email.attachments
@@ -0,0 +1,59 @@
+"""Tests for the outbound API rate limiter."""
+import pytest
+
+from app.services import rate_limiter as rate_limiter_module
+from app.services.rate_limiter import LocalRateLimiter, RateLimitExceeded
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock; sleeping advances it."""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", lambda: now[0])
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    monkeypatch.setattr(rate_limiter_module.time, "sleep", sleep)
+    return now
+
+
+class TestLocalRateLimiter:
+    """Test the in-process token bucket."""
+
+    def test_burst_then_waits_for_refill(self, clock):
+        limiter = LocalRateLimiter()
+
+        assert limiter.acquire("gmail", "u1", cost=10, rate=10, burst=10) == 0
+        assert limiter.acquire("gmail", "u1", cost=5, rate=10, burst=10) == pytest.approx(0.5)
+        # Other keys have their own budget
+        assert limiter.acquire("gmail", "u2", cost=10, rate=10, burst=10) == 0
+
+    def test_backoff_halves_rate_and_success_recovers(self, clock):
+        limiter = LocalRateLimiter()
+        limiter.acquire("llm", cost=1, rate=1, burst=1)
+
+        limiter.backoff("llm")
+        assert limiter.factor("llm") == 0.5
+        assert limiter.acquire("llm", cost=1, rate=1, burst=1) == pytest.approx(2.0)
+
+        for _ in range(20):
+            limiter.success("llm")
+        assert limiter.factor("llm") == 1.0
+
+    def test_retry_after_blocks_bucket(self, clock):
+        limiter = LocalRateLimiter()
+        limiter.backoff("smtp", "mb1", retry_after=5)
+
+        with pytest.raises(RateLimitExceeded):
+            limiter.acquire("smtp", "mb1", rate=10, burst=10, max_wait=1)
+        assert limiter.acquire("smtp", "mb1", rate=10, burst=10) == pytest.approx(5.0)
+
+    def test_smtp_send_returns_false_when_rate_limited(self, clock, monkeypatch):
+        from app.services import smtp
+
+        limiter = LocalRateLimiter()
+        monkeypatch.setattr(smtp, "rate_limiter", limiter)
+        limiter.backoff("smtp", "mb1", retry_after=3600)
+
+        assert smtp.SMTPService().send_email("to@example.com", "Hi", "<p>Hi</p>", rate_key="mb1") is False
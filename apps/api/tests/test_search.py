@@ -0,0 +1,95 @@
+"""Tests for full-text mail search."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.email import Email
+from app.services.search import apply_search, field_tsquery, fts5_expression, parse_query
+
+
+@pytest.fixture
+def emails(db, mailbox):
+    base = datetime(2026, 3, 1)
+    rows = [
+        Email(mailbox_id=mailbox.id, message_id="s0", sender="Alice <alice@example.com>",
+              subject="Quarterly report", body_text="Numbers for the quarter are attached.",
+              received_at=base),
+        Email(mailbox_id=mailbox.id, message_id="s1", sender="Bob <bob@example.com>",
+              subject="Lunch", body_text="The quarterly report mentioned lunch budgets.",
+              received_at=base + timedelta(hours=1)),
+        Email(mailbox_id=mailbox.id, message_id="s2", sender="Carol <carol@example.com>",
+              subject="Invoices", body_text="Please find the report on invoicing, quarterly.",
+              received_at=base + timedelta(hours=2)),
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def search(db, q):
+    query, rank = apply_search(db, db.query(Email), q)
+    return [email.message_id for email in query.order_by(rank, Email.id.desc()).all()]
+
+
+class TestParseQuery:
+    """Test search string parsing."""
+
+    def test_words_phrases_and_filters(self):
+        parsed = parse_query('budget "team offsite" from:alice subject:"q3 plan"')
+        assert [(t.text, t.field, t.phrase) for t in parsed.terms] == [
+            ("budget", None, False),
+            ("team offsite", None, True),
+            ("alice", "from", False),
+            ("q3 plan", "subject", True),
+        ]
+
+    def test_unknown_prefix_is_searched_as_text(self):
+        parsed = parse_query("re:meeting")
+        assert [(t.text, t.field) for t in parsed.terms] == [("re:meeting", None)]
+
+    def test_fts5_expression_quotes_user_input(self):
+        assert fts5_expression(parse_query('NOT "a""b" from:x*')) == '"NOT" AND "a" AND "b" AND sender : "x*"'
+
+    def test_field_tsquery_weights_and_quotes_user_input(self):
+        subject, sender, body, empty = parse_query(r'subject:"Q3 budget" from:Alice@x.com body:it\'s body:!').terms
+        assert field_tsquery(subject) == "'q3':A <-> 'budget':A"
+        assert field_tsquery(sender) == "'alice@x.com':*B"
+        assert field_tsquery(body) == r"'it\\''s':C"
+        assert field_tsquery(empty) is None
+
+
+class TestSearch:
+    """Test searching against the SQLite FTS5 index."""
+
+    def test_ranks_subject_matches_first(self, db, emails):
+        assert search(db, "quarterly report")[0] == "s0"
+
+    def test_phrase_query(self, db, emails):
+        assert search(db, '"quarterly report"') == ["s0", "s1"]
+
+    def test_field_filters(self, db, emails):
+        assert search(db, "from:bob") == ["s1"]
+        assert search(db, "subject:report") == ["s0"]
+        assert search(db, "report from:carol") == ["s2"]
+
+    def test_index_follows_updates_and_deletes(self, db, emails):
+        emails[1].body_text = "Nothing to see"
+        db.commit()
+        assert search(db, '"quarterly report"') == ["s0"]
+
+        db.delete(emails[0])
+        db.commit()
+        assert search(db, "quarterly") == ["s2"]
+
+        db.add(Email(mailbox_id=emails[1].mailbox_id, message_id="s3", subject="Quarterly numbers"))
+        db.commit()
+        assert search(db, "quarterly") == ["s3", "s2"]
+
+    def test_list_emails_orders_by_relevance(self, user_client, emails):
+        response = user_client.get("/api/v1/emails/", params={"q": "quarterly report", "include_total": True})
+        assert response.status_code == 200
+        assert response.json()["items"][0]["message_id"] == "s0"
+        assert response.json()["total"] == 3
+
+        response = user_client.get("/api/v1/emails/", params={"q": "quarterly report", "sort": "date"})
+        assert [e["message_id"] for e in response.json()["items"]] == ["s2", "s1", "s0"]
@@ -0,0 +1,142 @@
+"""End-to-end sync tests against the in-process IMAP and SMTP servers."""
+import pytest
+from unittest.mock import patch
+
+from app.models.attachment import Attachment
+from app.models.email import Email
+from app.models.job import Job
+from app.models.mailbox import Mailbox
+from app.models.sync_run import SyncRun
+from conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def imap_mailbox(db, test_user, imap_server):
+    mailbox = Mailbox(
+        user_id=test_user.id,
+        email_address=imap_server.username,
+        imap_host=imap_server.host,
+        imap_port=imap_server.port,
+        hashed_password="encrypted",
+        is_active=True
+    )
+    db.add(mailbox)
+    db.commit()
+    db.refresh(mailbox)
+    return mailbox
+
+
+class TestIMAPClientAgainstServer:
+    """Exercise IMAPClient over a real socket."""
+
+    def test_fetch_latest(self, imap_server):
+        from app.integrations.imap.client import IMAPClient
+
+        with IMAPClient(imap_server.host, imap_server.port, imap_server.username, imap_server.password) as client:
+            emails = client.fetch_emails("INBOX", limit=3)
+
+        assert [e["subject"] for e in emails] == [f"Synthetic message {n}" for n in (12, 11, 10)]
+        assert imap_server.bytes_sent > 0
+
+    def test_uid_walk(self, imap_server):
+        from app.integrations.imap.client import IMAPClient
+
+        with IMAPClient(imap_server.host, imap_server.port, imap_server.username, imap_server.password) as client:
+            uid_validity, uids = client.list_uids("INBOX")
+            emails = client.fetch_by_uids(uids[:2], "INBOX")
+
+        assert uid_validity == "1"
+        assert uids == imap_server.mailbox.uids
+        assert [e["uid"] for e in emails] == [str(uid) for uid in uids[:2]]
+
+
+@patch("app.services.workers.decrypt_password", lambda value: "secret")
+class TestSyncJob:
+    """Run the sync worker function end to end."""
+
+    def test_process_sync_email_job(self, db, imap_mailbox, imap_server, tmp_path, monkeypatch):
+        from app.services import workers
+        from app.services.blob_store import blob_store
+
+        monkeypatch.setattr(workers, "SessionLocal", TestingSessionLocal)
+        monkeypatch.setattr(blob_store, "root", str(tmp_path))
+
+        job = Job(type="sync_email", status="pending", payload={"mailbox_id": imap_mailbox.id, "limit": 12})
+        db.add(job)
+        db.commit()
+
+        workers.process_sync_email_job(job.id)
+
+        db.refresh(job)
+        assert job.status == "completed", job.error
+        assert job.result["synced_count"] == 12
+        assert db.query(Email).filter(Email.mailbox_id == imap_mailbox.id).count() == 12
+        assert db.query(Attachment).count() > 0
+        run = db.query(SyncRun).one()
+        assert (run.status, run.mode, run.messages_new) == ("succeeded", "imap", 12)
+        assert run.bytes_transferred > 0
+
+    def test_job_coalesces_into_running_sync(self, db, imap_mailbox, monkeypatch):
+        from app.services import workers
+        from app.services.sync_lease import mailbox_lease
+
+        monkeypatch.setattr(workers, "SessionLocal", TestingSessionLocal)
+        running = mailbox_lease(imap_mailbox.id, "worker", session_factory=TestingSessionLocal)
+
+        job = Job(type="sync_email", status="pending", payload={"mailbox_id": imap_mailbox.id})
+        db.add(job)
+        db.commit()
+        workers.process_sync_email_job(job.id)
+        running.release()
+
+        db.refresh(job)
+        assert job.status == "completed"
+        assert job.result == {"synced_count": 0, "coalesced": True}
+
+
+class TestSMTPSink:
+    def test_send_email(self, smtp_sink, monkeypatch):
+        from app.core.config import settings
+        from app.services.smtp import SMTPService
+
+        monkeypatch.setattr(settings, "SMTP_HOST", smtp_sink.host)
+        monkeypatch.setattr(settings, "SMTP_PORT", smtp_sink.port)
+        monkeypatch.setattr(settings, "SMTP_TLS", False)
+        monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "bot@example.com")
+
+        assert SMTPService().send_email("to@example.com", "Hello", "<p>Hi</p>", "Hi") is True
+        assert len(smtp_sink.messages) == 1
+        assert smtp_sink.messages[0]["rcpt_to"] == ["<to@example.com>"]
+        assert b"Subject: Hello" in smtp_sink.messages[0]["data"]
+
+
+class TestCompression:
+    """COMPRESS=DEFLATE negotiation (RFC 4978)."""
+
+    def test_compression_negotiated_when_advertised(self):
+        from app.integrations.imap.client import IMAPClient
+        from mail_servers import FakeIMAPServer, SyntheticMailbox
+
+        server = FakeIMAPServer(
+            SyntheticMailbox(count=5, attachment_rate=0),
+            capabilities=("IMAP4rev1", "AUTH=PLAIN", "COMPRESS=DEFLATE")
+        )
+        with server:
+            with IMAPClient(server.host, server.port, server.username, server.password) as client:
+                emails = client.fetch_emails("INBOX", limit=5)
+            stats = client.transfer_stats()
+
+        assert [e["subject"] for e in emails][0] == "Synthetic message 5"
+        assert stats["compressed"] is True
+        assert stats["bytes_on_wire"] < stats["bytes_uncompressed"]
+        assert server.bytes_sent < server.mailbox.total_bytes
+
+    def test_uncompressed_without_capability(self, imap_server):
+        from app.integrations.imap.client import IMAPClient
+
+        with IMAPClient(imap_server.host, imap_server.port, imap_server.username, imap_server.password) as client:
+            client.fetch_emails("INBOX", limit=2)
+            stats = client.transfer_stats()
+
+        assert stats["compressed"] is False
+        assert stats["bytes_on_wire"] == stats["bytes_uncompressed"]
@@ -0,0 +1,44 @@
+"""Tests for mailbox sync leases."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.sync_lease import LeaseLost, MailboxLease, mailbox_lease
+from conftest import TestingSessionLocal
+
+
+class TestMailboxLease:
+    """Test exclusive sync leases with fencing tokens."""
+
+    def test_second_sync_coalesces_until_release(self, mailbox):
+        first = mailbox_lease(mailbox.id, "worker", session_factory=TestingSessionLocal)
+        assert first is not None
+
+        assert mailbox_lease(mailbox.id, "job", session_factory=TestingSessionLocal) is None
+
+        first_token = first.token
+        first.release()
+        second = mailbox_lease(mailbox.id, "job", session_factory=TestingSessionLocal)
+        assert second is not None
+        assert second.token == first_token + 1
+        second.release()
+
+    def test_expired_lease_is_taken_over_and_old_holder_fenced(self, db, mailbox):
+        stalled = MailboxLease(mailbox.id, "stalled", ttl=60, session_factory=TestingSessionLocal)
+        assert stalled.acquire()
+        stalled._stop.set()  # no heartbeat: simulate a stalled holder
+
+        mailbox.sync_lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        fresh = MailboxLease(mailbox.id, "fresh", ttl=60, session_factory=TestingSessionLocal)
+        assert fresh.acquire()
+
+        with pytest.raises(LeaseLost):
+            stalled.check()
+        assert stalled.renew() is False
+        fresh.check()
+
+        stalled.release()  # must not clear the new holder's lease
+        db.refresh(mailbox)
+        assert mailbox.sync_lease_owner == "fresh"
+        fresh.release()
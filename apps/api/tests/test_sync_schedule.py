@@ -0,0 +1,114 @@
+"""Tests for adaptive per-mailbox sync scheduling."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import count_queries
+from app.models.mailbox import Mailbox
+from app.services import sync_schedule
+
+
+@pytest.fixture
+def mailboxes(db, test_user):
+    test_user.google_access_token = "token"
+    rows = [
+        Mailbox(user_id=test_user.id, email_address=f"box{n}@example.com", provider="gmail", is_active=True)
+        for n in range(3)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+class TestSyncSchedule:
+    """Test interval adaptation and due ordering."""
+
+    def test_busy_mailbox_syncs_sooner_than_dormant(self, db, mailboxes):
+        now = datetime(2026, 1, 1, 12, 0)
+        busy, dormant, _ = mailboxes
+        for mailbox in (busy, dormant):
+            mailbox.last_synced_at = now - timedelta(minutes=10)
+
+        sync_schedule.record_sync_result(db, busy, inserted=20, now=now)
+        sync_schedule.record_sync_result(db, dormant, inserted=0, now=now)
+
+        # 120/hour observed, smoothed from 0 to 36/hour
+        assert busy.sync_interval == 100
+        assert dormant.sync_interval == sync_schedule.settings.SYNC_MAX_INTERVAL
+        assert dormant.next_sync_at == now + timedelta(seconds=dormant.sync_interval)
+
+    def test_failures_back_off_and_success_resets(self, db, mailboxes, monkeypatch):
+        monkeypatch.setattr(sync_schedule.random, "uniform", lambda a, b: 1.0)
+        now = datetime(2026, 1, 1, 12, 0)
+        mailbox = mailboxes[0]
+
+        sync_schedule.record_sync_result(db, mailbox, failed=True, now=now)
+        first = mailbox.sync_interval
+        sync_schedule.record_sync_result(db, mailbox, failed=True, now=now)
+        assert mailbox.sync_interval == first * 2
+        assert mailbox.last_synced_at is None
+
+        sync_schedule.record_sync_result(db, mailbox, now=now)
+        assert mailbox.sync_failures == 0
+
+    def test_due_order_and_user_activity(self, db, mailboxes, test_user):
+        now = datetime(2026, 1, 1, 12, 0)
+        unscheduled, overdue, later = mailboxes
+        overdue.next_sync_at = now - timedelta(minutes=5)
+        later.next_sync_at = now + timedelta(minutes=30)
+        db.commit()
+
+        assert sync_schedule.due_mailbox_ids(db, limit=10, now=now) == [unscheduled.id, overdue.id]
+
+        sync_schedule.mark_user_active(db, test_user.id, now=now)
+        db.refresh(later)
+        assert later.next_sync_at == now + timedelta(seconds=sync_schedule.settings.SYNC_ACTIVE_INTERVAL)
+        assert later.last_activity_at == now
+
+    def test_user_activity_keeps_backoff_and_writes_once_a_minute(self, db, mailboxes, test_user):
+        now = datetime(2026, 1, 1, 12, 0)
+        healthy, failing, _ = mailboxes
+        healthy.next_sync_at = failing.next_sync_at = now + timedelta(minutes=30)
+        failing.sync_failures = 3
+        db.commit()
+
+        sync_schedule.mark_user_active(db, test_user.id, now=now)
+        db.refresh(healthy)
+        db.refresh(failing)
+        assert healthy.next_sync_at == now + timedelta(seconds=sync_schedule.settings.SYNC_ACTIVE_INTERVAL)
+        assert failing.next_sync_at == now + timedelta(minutes=30)
+        assert failing.last_activity_at == now
+
+        user_id = test_user.id
+        with count_queries(budget=1):
+            sync_schedule.mark_user_active(db, user_id, now=now + timedelta(seconds=30))
+        db.refresh(healthy)
+        assert healthy.last_activity_at == now
+
+    def test_defer_sync_only_pushes_forward(self, db, mailboxes):
+        now = datetime(2026, 1, 1, 12, 0)
+        unscheduled, overdue, later = mailboxes
+        overdue.next_sync_at = now - timedelta(minutes=5)
+        later.next_sync_at = now + timedelta(minutes=30)
+        db.commit()
+
+        for mailbox in mailboxes:
+            sync_schedule.defer_sync(db, mailbox.id, now=now)
+        soon = now + timedelta(seconds=sync_schedule.settings.SYNC_ACTIVE_INTERVAL)
+        assert [mailbox.next_sync_at for mailbox in mailboxes] == [soon, soon, now + timedelta(minutes=30)]
+        assert sync_schedule.due_mailbox_ids(db, limit=10, now=now) == []
+
+    def test_only_gmail_mailboxes_with_a_token_are_scheduled(self, db, mailboxes, test_user):
+        now = datetime(2026, 1, 1, 12, 0)
+        gmail, over_imap, _ = mailboxes
+        over_imap.imap_host = "imap.gmail.com"
+        mailboxes[2].provider = "custom"
+        db.commit()
+
+        assert sync_schedule.due_mailbox_ids(db, limit=10, now=now) == [gmail.id]
+        assert sync_schedule.seconds_until_due(db, now=now) == 0.0
+
+        test_user.google_access_token = None
+        db.commit()
+        assert sync_schedule.due_mailbox_ids(db, limit=10, now=now) == []
+        assert sync_schedule.seconds_until_due(db, now=now) is None
@@ -0,0 +1,85 @@
+"""Tests for sync cycle statistics and lag metrics."""
+from datetime import datetime, timedelta
+
+from app.models.mailbox import Mailbox
+
+
+class TestSyncStats:
+    """Test per-mailbox lag and the Prometheus sync metrics."""
+
+    def test_lag_for_active_gmail_mailboxes(self, db, test_user):
+        from app.services.sync_stats import mailbox_sync_lag
+
+        now = datetime(2026, 1, 1, 12, 0, 0)
+        test_user.google_access_token = "token"
+        synced = Mailbox(user_id=test_user.id, email_address="a@example.com", provider="gmail",
+                         last_synced_at=now - timedelta(seconds=90))
+        never = Mailbox(user_id=test_user.id, email_address="b@example.com", provider="gmail",
+                        created_at=now - timedelta(hours=1))
+        inactive = Mailbox(user_id=test_user.id, email_address="c@example.com", provider="gmail",
+                           is_active=False)
+        imap = Mailbox(user_id=test_user.id, email_address="d@example.com", provider="custom",
+                       created_at=now - timedelta(days=30))
+        db.add_all([synced, never, inactive, imap])
+        db.commit()
+
+        assert mailbox_sync_lag(db, now=now) == {synced.id: 90.0, never.id: 3600.0}
+
+    def test_prometheus_lines_are_aggregated(self, db, test_user, monkeypatch):
+        from app.models.sync_run import SyncRun
+        from app.routes import metrics
+
+        now = datetime.utcnow()
+        test_user.google_access_token = "token"
+        mailboxes = [
+            Mailbox(user_id=test_user.id, email_address=f"{n}@example.com", provider="gmail",
+                    last_synced_at=now - timedelta(seconds=lag))
+            for n, lag in enumerate((10, 600))
+        ]
+        db.add_all(mailboxes)
+        db.commit()
+        db.add_all([
+            SyncRun(mailbox_id=mailbox.id, trigger="scheduler", status="completed", duration_seconds=seconds,
+                    messages_new=3, bytes_transferred=1000, phase_seconds={"fetch": seconds / 2})
+            for mailbox, seconds in zip(mailboxes, (1.0, 3.0))
+        ])
+        db.commit()
+        monkeypatch.setattr(metrics, "load_cycle_stats", lambda: {
+            "duration_seconds": 4.2, "succeeded": 3, "failed": 1, "timed_out": 0, "skipped": 0
+        })
+
+        text = metrics.sync_metrics(db)
+
+        assert "smartmailbox_sync_cycle_seconds 4.2" in text
+        assert 'smartmailbox_sync_cycle_mailboxes{outcome="failed"} 1' in text
+        assert 'smartmailbox_sync_lag_mailboxes{le="60"} 1' in text
+        assert 'smartmailbox_sync_lag_mailboxes{le="900"} 2' in text
+        assert 'smartmailbox_sync_run_seconds{stat="max"} 3.0' in text
+        assert 'smartmailbox_sync_run_seconds{stat="avg"} 2.0' in text
+        assert 'smartmailbox_sync_phase_seconds{phase="fetch"} 2.0' in text
+        assert 'smartmailbox_sync_messages{outcome="new"} 6' in text
+        assert "smartmailbox_sync_bytes 2000" in text
+        assert "smartmailbox_sync_lag_mailboxes{mailbox_id" not in text
+
+    def test_prometheus_names_only_the_slowest_mailboxes(self, db, test_user, monkeypatch):
+        from app.models.sync_run import SyncRun
+        from app.routes import metrics
+
+        monkeypatch.setattr(metrics, "SYNC_TOP_MAILBOXES", 2)
+        mailboxes = [Mailbox(user_id=test_user.id, email_address=f"{n}@example.com") for n in range(3)]
+        db.add_all(mailboxes)
+        db.commit()
+        db.add_all([
+            SyncRun(mailbox_id=mailbox.id, trigger="scheduler", status="completed", duration_seconds=seconds,
+                    phase_seconds={"fetch": seconds})
+            for mailbox, seconds in zip(mailboxes, (5.0, 1.0, 3.0))
+        ])
+        db.commit()
+        monkeypatch.setattr(metrics, "load_cycle_stats", lambda: None)
+
+        text = metrics.sync_metrics(db)
+
+        slow, fast, middle = (mailbox.id for mailbox in mailboxes)
+        assert f'smartmailbox_mailbox_sync_run_seconds{{mailbox_id="{slow}"}} 5.0' in text
+        assert f'smartmailbox_mailbox_sync_phase_seconds{{mailbox_id="{middle}",phase="fetch"}} 3.0' in text
+        assert f'mailbox_id="{fast}"' not in text
@@ -0,0 +1,28 @@
+"""Tests for sync run telemetry."""
+from app.models.sync_run import SyncRun
+from app.services import sync_telemetry
+from app.services.sync_telemetry import SyncRecorder, finish_sync_run, start_sync_run
+
+
+class TestSyncRuns:
+    """Test recording and pruning sync runs."""
+
+    def test_finish_stores_numbers_and_keeps_recent_history(self, db, mailbox, monkeypatch):
+        monkeypatch.setattr(sync_telemetry.settings, "SYNC_RUN_HISTORY", 3)
+
+        for n in range(5):
+            recorder = SyncRecorder()
+            with recorder.phase("fetch"):
+                pass
+            recorder.add(scanned=10, new=n, skipped=10 - n, bytes_transferred=1000)
+            run = finish_sync_run(db, start_sync_run(db, mailbox.id, "scheduler"), recorder)
+
+        runs = sync_telemetry.recent_sync_runs(db, mailbox.id)
+        assert [r.messages_new for r in runs] == [4, 3, 2]
+        assert run.status == "succeeded"
+        assert run.bytes_transferred == 1000
+        assert set(run.phase_seconds) == {"list", "fetch", "parse", "store"}
+
+        start_sync_run(db, mailbox.id, "job")  # still running; not reported as latest
+        assert [r.id for r in sync_telemetry.latest_finished_runs(db)] == [run.id]
+        assert db.query(SyncRun).count() == 4
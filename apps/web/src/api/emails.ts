@@ -20,6 +20,7 @@ export interface Email {
   sender: string;
   recipients?: any;
   subject: string;
+  snippet?: string | null;
   folder: string;
   is_read: boolean;
   is_flagged: boolean;
@@ -37,18 +38,22 @@ export interface EmailDetail extends Email {
 
 export interface EmailListResponse {
   items: Email[];
-  total: number;
+  total?: number | null;
   page: number;
   size: number;
+  next_cursor?: string | null;
 }
 
 export const getEmails = async (params: {
   page?: number;
   size?: number;
+  cursor?: string;
+  include_total?: boolean;
   mailbox_id?: number;
   folder?: string;
   is_read?: boolean;
   q?: string;
+  sort?: "date" | "relevance";
 }): Promise<EmailListResponse> => {
   const response = await http.get('/emails', { params });
   return response.data;
@@ -164,3 +169,20 @@ export const bulkGenerateDrafts = async (
   const response = await http.post('/jobs/bulk-draft', { email_ids: emailIds, instructions, tone });
   return response.data;
 };
+
+export interface BulkEmailAction {
+  email_ids?: number[];
+  filter?: { mailbox_id?: number; folder?: string; is_read?: boolean; q?: string };
+  is_read?: boolean;
+  is_flagged?: boolean;
+  folder?: string;
+  state?: "open" | "replied" | "closed";
+  assigned_user_id?: number | null;
+  add_tags?: string[];
+  remove_tag_ids?: number[];
+}
+
+export const bulkUpdateEmails = async (action: BulkEmailAction): Promise<{ matched: number }> => {
+  const response = await http.post('/emails/bulk', action);
+  return response.data;
+};
@@ -3,23 +3,27 @@ import http from './http';
 /**
  * Gmail API types matching backend response
  */
-export interface GmailMessage {
+export interface GmailMessageSummary {
   id: string;
   thread_id: string;
   subject: string;
   sender: string;
-  to: string;
   date: string;
   snippet: string;
+  is_read: boolean;
+}
+
+/** A single message; inbox listings return summaries without the body */
+export interface GmailMessage extends GmailMessageSummary {
+  to: string;
   body: string;
   labels: string[];
-  is_read: boolean;
 }
 
 export interface GmailInboxResponse {
-  messages: GmailMessage[];
+  messages: GmailMessageSummary[];
   count: number;
-  nextPageToken?: string;
+  nextPageToken?: string | null;
 }
 
 export interface GmailStats {
@@ -17,7 +17,7 @@ import {
   IconButton,
 } from '@mui/material';
 import { AutoAwesome, Send, Close, Edit, Block } from '@mui/icons-material';
-import { generateAutoReply, sendGmailReply, GmailMessage } from '../../api/gmail';
+import { generateAutoReply, sendGmailReply, GmailMessageSummary } from '../../api/gmail';
 
 // Cache for auto-replies to persist during session
 const replyCache = new Map<string, { text: string; tone: string; timestamp: number }>();
@@ -26,7 +26,7 @@ const CACHE_DURATION = 5 * 60 * 1000; // 5 minutes
 interface AutoReplyDialogProps {
   open: boolean;
   onClose: () => void;
-  email: GmailMessage | null;
+  email: (GmailMessageSummary & { body?: string }) | null;
   onSuccess?: () => void;
 }
 
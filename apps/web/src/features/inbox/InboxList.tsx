@@ -18,13 +18,13 @@ import {
 } from '@mui/material';
 import { Refresh, MailOutline, AutoAwesome } from '@mui/icons-material';
 import { useNavigate } from 'react-router-dom';
-import { getGmailInbox, GmailMessage } from '../../api/gmail';
+import { getGmailInbox, GmailMessageSummary } from '../../api/gmail';
 import { AutoReplyDialog } from './AutoReplyDialog';
 import { useNotification } from '../../context/NotificationContext';
 
 export const InboxList = () => {
   const navigate = useNavigate();
-  const [emails, setEmails] = useState<GmailMessage[]>([]);
+  const [emails, setEmails] = useState<GmailMessageSummary[]>([]);
   const [loading, setLoading] = useState(true);
   const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -34,7 +34,7 @@ export const InboxList = () => {
 
   // Auto-reply dialog state
   const [autoReplyOpen, setAutoReplyOpen] = useState(false);
-  const [selectedEmail, setSelectedEmail] = useState<GmailMessage | null>(null);
+  const [selectedEmail, setSelectedEmail] = useState<GmailMessageSummary | null>(null);
 
   // Polling ref
   const pollingRef = useRef<NodeJS.Timeout | null>(null);
@@ -129,7 +129,7 @@ export const InboxList = () => {
     return sender;
   };
 
-  const handleAutoReplyClick = (e: React.MouseEvent, email: GmailMessage) => {
+  const handleAutoReplyClick = (e: React.MouseEvent, email: GmailMessageSummary) => {
     e.stopPropagation();
     setSelectedEmail(email);
     setAutoReplyOpen(true);
@@ -10,6 +10,12 @@ class WorkerSettings(BaseSettings):
     # Redis
     REDIS_URL: RedisDsn
     
+    # Mailbox sync
+    SYNC_CONCURRENCY: int = 8  # Mailboxes synced in parallel
+    SYNC_MAILBOX_TIMEOUT: int = 300  # Seconds before a mailbox sync is abandoned for the cycle
+    SYNC_DUE_BATCH: int = 200  # Most due mailboxes taken per cycle (earliest next_sync_at first)
+    SYNC_POLL_INTERVAL: int = 60  # Longest idle sleep between cycles
+    
     # LLM
     LLM_MODEL_PATH: str = "/models/llama-2-7b-chat.gguf"
     
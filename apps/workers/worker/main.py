@@ -1,20 +1,37 @@
 import time
 import logging
-from worker.tasks.sync_emails import sync_all_mailboxes
+from app.db.session import SessionLocal
+from app.services.sync_schedule import seconds_until_due
+from worker.config import settings
+from worker.tasks.sync_emails import sync_due_mailboxes
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def _idle_seconds() -> float:
+    """Sleep until the next mailbox is due, at most SYNC_POLL_INTERVAL."""
+    db = SessionLocal()
+    try:
+        due_in = seconds_until_due(db)
+    finally:
+        db.close()
+    if due_in is None:
+        return settings.SYNC_POLL_INTERVAL
+    return min(max(due_in, 1.0), settings.SYNC_POLL_INTERVAL)
+
+
 def main():
     logger.info("Worker started...")
     while True:
         try:
-            sync_all_mailboxes()
+            sync_due_mailboxes()
+            idle = _idle_seconds()
         except Exception as e:
             logger.error(f"Error in sync task: {e}")
+            idle = settings.SYNC_POLL_INTERVAL
         
-        # Poll every 60 seconds
-        time.sleep(60)
+        time.sleep(idle)
 
 if __name__ == "__main__":
     main()
@@ -1,98 +1,196 @@
 import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
 from sqlalchemy.orm import Session
 from app.db.session import SessionLocal
 from app.models.mailbox import Mailbox
-from app.models.email import Email
-from app.services.gmail_service import GmailService
-from sqlalchemy import create_engine
-import os
-
-from concurrent.futures import ThreadPoolExecutor
+from app.services.gmail_service import get_gmail_service
+from app.services.gmail_sync import sync_gmail_mailbox
+from app.services.sync_lease import LeaseLost, mailbox_lease
+from app.services.sync_schedule import defer_sync, due_mailbox_ids, record_sync_result, scheduled_mailboxes
+from app.services.sync_stats import mailbox_sync_lag, publish_cycle_stats
+from app.services.sync_telemetry import SyncRecorder, finish_sync_run, start_sync_run
+from worker.config import settings as worker_settings
 
 logger = logging.getLogger(__name__)
 
-def sync_all_mailboxes():
+_executor: Optional[ThreadPoolExecutor] = None
+# Mailbox id -> running sync; a mailbox that overran its timeout stays here until it finishes
+_in_flight: Dict[int, Future] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=worker_settings.SYNC_CONCURRENCY,
+            thread_name_prefix="mailbox-sync"
+        )
+    return _executor
+
+
+def _release(mailbox_id: int, future: Future) -> None:
+    if _in_flight.get(mailbox_id) is future:
+        del _in_flight[mailbox_id]
+
+
+def _sync_one(mailbox_id: int, started_at: Dict[int, float]) -> Optional[bool]:
+    """
+    Sync one mailbox in its own session under its sync lease, record the run
+    and schedule its next sync. Returns False on failure and None when
+    nothing was synced: another process was already syncing the mailbox (its
+    next sync is then deferred) or it is no longer a scheduled mailbox.
+    Never raises.
+    """
+    started_at[mailbox_id] = time.monotonic()
+    lease = run = None
+    recorder = SyncRecorder()
     db = SessionLocal()
     try:
-        mailboxes = db.query(Mailbox).filter(Mailbox.is_active == True).all()
-        for mailbox in mailboxes:
-            sync_mailbox_delta(db, mailbox)
+        lease = mailbox_lease(mailbox_id, "worker")
+        if lease is None:
+            # Don't pick it up again every cycle while the holder is still syncing
+            defer_sync(db, mailbox_id)
+            return None
+        mailbox = db.query(Mailbox).filter(Mailbox.id == mailbox_id, scheduled_mailboxes()).first()
+        if not mailbox:
+            # Deleted or disconnected since it was picked: no run, not recorded as synced
+            return None
+        run = start_sync_run(db, mailbox_id, "scheduler")
+        result = sync_mailbox_delta(db, mailbox, fence=lease.check, recorder=recorder)
+        record_sync_result(db, mailbox, inserted=result["inserted"] if result else 0)
+        finish_sync_run(db, run, recorder)
+        return True
+    except LeaseLost as e:
+        logger.warning(f"Abandoning sync of mailbox {mailbox_id}: {e}")
+        db.rollback()
+        if run:
+            finish_sync_run(db, run, recorder, status="failed", error=str(e))
+        return None
+    except Exception as e:
+        logger.error(f"Sync failed for mailbox {mailbox_id}: {e}")
+        db.rollback()
+        mailbox = db.get(Mailbox, mailbox_id)
+        if mailbox:
+            mailbox.sync_status = "failed"
+            record_sync_result(db, mailbox, failed=True)
+        if run:
+            finish_sync_run(db, run, recorder, status="failed", error=str(e))
+        return False
     finally:
         db.close()
+        if lease:
+            lease.release()
+
+
+def sync_due_mailboxes() -> Dict[str, Any]:
+    """
+    Sync the mailboxes whose next_sync_at has passed, most overdue first,
+    up to SYNC_CONCURRENCY at a time. Each sync schedules the mailbox's next
+    one (see app.services.sync_schedule).
+    Returns (and publishes) a summary with cycle time and the worst mailbox lag.
+    """
+    cycle_started = time.monotonic()
+    db = SessionLocal()
+    try:
+        # Over-fetch so mailboxes still running from an earlier cycle don't use up the batch
+        due = due_mailbox_ids(db, worker_settings.SYNC_DUE_BATCH + len(_in_flight))
+    finally:
+        db.close()
+    mailbox_ids = [mid for mid in due if mid not in _in_flight][:worker_settings.SYNC_DUE_BATCH]
+    skipped = len(due) - len([mid for mid in due if mid not in _in_flight])
+
+    executor = _get_executor()
+    started_at: Dict[int, float] = {}
+    futures: Dict[Future, int] = {}
+    for mailbox_id in mailbox_ids:
+        future = executor.submit(_sync_one, mailbox_id, started_at)
+        _in_flight[mailbox_id] = future
+        future.add_done_callback(lambda f, mid=mailbox_id: _release(mid, f))
+        futures[future] = mailbox_id
+
+    succeeded = failed = timed_out = coalesced = 0
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+        for future in done:
+            outcome = future.result()
+            if outcome is None:
+                coalesced += 1
+            elif outcome:
+                succeeded += 1
+            else:
+                failed += 1
+        # Queued mailboxes have no start time yet and cannot time out
+        now = time.monotonic()
+        for future in list(pending):
+            mailbox_id = futures[future]
+            if now - started_at.get(mailbox_id, now) > worker_settings.SYNC_MAILBOX_TIMEOUT:
+                logger.error(f"Sync of mailbox {mailbox_id} exceeded {worker_settings.SYNC_MAILBOX_TIMEOUT}s")
+                pending.discard(future)
+                timed_out += 1
 
-def sync_mailbox_delta(db: Session, mailbox: Mailbox):
+    db = SessionLocal()
+    try:
+        lag = mailbox_sync_lag(db)
+    finally:
+        db.close()
+
+    stats = {
+        "finished_at": datetime.utcnow().isoformat(),
+        "duration_seconds": round(time.monotonic() - cycle_started, 3),
+        "mailboxes": len(mailbox_ids),
+        "succeeded": succeeded,
+        "failed": failed,
+        "timed_out": timed_out,
+        "skipped": skipped,
+        "coalesced": coalesced,
+        "max_lag_seconds": max(lag.values(), default=0.0),
+    }
+    publish_cycle_stats(stats)
+    logger.info(
+        f"Sync cycle: {len(mailbox_ids)} mailboxes in {stats['duration_seconds']}s "
+        f"({succeeded} ok, {failed} failed, {timed_out} timed out, {skipped} still running, "
+        f"{coalesced} already syncing elsewhere)"
+    )
+    return stats
+
+
+def sync_mailbox_delta(
+    db: Session,
+    mailbox: Mailbox,
+    fence: Optional[Callable[[], None]] = None,
+    recorder: Optional[SyncRecorder] = None,
+) -> Optional[Dict[str, Any]]:
     # This requires user's google tokens. In a real app, we'd fetch them from the User model associated with mailbox.
     user = mailbox.user
     if not user or not user.google_access_token:
-        return
+        return None
 
     logger.info(f"Syncing delta for {mailbox.email_address}")
     
-    gmail = GmailService(
-        access_token=user.google_access_token,
-        refresh_token=user.google_refresh_token
-    )
-    
-    # Simple delta: items in INBOX
-    query = "label:INBOX"
-    if mailbox.last_synced_at:
-        # Fetch emails since last sync
-        query += f" after:{int(mailbox.last_synced_at.timestamp())}"
-    
-    # Increase batch size to 100
-    result = gmail.list_messages(max_results=100, q=query)
-    messages = result.get('messages', [])
+    gmail = get_gmail_service(db, user)
+    recorder = recorder or SyncRecorder()
+    bytes_before = gmail.bytes_received
     
-    if not messages:
-        # Update overall stats even if no new messages
-        stats = gmail.get_mailbox_stats()
-        mailbox.total_messages = stats.get('total_messages', 0)
-        mailbox.unread_messages = stats.get('unread_messages', 0)
-        mailbox.last_synced_at = datetime.utcnow()
-        db.commit()
-        return
-
-    # Check which messages are already in DB
-    existing_ids = {id[0] for id in db.query(Email.message_id).filter(Email.mailbox_id == mailbox.id).all()}
-    new_message_refs = [m for m in messages if m['id'] not in existing_ids]
-
-    new_emails_count = 0
-    if new_message_refs:
-        # Fetch message details in parallel
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            full_messages = list(executor.map(lambda ref: gmail.get_message(ref['id']), new_message_refs))
-            
-        for full_msg in full_messages:
-            if full_msg:
-                # Basic date parsing
-                try:
-                    # In a real app we'd parse the 'Date' header properly
-                    received_at = datetime.utcnow() 
-                except:
-                    received_at = datetime.utcnow()
-
-                email = Email(
-                    mailbox_id=mailbox.id,
-                    message_id=full_msg['id'],
-                    thread_id=full_msg['thread_id'],
-                    sender=full_msg['sender'],
-                    recipients=[full_msg['to']],
-                    subject=full_msg['subject'],
-                    body_text=full_msg['body'],
-                    snippet=full_msg['snippet'],
-                    # Map is_read from Gmail data
-                    is_read='UNREAD' not in full_msg.get('labelIds', []),
-                    received_at=received_at
-                )
-                db.add(email)
-                new_emails_count += 1
+    # Only what changed since the stored historyId (full resync on first run or expiry)
+    try:
+        result = sync_gmail_mailbox(db, mailbox, gmail, fence, recorder)
+    finally:
+        # Approximate: API calls for the same user made meanwhile share the client
+        recorder.add(bytes_transferred=gmail.bytes_received - bytes_before)
     
     # Fetch overall stats
     stats = gmail.get_mailbox_stats()
     mailbox.total_messages = stats.get('total_messages', 0)
     mailbox.unread_messages = stats.get('unread_messages', 0)
     
-    mailbox.last_synced_at = datetime.utcnow()
+    mailbox.sync_status = "idle"
     db.commit()
-    logger.info(f"Synced {new_emails_count} new emails for {mailbox.email_address}")
+    logger.info(
+        f"Synced {mailbox.email_address} ({result['mode']}): {result['inserted']} new, "
+        f"{result['updated']} updated, {result['moved']} moved, {result['deleted']} deleted"
+    )
+    return result
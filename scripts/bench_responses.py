@@ -0,0 +1,149 @@
+"""
+Response encoding benchmark: JSON serialization time and bytes on the wire
+for a 100-item inbox page, with the stock FastAPI setup ("before") and the
+API's setup ("after": compression, plus orjson on the plain-dict route).
+
+Both variants serve the same prebuilt page from an in-process app, so the
+numbers isolate serialization, compression and framework overhead from the
+database. Pages are served the way the API serves them: /emails through the
+EmailListResponse model, /gmail/inbox as plain dicts. The "orjson" setup
+uses orjson for both routes, showing that it only pays off for plain dicts.
+
+    python scripts/bench_responses.py --items 100 --requests 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'apps', 'api'))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "benchsecretkey12345678901234567890")
+os.environ.setdefault("ENCRYPTION_KEY", "benchencryptionkey1234567890123")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.middleware.compression import CompressionMiddleware, brotli  # noqa: E402
+from app.core.responses import ORJSONResponse  # noqa: E402
+from app.schemas.email import EmailListResponse  # noqa: E402
+
+WORDS = "quarterly report meeting invoice schedule update review budget team project".split()
+
+
+def sample_pages(items: int):
+    base = datetime(2026, 1, 1)
+    emails = []
+    for n in range(items):
+        words = [WORDS[(n + k) % len(WORDS)] for k in range(40)]
+        emails.append({
+            "id": n + 1,
+            "mailbox_id": 1,
+            "message_id": f"<{n}.{n * 7919}@mail.example.com>",
+            "sender": f"Sender {n % 17} <sender{n % 17}@example.com>",
+            "recipients": {"to": ["me@example.com"], "cc": [f"cc{n % 5}@example.com"]},
+            "subject": " ".join(words[:8]).capitalize(),
+            "snippet": " ".join(words)[:200],
+            "folder": "INBOX",
+            "state": "open",
+            "is_read": n % 3 == 0,
+            "is_flagged": n % 11 == 0,
+            "received_at": base + timedelta(minutes=n),
+            "created_at": base + timedelta(minutes=n, seconds=5),
+            "attachments": [
+                {"id": n * 2 + k, "filename": f"doc-{n}-{k}.pdf", "content_type": "application/pdf", "size": 48213}
+                for k in range(n % 3)
+            ],
+            "tags": [{"id": 1, "name": "work", "color": "#2196f3"}] if n % 2 else [],
+        })
+    email_page = {"items": emails, "total": None, "page": 1, "size": items, "next_cursor": "eyJpZCI6IDF9"}
+    gmail_page = {
+        "messages": [
+            {
+                "id": e["message_id"],
+                "thread_id": None,
+                "sender": e["sender"],
+                "subject": e["subject"],
+                "snippet": e["snippet"],
+                "date": e["received_at"].isoformat(),
+                "is_read": e["is_read"],
+            }
+            for e in emails
+        ],
+        "count": items,
+        "nextPageToken": "eyJpZCI6IDF9",
+    }
+    return email_page, gmail_page
+
+
+def build_app(email_page, gmail_page, setup: str) -> FastAPI:
+    app = FastAPI()
+    if setup == "after":
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.COMPRESSION_MIN_SIZE,
+            gzip_level=settings.GZIP_LEVEL,
+            brotli_quality=settings.BROTLI_QUALITY,
+        )
+
+    # No explicit class otherwise: FastAPI then serializes the model with Pydantic
+    orjson_class = {"response_class": ORJSONResponse} if setup == "orjson" else {}
+
+    @app.get("/emails", response_model=EmailListResponse, **orjson_class)
+    def emails():
+        return email_page
+
+    @app.get("/gmail/inbox", response_class=JSONResponse if setup == "before" else ORJSONResponse)
+    def inbox():
+        return gmail_page
+
+    return app
+
+
+def measure(client: TestClient, path: str, encoding: str, requests: int) -> dict:
+    headers = {"Accept-Encoding": encoding}
+    client.get(path, headers=headers)  # warm up
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append(time.perf_counter() - start)
+    return {
+        "ms": statistics.median(timings) * 1000,
+        "wire": response.num_bytes_downloaded,
+        "json": len(response.content),
+        "encoding": response.headers.get("content-encoding", "identity"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    email_page, gmail_page = sample_pages(args.items)
+    encodings = ["identity", "gzip"] + (["br, gzip"] if brotli is not None else [])
+    print(f"--- Response benchmark ({args.items} items, median of {args.requests} requests) ---")
+    if brotli is None:
+        print("(brotli not installed: gzip only)")
+    print(f"{'route':<14}{'setup':<8}{'accept':<11}{'encoding':<10}{'ms/request':>11}{'JSON bytes':>12}{'wire bytes':>12}")
+    for path in ("/emails", "/gmail/inbox"):
+        for setup in ("before", "orjson", "after"):
+            client = TestClient(build_app(email_page, gmail_page, setup))
+            for encoding in encodings if setup == "after" else ["gzip"]:
+                result = measure(client, path, encoding, args.requests)
+                print(
+                    f"{path:<14}{setup:<8}{encoding:<11}{result['encoding']:<10}"
+                    f"{result['ms']:>11.2f}{result['json']:>12}{result['wire']:>12}"
+                )
+
+
+if __name__ == "__main__":
+    main()
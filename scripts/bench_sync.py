@@ -0,0 +1,145 @@
+"""
+Sync throughput benchmark against the in-process IMAP server.
+
+Runs a sync mode over a synthetic mailbox and reports emails/sec,
+bytes/sec (bytes the server put on the wire) and peak RSS. No external
+servers or credentials are needed, so it runs offline and in CI.
+
+    python scripts/bench_sync.py --messages 2000 --mode backfill
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'apps', 'api'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'apps', 'api', 'tests'))
+
+WORKDIR = tempfile.mkdtemp(prefix="smartmailbox-bench-")
+
+# Isolated database and blob store; must be set before the app is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+os.environ["ATTACHMENT_STORAGE_DIR"] = os.path.join(WORKDIR, "attachments")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "benchsecretkey12345678901234567890")
+if "ENCRYPTION_KEY" not in os.environ:
+    from cryptography.fernet import Fernet
+    os.environ["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+from app import models  # noqa: E402  (registers all tables)
+from app.core.security.encryption import encrypt_password  # noqa: E402
+from app.db.session import Base, SessionLocal, engine  # noqa: E402
+from app.models.email import Email  # noqa: E402
+from app.models.job import Job  # noqa: E402
+from app.models.mailbox import Mailbox  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.workers import process_backfill_job, process_sync_email_job  # noqa: E402
+from mail_servers import FakeIMAPServer, SyntheticMailbox  # noqa: E402
+
+MODES = {
+    "sync": ("sync_email", process_sync_email_job),
+    "backfill": ("backfill_mailbox", process_backfill_job),
+}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def setup_mailbox(server: FakeIMAPServer) -> int:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = User(email="bench@bench.local", role="user", is_active=True)
+        db.add(user)
+        db.flush()
+        mailbox = Mailbox(
+            user_id=user.id,
+            email_address=server.username,
+            provider="custom",
+            imap_host=server.host,
+            imap_port=server.port,
+            hashed_password=encrypt_password(server.password),
+        )
+        db.add(mailbox)
+        db.commit()
+        return mailbox.id
+    finally:
+        db.close()
+
+
+def run(mode: str, mailbox_id: int, messages: int, chunk_size: int) -> dict:
+    job_type, handler = MODES[mode]
+    db = SessionLocal()
+    try:
+        payload = {"mailbox_id": mailbox_id}
+        if mode == "sync":
+            payload["limit"] = messages
+        else:
+            payload["chunk_size"] = chunk_size
+        job = Job(type=job_type, status="pending", payload=payload, created_at=datetime.utcnow(), attempts=0)
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+
+    handler(job_id)
+
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id).first()
+        stored = db.query(Email).filter(Email.mailbox_id == mailbox_id).count()
+        return {"status": job.status, "error": job.error, "result": job.result, "stored": stored}
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=sorted(MODES), default="sync")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--median-body-size", type=int, default=4000)
+    parser.add_argument("--attachment-rate", type=float, default=0.2)
+    parser.add_argument("--attachment-size", type=int, default=100_000)
+    parser.add_argument("--chunk-size", type=int, default=200, help="backfill chunk size")
+    parser.add_argument("--compress", action="store_true", help="advertise COMPRESS=DEFLATE on the server")
+    args = parser.parse_args()
+
+    synthetic = SyntheticMailbox(
+        count=args.messages,
+        median_body_size=args.median_body_size,
+        attachment_rate=args.attachment_rate,
+        attachment_size=args.attachment_size,
+    )
+    mailbox_bytes = synthetic.total_bytes  # pre-generates messages so they are not timed
+
+    capabilities = ("IMAP4rev1", "AUTH=PLAIN") + (("COMPRESS=DEFLATE",) if args.compress else ())
+    with FakeIMAPServer(synthetic, capabilities=capabilities) as server:
+        mailbox_id = setup_mailbox(server)
+        baseline_rss = peak_rss_mb()
+
+        start = time.perf_counter()
+        outcome = run(args.mode, mailbox_id, args.messages, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        wire_bytes = server.bytes_sent
+
+    print(f"--- Sync benchmark ({args.mode}{', compressed' if args.compress else ''}) ---")
+    print(f"Mailbox:        {args.messages} messages, {mailbox_bytes / 1e6:.1f} MB")
+    print(f"Job status:     {outcome['status']}" + (f" ({outcome['error']})" if outcome['error'] else ""))
+    print(f"Stored emails:  {outcome['stored']}")
+    print(f"Elapsed:        {elapsed:.2f} s")
+    print(f"Emails/sec:     {outcome['stored'] / elapsed:.1f}")
+    print(f"Bytes/sec:      {wire_bytes / elapsed / 1e6:.2f} MB/s ({wire_bytes / 1e6:.1f} MB on wire)")
+    print(f"Peak RSS:       {peak_rss_mb():.1f} MB (baseline {baseline_rss:.1f} MB, includes server)")
+    print(f"Job result:     {outcome['result']}")
+    print(f"Work dir:       {WORKDIR}")
+
+
+if __name__ == "__main__":
+    main()
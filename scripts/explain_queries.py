@@ -0,0 +1,183 @@
+"""
+Show that the hot queries use their indexes.
+
+Seeds a large synthetic dataset, runs the real route and worker code with
+statement capture on, and prints the database's plan for each captured
+query. Exits non-zero if a query does not use the index built for it.
+
+    python scripts/explain_queries.py --emails 200000
+
+Uses a temporary SQLite database; set EXPLAIN_DATABASE_URL to check a
+scratch PostgreSQL database instead (tables are created and seeded there).
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'apps', 'api'))
+
+WORKDIR = tempfile.mkdtemp(prefix="smartmailbox-explain-")
+
+# Isolated database; must be set before the app is imported
+os.environ["DATABASE_URL"] = os.environ.get("EXPLAIN_DATABASE_URL") or f"sqlite:///{os.path.join(WORKDIR, 'explain.db')}"
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("SECRET_KEY", "explainsecretkey1234567890123456789")
+os.environ.setdefault("ENCRYPTION_KEY", "explainencryptionkey123456789012")
+
+from fastapi import Request, Response  # noqa: E402
+from sqlalchemy import event, insert, text  # noqa: E402
+
+from app import models  # noqa: E402  (registers all tables)
+from app.db.session import Base, SessionLocal, engine  # noqa: E402
+from app.models.audit import AuditLog  # noqa: E402
+from app.models.email import Email  # noqa: E402
+from app.models.job import Job  # noqa: E402
+from app.models.mailbox import Mailbox  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.routes.audit import list_audit_logs  # noqa: E402
+from app.routes.emails import list_emails  # noqa: E402
+from app.routes.gmail import get_gmail_inbox  # noqa: E402
+from app.routes.jobs import list_jobs  # noqa: E402
+from app.services.safety_service import check_rate_limit  # noqa: E402
+from app.worker import next_pending_job  # noqa: E402
+
+FOLDERS = ["INBOX"] * 6 + ["SENT", "ARCHIVE", "TRASH", "SPAM"]
+EVENT_TYPES = ["login", "email_sent", "email_synced", "draft_created", "draft_approved"]
+JOB_STATUSES = ["completed"] * 17 + ["failed", "pending", "processing"]
+BATCH = 5000
+
+
+def seed(emails: int, mailboxes: int, jobs: int, audit_logs: int) -> dict:
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        user = User(email="explain@explain.local", role="user", is_active=True)
+        db.add(user)
+        db.flush()
+        boxes = [
+            Mailbox(user_id=user.id, email_address=f"box{n}@explain.local", is_active=True)
+            for n in range(mailboxes)
+        ]
+        db.add_all(boxes)
+        db.commit()
+        ids = {"user_id": user.id, "mailbox_id": boxes[0].id}
+        mailbox_ids = [box.id for box in boxes]
+
+    def insert_rows(table, make, count):
+        with engine.begin() as conn:
+            for start in range(0, count, BATCH):
+                conn.execute(insert(table), [make(n) for n in range(start, min(start + BATCH, count))])
+
+    insert_rows(Email.__table__, lambda n: {
+        "mailbox_id": rng.choice(mailbox_ids),
+        "message_id": f"<{n}@explain.local>",
+        "sender": f"sender{rng.randrange(5000)}@example.com",
+        "subject": f"Message {n}",
+        "folder": rng.choice(FOLDERS),
+        "is_read": rng.random() < 0.9,
+        "received_at": now - timedelta(minutes=n),
+    }, emails)
+    insert_rows(Job.__table__, lambda n: {
+        "type": "sync_email",
+        "status": rng.choice(JOB_STATUSES),
+        "priority": rng.choice([0, 0, 0, -10]),
+        "payload": {},
+        "created_at": now - timedelta(seconds=n),
+    }, jobs)
+    insert_rows(AuditLog.__table__, lambda n: {
+        "user_id": ids["user_id"],
+        "event_type": rng.choice(EVENT_TYPES),
+        "timestamp": now - timedelta(seconds=n * 10),
+        "details": {"mailbox_id": rng.choice(mailbox_ids)},
+    }, audit_logs)
+
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return ids
+
+
+def captured_select(table: str, run) -> tuple:
+    """Run ``run(db)`` and return the last SELECT it issued against ``table``."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and f"FROM {table}" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with SessionLocal() as db:
+            run(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return statements[-1]
+
+
+def explain(statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+def checks(ids: dict) -> list:
+    """(description, table, expected index, callable issuing the query)."""
+    user = User(id=ids["user_id"])
+    listing = dict(page=1, size=50, cursor=None, include_total=False, folder=None, is_read=None, q=None, sort=None)
+    # No If-None-Match, so the routes always run their queries
+    request = Request({"type": "http", "method": "GET", "headers": [], "query_string": b""})
+    listing.update(request=request, response=Response())
+    inbox = dict(request=request, response=Response(), max_results=50, page_token=None, offset=0, include_total=False)
+    return [
+        ("list emails: all mailboxes", "emails", "ix_emails_received",
+         lambda db: list_emails(**listing, mailbox_id=None, db=db, current_user=user)),
+        ("gmail inbox: all mailboxes", "emails", "ix_emails_received",
+         lambda db: get_gmail_inbox(**inbox, db=db, current_user=user)),
+        ("list emails: mailbox + folder", "emails", "ix_emails_mailbox_folder_received",
+         lambda db: list_emails(**{**listing, "folder": "INBOX"}, mailbox_id=ids["mailbox_id"], db=db, current_user=user)),
+        ("list emails: mailbox", "emails", "ix_emails_mailbox_received",
+         lambda db: list_emails(**listing, mailbox_id=ids["mailbox_id"], db=db, current_user=user)),
+        ("list emails: mailbox unread", "emails", "ix_emails_mailbox_unread",
+         lambda db: list_emails(**{**listing, "is_read": False}, mailbox_id=ids["mailbox_id"], db=db, current_user=user)),
+        ("worker: next pending job", "jobs", "ix_jobs_pending_queue", next_pending_job),
+        ("list jobs", "jobs", "ix_jobs_created_at",
+         lambda db: list_jobs(skip=0, limit=100, db=db, current_user=user)),
+        ("audit logs by event type", "audit_logs", "ix_audit_logs_event_type_timestamp",
+         lambda db: list_audit_logs(skip=0, limit=100, event_type="email_sent", db=db, current_user=user)),
+        ("send rate limit check", "audit_logs", "ix_audit_logs_event_type_timestamp",
+         lambda db: check_rate_limit(db, ids["mailbox_id"])),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=200_000)
+    parser.add_argument("--mailboxes", type=int, default=20)
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--audit-logs", type=int, default=100_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ids = seed(args.emails, args.mailboxes, args.jobs, args.audit_logs)
+    print(f"Seeded {args.emails} emails, {args.jobs} jobs, {args.audit_logs} audit logs "
+          f"on {engine.dialect.name} in {time.perf_counter() - start:.1f} s")
+
+    failures = 0
+    for description, table, index, run in checks(ids):
+        plan = explain(*captured_select(table, run))
+        used = index in plan
+        failures += not used
+        print(f"\n--- {description}: {'uses' if used else 'MISSING'} {index} ---")
+        print(plan)
+
+    print(f"\n{len(checks(ids)) - failures} of {len(checks(ids))} queries use their index")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()